@@ -37,6 +37,8 @@ export interface SystemStatus {
     index_status: SystemStatusItemStatus
     index_last_modified: string // ISO date string
     index_error: string
+    index_segments?: number
+    index_size?: number // bytes
     classifier_status: SystemStatusItemStatus
     classifier_last_trained: string // ISO date string
     classifier_error: string
@@ -17,6 +17,7 @@ import {
 } from '../data/document'
 import { FilterRule } from '../data/filter-rule'
 import {
+  FILTER_FULLTEXT_QUERY,
   FILTER_HAS_TAGS_ALL,
   FILTER_HAS_TAGS_ANY,
 } from '../data/filter-rule-type'
@@ -141,6 +142,33 @@ describe('DocumentListViewService', () => {
     expect(documentListViewService.getLastPage()).toEqual(1)
   })
 
+  it('should use the selection data included in full text search results', () => {
+    const selectionData = {
+      selected_correspondents: [],
+      selected_tags: [{ id: 1, document_count: 3 }],
+      selected_document_types: [],
+      selected_storage_paths: [],
+      selected_custom_fields: [],
+    }
+    documentListViewService.filterRules = [
+      {
+        rule_type: FILTER_FULLTEXT_QUERY,
+        value: 'invoice',
+      },
+    ]
+    const req = httpTestingController.expectOne(
+      (request) =>
+        request.url === `${environment.apiBaseUrl}documents/` &&
+        request.params.get('include_selection_data') === 'true'
+    )
+    expect(req.request.params.get('query')).toEqual('invoice')
+    req.flush({ ...full_results, selection_data: selectionData })
+    httpTestingController.expectNone(
+      `${environment.apiBaseUrl}documents/selection_data/`
+    )
+    expect(documentListViewService.selectionData).toEqual(selectionData)
+  })
+
   it('should handle error on page request out of range', () => {
     documentListViewService.currentPage = 50
     let req = httpTestingController.expectOne(
@@ -8,6 +8,7 @@ import {
   Document,
 } from '../data/document'
 import { FilterRule } from '../data/filter-rule'
+import { Results } from '../data/results'
 import { SavedView } from '../data/saved-view'
 import { DOCUMENT_LIST_SERVICE } from '../data/storage-keys'
 import { SETTINGS_KEYS } from '../data/ui-settings'
@@ -260,27 +261,41 @@ export class DocumentListViewService {
         activeListViewState.sortField,
         activeListViewState.sortReverse,
         activeListViewState.filterRules,
-        { truncate_content: true }
+        {
+          truncate_content: true,
+          // full text search results are counted by the search index
+          include_selection_data: isFullTextFilterRule(
+            activeListViewState.filterRules
+          )
+            ? true
+            : null,
+        }
       )
       .pipe(takeUntil(this.unsubscribeNotifier))
       .subscribe({
-        next: (result) => {
+        next: (
+          result: Results<Document> & { selection_data?: SelectionData }
+        ) => {
           this.initialized = true
           this.isReloading = false
           activeListViewState.collectionSize = result.count
           activeListViewState.documents = result.results
 
-          this.documentService
-            .getSelectionData(result.all)
-            .pipe(first())
-            .subscribe({
-              next: (selectionData) => {
-                this.selectionData = selectionData
-              },
-              error: () => {
-                this.selectionData = null
-              },
-            })
+          if (result.selection_data) {
+            this.selectionData = result.selection_data
+          } else {
+            this.documentService
+              .getSelectionData(result.all)
+              .pipe(first())
+              .subscribe({
+                next: (selectionData) => {
+                  this.selectionData = selectionData
+                },
+                error: () => {
+                  this.selectionData = null
+                },
+              })
+          }
 
           if (updateQueryParams && !this._activeSavedViewId) {
             let base = ['/documents']
@@ -87,23 +87,23 @@ class DocumentAdmin(GuardedModelAdmin):
     def delete_queryset(self, request, queryset):
         from documents import index
 
-        with index.open_index_writer() as writer:
-            for o in queryset:
-                index.remove_document(writer, o)
+        index.get_search_backend().remove_documents(
+            queryset.values_list("pk", flat=True),
+        )
 
         super().delete_queryset(request, queryset)
 
     def delete_model(self, request, obj):
         from documents import index
 
-        index.remove_document_from_index(obj)
+        index.queue_document_removal(obj)
         super().delete_model(request, obj)
 
     def save_model(self, request, obj, form, change):
         from documents import index
 
-        index.add_or_update_document(obj)
         super().save_model(request, obj, form, change)
+        index.queue_document_update(obj)
 
 
 class RuleInline(admin.TabularInline):
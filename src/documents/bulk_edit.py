@@ -222,9 +222,7 @@ def delete(doc_ids: list[int]) -> Literal["OK"]:
 
         from documents import index
 
-        with index.open_index_writer() as writer:
-            for id in doc_ids:
-                index.remove_document_by_id(writer, id)
+        index.get_search_backend().remove_documents(doc_ids)
 
         status_mgr = DocumentsStatusManager()
         status_mgr.send_documents_deleted(doc_ids)
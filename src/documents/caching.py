@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 from binascii import hexlify
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
+from typing import Any
 from typing import Final
+from uuid import uuid4
 
 from django.core.cache import cache
+from django.db.models import Count
+from django.db.models import Max
 
 from documents.models import Document
 
 if TYPE_CHECKING:
+    from django.db.models import QuerySet
+
     from documents.classifier import DocumentClassifier
 
 logger = logging.getLogger("paperless.caching")
@@ -31,15 +38,193 @@ class SuggestionCacheData:
     suggestions: dict
 
 
+@dataclass(frozen=True)
+class SearchResultsCacheData:
+    # The parsed query, needed for highlighting
+    query: Any
+    # (score, docnum) of the top hits, in order
+    top_n: list[tuple[float | None, int]]
+    # Number of all matching documents
+    total: int
+
+
 CLASSIFIER_VERSION_KEY: Final[str] = "classifier_version"
 CLASSIFIER_HASH_KEY: Final[str] = "classifier_hash"
 CLASSIFIER_MODIFIED_KEY: Final[str] = "classifier_modified"
+# Changes whenever documents or matching objects change, see bump_classifier_generation
+CLASSIFIER_GENERATION_KEY: Final[str] = "classifier_generation"
+# The training data marker the current classifier model was trained (or checked) with
+CLASSIFIER_TRAINED_MARKER_KEY: Final[str] = "classifier_trained_marker"
+
+# Changes whenever documents or permissions change, see bump_search_filter_generation
+SEARCH_FILTER_GENERATION_KEY: Final[str] = "search_filter_generation"
+
+# Changes whenever the matching of tags, correspondents, document types or
+# storage paths changes, see bump_matching_generation
+MATCHING_GENERATION_KEY: Final[str] = "matching_generation"
 
 CACHE_1_MINUTE: Final[int] = 60
 CACHE_5_MINUTES: Final[int] = 5 * CACHE_1_MINUTE
 CACHE_50_MINUTES: Final[int] = 50 * CACHE_1_MINUTE
 
 
+def bump_classifier_generation() -> None:
+    """
+    Marks the training data of the classifier as changed, by setting a new,
+    random generation
+    """
+    cache.set(CLASSIFIER_GENERATION_KEY, uuid4().hex, None)
+
+
+def get_classifier_training_marker() -> tuple | None:
+    """
+    Returns a cheap marker of the current classifier training data, made of the
+    generation plus the number and latest modification of the documents, and
+    the model format version.  If the generation is unknown (for example, the
+    cache was cleared), None is returned and the training data has to be
+    checked in full
+    """
+    from documents.classifier import DocumentClassifier
+
+    generation = cache.get(CLASSIFIER_GENERATION_KEY)
+    if generation is None:
+        # Start a generation, so the next check can use it
+        cache.add(CLASSIFIER_GENERATION_KEY, uuid4().hex, None)
+        return None
+    stats = Document.objects.aggregate(count=Count("id"), modified=Max("modified"))
+    return (
+        generation,
+        stats["count"],
+        stats["modified"],
+        DocumentClassifier.FORMAT_VERSION,
+    )
+
+
+def classifier_training_data_unchanged(marker: tuple | None) -> bool:
+    """
+    Checks if the classifier was already trained with the training data of the
+    given marker
+    """
+    return marker is not None and cache.get(CLASSIFIER_TRAINED_MARKER_KEY) == marker
+
+
+def set_classifier_trained_marker(marker: tuple | None) -> None:
+    """
+    Records the marker of the training data the classifier was trained with
+    """
+    if marker is not None:
+        cache.set(CLASSIFIER_TRAINED_MARKER_KEY, marker, None)
+
+
+def bump_search_filter_generation() -> None:
+    """
+    Marks the visible documents of all users as changed, by setting a new,
+    random generation
+    """
+    cache.set(SEARCH_FILTER_GENERATION_KEY, uuid4().hex, None)
+
+
+def bump_matching_generation() -> None:
+    """
+    Marks the compiled matchers of all processes as outdated, by setting a new,
+    random generation
+    """
+    cache.set(MATCHING_GENERATION_KEY, uuid4().hex, None)
+
+
+def get_matching_generation() -> str:
+    """
+    Returns the current generation of the matching objects, starting one if it
+    is unknown (for example, the cache was cleared)
+    """
+    generation = cache.get(MATCHING_GENERATION_KEY)
+    if generation is None:
+        generation = uuid4().hex
+        if not cache.add(MATCHING_GENERATION_KEY, generation, None):
+            generation = cache.get(MATCHING_GENERATION_KEY, generation)
+    return generation
+
+
+def get_search_filter_cache_key(user_id: int | None, filter_queryset: QuerySet) -> str:
+    """
+    Returns the cache key for the visible document IDs of the given user and
+    filter.  The filter is identified by its SQL, which also covers the
+    permission checks of the user.  The key changes with every generation.
+
+    Raises EmptyResultSet if the filter can never match a document.
+    """
+    generation = cache.get(SEARCH_FILTER_GENERATION_KEY)
+    if generation is None:
+        generation = uuid4().hex
+        if not cache.add(SEARCH_FILTER_GENERATION_KEY, generation, None):
+            generation = cache.get(SEARCH_FILTER_GENERATION_KEY, generation)
+    signature = hashlib.sha256(
+        str(filter_queryset.order_by("id").values("id").query).encode(),
+    ).hexdigest()
+    return f"search_filter_{user_id}_{generation}_{signature}"
+
+
+def get_search_filter_cache(key: str) -> bytes | None:
+    """
+    Returns the cached bitset bytes of the visible document IDs, if any
+    """
+    return cache.get(key)
+
+
+def set_search_filter_cache(key: str, document_ids: bytes) -> None:
+    """
+    Caches the bitset bytes of the visible document IDs.  The timeout limits
+    how long changes which are not signalled (like queryset updates) go unnoticed.
+    """
+    cache.set(key, document_ids, CACHE_5_MINUTES)
+
+
+def get_search_results_cache_key(signature: tuple) -> str:
+    """
+    Returns the cache key for the results of the search with the given
+    signature, which includes the index version it was run on
+    """
+    digest = hashlib.sha256(repr(signature).encode()).hexdigest()
+    return f"search_results_{digest}"
+
+
+def get_search_results_cache(key: str) -> SearchResultsCacheData | None:
+    """
+    Returns the cached results of a search, if any
+    """
+    return cache.get(key)
+
+
+def set_search_results_cache(key: str, results: SearchResultsCacheData) -> None:
+    """
+    Caches the results of a search.  Once the index changes, the key changes
+    too and the entry simply expires.
+    """
+    cache.set(key, results, CACHE_5_MINUTES)
+
+
+def get_search_facets_cache_key(results_key: str) -> str:
+    """
+    Returns the cache key for the facet counts of the search results with the
+    given cache key
+    """
+    return f"{results_key}_facets"
+
+
+def get_search_facets_cache(key: str) -> dict[str, dict[int, int]] | None:
+    """
+    Returns the cached facet counts of a search, if any
+    """
+    return cache.get(key)
+
+
+def set_search_facets_cache(key: str, facets: dict[str, dict[int, int]]) -> None:
+    """
+    Caches the facet counts of a search, which expire like its results
+    """
+    cache.set(key, facets, CACHE_5_MINUTES)
+
+
 def get_suggestion_cache_key(document_id: int) -> str:
     """
     Returns the basic key for a document's suggestions
@@ -78,6 +263,40 @@ def get_suggestion_cache(document_id: int) -> SuggestionCacheData | None:
     return None
 
 
+def get_suggestion_caches(document_ids: list[int]) -> dict[int, SuggestionCacheData]:
+    """
+    Returns the usable cached suggestions of the given document IDs, by document ID,
+    with a single cache lookup.  Documents without usable suggestions are left out.
+    """
+    from documents.classifier import DocumentClassifier
+
+    doc_keys = {get_suggestion_cache_key(doc_id): doc_id for doc_id in document_ids}
+    cache_hits = cache.get_many(
+        [CLASSIFIER_VERSION_KEY, CLASSIFIER_HASH_KEY, *doc_keys],
+    )
+    classifier_version = cache_hits.get(CLASSIFIER_VERSION_KEY)
+    classifier_hash = cache_hits.get(CLASSIFIER_HASH_KEY)
+
+    suggestions = {}
+    outdated_keys = []
+    for doc_key, doc_id in doc_keys.items():
+        if doc_key not in cache_hits:
+            continue
+        doc_suggestions: SuggestionCacheData = cache_hits[doc_key]
+        if (
+            classifier_version == DocumentClassifier.FORMAT_VERSION
+            and classifier_version == doc_suggestions.classifier_version
+            and classifier_hash is not None
+            and classifier_hash == doc_suggestions.classifier_hash
+        ):
+            suggestions[doc_id] = doc_suggestions
+        else:
+            outdated_keys.append(doc_key)
+    if outdated_keys:
+        cache.delete_many(outdated_keys)
+    return suggestions
+
+
 def set_suggestions_cache(
     document_id: int,
     suggestions: dict,
@@ -102,6 +321,33 @@ def set_suggestions_cache(
         )
 
 
+def set_classifier_cache_info(
+    classifier: DocumentClassifier,
+    *,
+    timeout: int = CACHE_50_MINUTES,
+) -> None:
+    """
+    Caches the information about the given, loaded classifier, which cached
+    suggestions are checked against
+    """
+    cache.set_many(
+        {
+            CLASSIFIER_MODIFIED_KEY: classifier.last_doc_change_time,
+            CLASSIFIER_HASH_KEY: hexlify(classifier.last_auto_type_hash).decode(),
+            CLASSIFIER_VERSION_KEY: classifier.FORMAT_VERSION,
+        },
+        timeout,
+    )
+
+
+def classifier_cache_info_cached() -> bool:
+    """
+    Checks if the information about a classifier is cached, without which no
+    cached suggestions are valid
+    """
+    return cache.get(CLASSIFIER_HASH_KEY) is not None
+
+
 def refresh_suggestions_cache(
     document_id: int,
     *,
@@ -1,28 +1,52 @@
 from __future__ import annotations
 
+import copy
 import logging
+import math
+import multiprocessing
 import pickle
 import re
+import sqlite3
+import threading
+import time
 import warnings
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import timedelta
+from hashlib import blake2b
 from hashlib import sha256
+from itertools import islice
 from pathlib import Path
 from typing import TYPE_CHECKING
+from typing import Final
 
 if TYPE_CHECKING:
+    from array import array
+    from collections.abc import Callable
+    from collections.abc import Iterable
     from collections.abc import Iterator
     from datetime import datetime
 
+    from django.db.models import QuerySet
     from numpy import ndarray
+    from sklearn.neural_network import MLPClassifier
 
 from django.conf import settings
 from django.core.cache import cache
+from django.utils import timezone
 
 from documents.caching import CACHE_50_MINUTES
 from documents.caching import CLASSIFIER_HASH_KEY
 from documents.caching import CLASSIFIER_MODIFIED_KEY
 from documents.caching import CLASSIFIER_VERSION_KEY
+from documents.models import Correspondent
 from documents.models import Document
+from documents.models import DocumentType
 from documents.models import MatchingModel
+from documents.models import StoragePath
 
 logger = logging.getLogger("paperless.classifier")
 
@@ -37,7 +61,58 @@ class ClassifierModelCorruptError(Exception):
     pass
 
 
-def load_classifier(*, raise_exception: bool = False) -> DocumentClassifier | None:
+# Process wide cache of the last loaded classifier.  Holds the signature of
+# the model file it was loaded from and the classifier itself, so the
+# (expensive) load is only done once per model file generation
+_classifier_cache: tuple[tuple, DocumentClassifier] | None = None
+_classifier_cache_lock = threading.Lock()
+
+
+def _model_file_signature() -> tuple | None:
+    """
+    Returns a tuple identifying the current generation of the model file, or
+    None if there is no model file
+    """
+    try:
+        stat = settings.MODEL_FILE.stat()
+    except FileNotFoundError:
+        return None
+    return (
+        str(settings.MODEL_FILE),
+        stat.st_ino,
+        stat.st_mtime_ns,
+        stat.st_size,
+        DocumentClassifier.FORMAT_VERSION,
+    )
+
+
+def clear_classifier_cache() -> None:
+    """
+    Drops the cached classifier, if any, so the next load reads the model file again
+    """
+    global _classifier_cache
+    with _classifier_cache_lock:
+        _classifier_cache = None
+
+
+def load_classifier(
+    *,
+    raise_exception: bool = False,
+    use_cache: bool = True,
+) -> DocumentClassifier | None:
+    """
+    Loads the classifier from the model file.
+
+    By default, the loaded classifier is kept in memory for the lifetime of the
+    process and returned again as long as the model file has not changed (path,
+    inode, modification time, size and format version).  A new model file is
+    loaded once and then replaces the cached classifier.
+
+    The returned classifier may be shared, so callers which modify it (i.e. training)
+    should pass use_cache=False to get a private copy.
+    """
+    global _classifier_cache
+
     if not settings.MODEL_FILE.is_file():
         logger.debug(
             "Document classification model does not exist (yet), not "
@@ -45,6 +120,31 @@ def load_classifier(*, raise_exception: bool = False) -> DocumentClassifier | No
         )
         return None
 
+    if not use_cache:
+        return _load_classifier(raise_exception=raise_exception)
+
+    signature = _model_file_signature()
+    cached = _classifier_cache
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _classifier_cache_lock:
+        # Another thread may have loaded this generation while waiting
+        cached = _classifier_cache
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        classifier = _load_classifier(raise_exception=raise_exception)
+        if classifier is not None and signature is not None:
+            logger.debug("Caching classifier loaded from model file")
+            _classifier_cache = (signature, classifier)
+        else:
+            _classifier_cache = None
+
+    return classifier
+
+
+def _load_classifier(*, raise_exception: bool = False) -> DocumentClassifier | None:
     classifier = DocumentClassifier()
     try:
         classifier.load()
@@ -61,7 +161,7 @@ def load_classifier(*, raise_exception: bool = False) -> DocumentClassifier | No
             "Unrecoverable error while loading document "
             "classification model, deleting model file.",
         )
-        Path(settings.MODEL_FILE).unlink
+        Path(settings.MODEL_FILE).unlink()
         classifier = None
         if raise_exception:
             raise e
@@ -79,17 +179,585 @@ def load_classifier(*, raise_exception: bool = False) -> DocumentClassifier | No
     return classifier
 
 
+# Alignment of the raw arrays in the model file, enough for any dtype and
+# cache line friendly
+_MODEL_ARRAY_ALIGNMENT: Final[int] = 64
+
+
+def _align_offset(offset: int) -> int:
+    return -(-offset // _MODEL_ARRAY_ALIGNMENT) * _MODEL_ARRAY_ALIGNMENT
+
+
+def _array_from_buffer(
+    buffer,
+    dtype: str,
+    shape: tuple[int, ...],
+    offset: int,
+) -> ndarray:
+    import numpy as np
+
+    count = math.prod(shape)
+    if count == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(
+        shape,
+    )
+
+
+@dataclass(frozen=True)
+class _ArrayReference:
+    """
+    Placeholder for an array which is stored outside of the pickled estimator
+    """
+
+    key: str
+
+
+@dataclass(frozen=True)
+class _VocabularyReference:
+    """
+    Placeholder for a vectorizer vocabulary stored as arrays, outside of the
+    pickled estimator
+    """
+
+    terms: _ArrayReference
+    offsets: _ArrayReference
+    indices: _ArrayReference
+
+
+class MappedVocabulary(Mapping):
+    """
+    Read only term to feature index mapping of a vectorizer, backed by arrays
+    instead of a dictionary, so it can be memory mapped from the model file.
+
+    The UTF-8 encoded terms are stored sorted and concatenated in one array,
+    with their start offsets in a second and the feature index of each term
+    in a third.  Lookups happen for every token of every vectorized content,
+    so the first lookup builds a dictionary of all terms, which is used by all
+    further lookups.  Loading and iterating the vocabulary do not need it.
+    """
+
+    def __init__(self, terms: ndarray, offsets: ndarray, indices: ndarray) -> None:
+        self.terms = terms
+        self.offsets = offsets
+        self.indices = indices
+        # Indexing a memoryview is much faster than indexing a numpy array
+        self._terms_view = memoryview(terms)
+        self._offsets_view = memoryview(offsets)
+        self._size = len(indices)
+        self._lookup: dict[str, int] | None = None
+
+    @classmethod
+    def from_dict(cls, vocabulary: dict[str, int]) -> MappedVocabulary:
+        import numpy as np
+
+        encoded = sorted(
+            (term.encode("utf-8"), index) for term, index in vocabulary.items()
+        )
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(term) for term, _ in encoded])
+        return cls(
+            np.frombuffer(b"".join(term for term, _ in encoded), dtype=np.uint8),
+            offsets,
+            np.array([index for _, index in encoded], dtype=np.int64),
+        )
+
+    def _term(self, position: int) -> bytes:
+        return bytes(
+            self._terms_view[
+                self._offsets_view[position] : self._offsets_view[position + 1]
+            ],
+        )
+
+    def __getitem__(self, term: str) -> int:
+        lookup = self._lookup
+        if lookup is None:
+            lookup = dict(zip(self, self.indices.tolist()))
+            self._lookup = lookup
+        return lookup[term]
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self._size):
+            yield self._term(position).decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __reduce__(self):
+        return (self.__class__, (self.terms, self.offsets, self.indices))
+
+
+class TrainedLabels:
+    """
+    A hash of the labels of each document the classifiers were last trained
+    or updated with, with the document IDs in ascending order.  Labels can
+    change without changing the modification time of a document, for example
+    by bulk edits, so these are found by comparing the hashes.  Stored like
+    the estimators, so the arrays are memory mapped from the model file.
+    """
+
+    def __init__(self, document_ids: ndarray, hashes: ndarray) -> None:
+        self.document_ids = document_ids
+        self.hashes = hashes
+
+    @staticmethod
+    def hash(label: bytes) -> int:
+        return int.from_bytes(
+            blake2b(label, digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+
+    def changed(self, document_ids: ndarray, hashes: ndarray) -> ndarray:
+        """
+        Returns the IDs of the given documents, in ascending order, which were
+        not trained with or whose labels changed since
+        """
+        import numpy as np
+
+        if len(self.document_ids) == 0:
+            return document_ids
+        positions = np.searchsorted(self.document_ids, document_ids)
+        positions = np.minimum(positions, len(self.document_ids) - 1)
+        unchanged = (self.document_ids[positions] == document_ids) & (
+            self.hashes[positions] == hashes
+        )
+        return document_ids[~unchanged]
+
+
+def _is_mappable_array(value: object) -> bool:
+    import numpy as np
+
+    return isinstance(value, np.ndarray) and not value.dtype.hasobject
+
+
+def _detach_arrays(prefix: str, estimator, arrays: dict[str, ndarray]):
+    """
+    Returns a shallow copy of the estimator, with its array attributes (and its
+    vocabulary, if any) moved into arrays and replaced by references
+    """
+    if estimator is None:
+        return None
+
+    estimator = copy.copy(estimator)
+    state = estimator.__dict__
+    for attribute, value in list(state.items()):
+        key = f"{prefix}.{attribute}"
+        if attribute == "_optimizer":
+            # Optimizer state is only required to continue training, a new one
+            # is created by scikit-learn if it is missing
+            del state[attribute]
+        elif attribute == "vocabulary_" and isinstance(value, Mapping):
+            if not isinstance(value, MappedVocabulary):
+                value = MappedVocabulary.from_dict(value)
+            references = []
+            for part in ("terms", "offsets", "indices"):
+                arrays[f"{key}.{part}"] = getattr(value, part)
+                references.append(_ArrayReference(f"{key}.{part}"))
+            state[attribute] = _VocabularyReference(*references)
+        elif _is_mappable_array(value):
+            arrays[key] = value
+            state[attribute] = _ArrayReference(key)
+        elif (
+            isinstance(value, list)
+            and len(value) > 0
+            and all(_is_mappable_array(item) for item in value)
+        ):
+            state[attribute] = []
+            for index, item in enumerate(value):
+                arrays[f"{key}.{index}"] = item
+                state[attribute].append(_ArrayReference(f"{key}.{index}"))
+    return estimator
+
+
+def _attach_arrays(estimator, arrays: dict[str, ndarray]):
+    """
+    Replaces the references of a loaded estimator with the loaded arrays
+    """
+    if estimator is None:
+        return None
+
+    state = estimator.__dict__
+    for attribute, value in list(state.items()):
+        if isinstance(value, _ArrayReference):
+            state[attribute] = arrays[value.key]
+        elif isinstance(value, _VocabularyReference):
+            state[attribute] = MappedVocabulary(
+                arrays[value.terms.key],
+                arrays[value.offsets.key],
+                arrays[value.indices.key],
+            )
+        elif isinstance(value, list) and any(
+            isinstance(item, _ArrayReference) for item in value
+        ):
+            state[attribute] = [arrays[item.key] for item in value]
+    return estimator
+
+
+def _ensure_writable(estimator) -> None:
+    """
+    Replaces the read only (memory mapped) arrays of a loaded estimator with
+    writable copies, so it can be updated in place
+    """
+    import numpy as np
+
+    state = estimator.__dict__
+    for attribute, value in list(state.items()):
+        if isinstance(value, np.ndarray) and not value.flags.writeable:
+            state[attribute] = value.copy()
+        elif isinstance(value, list) and any(
+            isinstance(item, np.ndarray) for item in value
+        ):
+            state[attribute] = [
+                np.array(item) if isinstance(item, np.ndarray) else item
+                for item in value
+            ]
+
+
+# The training data shared with the processes fitting the classifiers.  Set
+# before the processes are forked, so they inherit it instead of receiving a copy
+_fit_data: tuple[ndarray, dict[str, ndarray]] | None = None
+
+
+def _fit_classifier(name: str) -> tuple[str, MLPClassifier, float]:
+    """
+    Fits the classifier for the given name, with the shared training data
+    """
+    from sklearn.neural_network import MLPClassifier
+
+    data_vectorized, labels = _fit_data
+    start = time.perf_counter()
+    classifier = MLPClassifier(tol=0.01)
+    classifier.fit(data_vectorized, labels[name])
+    return name, classifier, time.perf_counter() - start
+
+
+def _fit_classifiers(
+    data_vectorized: ndarray,
+    labels: dict[str, ndarray],
+    workers: int,
+) -> dict[str, tuple[MLPClassifier, float]]:
+    """
+    Fits one classifier per labels with the same training data and returns each
+    with the seconds it took to fit.
+
+    With more than one worker, the classifiers are fitted concurrently in forked
+    processes, which share the training data.  Daemonic processes (such as the
+    Celery workers) cannot have children, they use threads instead
+    """
+    global _fit_data
+
+    _fit_data = (data_vectorized, labels)
+    try:
+        workers = min(workers, len(labels))
+        if workers <= 1:
+            results = map(_fit_classifier, labels)
+        elif (
+            "fork" in multiprocessing.get_all_start_methods()
+            and not multiprocessing.current_process().daemon
+        ):
+            with ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("fork"),
+            ) as executor:
+                results = list(executor.map(_fit_classifier, labels))
+        else:
+            with ThreadPoolExecutor(workers) as executor:
+                results = list(executor.map(_fit_classifier, labels))
+
+        return {name: (classifier, seconds) for name, classifier, seconds in results}
+    finally:
+        _fit_data = None
+
+
+class PreprocessedContentCache:
+    """
+    Persists the preprocessed content of documents, so training only has to
+    preprocess the documents whose content changed since the last training.
+
+    Entries are keyed by the document id and a digest of the content together
+    with the settings which affect the preprocessing (NLTK language, etc.)
+    """
+
+    # Increase this when preprocess_content changes its output
+    PREPROCESS_VERSION: Final[int] = 1
+
+    # Number of newly preprocessed documents written to the cache at once
+    WRITE_BATCH_SIZE: Final[int] = 500
+    # Number of documents whose cached content is read at once
+    READ_BATCH_SIZE: Final[int] = 500
+
+    def __init__(self, path: Path, preprocess: Callable[[str], str]) -> None:
+        self.path = path
+        self.preprocess = preprocess
+        self.hits = 0
+        self.misses = 0
+        self._connection: sqlite3.Connection | None = None
+
+    @classmethod
+    def settings_key(cls) -> bytes:
+        return (
+            f"{cls.PREPROCESS_VERSION}:{settings.NLTK_ENABLED}:{settings.NLTK_LANGUAGE}"
+        ).encode()
+
+    @staticmethod
+    def _digest(key: bytes, content: str) -> bytes:
+        hasher = sha256(key)
+        hasher.update(b"\0")
+        hasher.update(content.encode("utf-8", errors="surrogatepass"))
+        return hasher.digest()
+
+    def _open(self) -> None:
+        for attempt in range(2):
+            try:
+                self._connection = sqlite3.connect(self.path)
+                # This is only a cache, losing it on a crash is fine
+                self._connection.execute("PRAGMA synchronous = OFF")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS content ("
+                    "document_id INTEGER PRIMARY KEY, "
+                    "digest BLOB NOT NULL, "
+                    "tokens TEXT NOT NULL)",
+                )
+                return
+            except sqlite3.DatabaseError as e:
+                self._close()
+                if attempt > 0:
+                    self._disable(e)
+                    return
+                # Most likely not a database at all, start over
+                logger.warning(f"Recreating preprocessed content cache: {e}")
+                self.path.unlink(missing_ok=True)
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _disable(self, error: Exception) -> None:
+        logger.warning(
+            f"Preprocessed content cache unavailable, preprocessing all "
+            f"documents: {error}",
+        )
+        self._close()
+
+    def _cached_digests(self) -> dict[int, bytes]:
+        if self._connection is None:
+            return {}
+        try:
+            return dict(
+                self._connection.execute("SELECT document_id, digest FROM content"),
+            )
+        except sqlite3.Error as e:
+            self._disable(e)
+            return {}
+
+    def _cached_tokens(self, document_ids: list[int]) -> dict[int, str]:
+        if self._connection is None or not document_ids:
+            return {}
+        placeholders = ", ".join("?" * len(document_ids))
+        try:
+            return dict(
+                self._connection.execute(
+                    f"SELECT document_id, tokens FROM content "
+                    f"WHERE document_id IN ({placeholders})",
+                    document_ids,
+                ),
+            )
+        except sqlite3.Error as e:
+            self._disable(e)
+            return {}
+
+    def _store(self, entries: list[tuple[int, bytes, str]]) -> None:
+        if self._connection is None or not entries:
+            return
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO content VALUES (?, ?, ?)",
+                    entries,
+                )
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    def _remove(self, document_ids: Iterable[int]) -> None:
+        if self._connection is None:
+            return
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "DELETE FROM content WHERE document_id = ?",
+                    ((document_id,) for document_id in document_ids),
+                )
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    def preprocess_all(
+        self,
+        documents: Iterable[tuple[int, str]],
+        *,
+        prune: bool = False,
+    ) -> Iterator[str]:
+        """
+        Yields the preprocessed content for each (id, content) pair, reusing
+        the cached result if the content is unchanged.  With prune, the given
+        documents are all documents, and once they are processed, the entries
+        of documents which were not given are removed
+        """
+        self._open()
+        try:
+            cached = self._cached_digests()
+            key = self.settings_key()
+            pending: list[tuple[int, bytes, str]] = []
+
+            documents = iter(documents)
+            while batch := list(islice(documents, self.READ_BATCH_SIZE)):
+                digests = [self._digest(key, content) for _, content in batch]
+                cached_tokens = self._cached_tokens(
+                    [
+                        document_id
+                        for (document_id, _), digest in zip(batch, digests)
+                        if cached.pop(document_id, None) == digest
+                    ],
+                )
+
+                for (document_id, content), digest in zip(batch, digests):
+                    tokens = cached_tokens.get(document_id)
+                    if tokens is None:
+                        self.misses += 1
+                        tokens = self.preprocess(content)
+                        pending.append((document_id, digest, tokens))
+                        if len(pending) >= self.WRITE_BATCH_SIZE:
+                            self._store(pending)
+                            pending = []
+                    else:
+                        self.hits += 1
+
+                    yield tokens
+
+            self._store(pending)
+            if prune:
+                # Whatever is left belongs to deleted (or inbox) documents
+                self._remove(cached.keys())
+        finally:
+            self._close()
+
+
+class ChunkedHashingVectorizer:
+    """
+    A bounded memory alternative to the CountVectorizer, for very large numbers
+    of documents.
+
+    Words and word pairs are hashed into a fixed number of features, so no
+    vocabulary of every term has to be built.  Fitting counts the documents
+    per feature, transforming hashes the documents in chunks and keeps only
+    the features used by at least min_df of the documents (and at most
+    max_features of the most used ones).  Both iterate the documents once
+    """
+
+    N_HASHED_FEATURES: Final[int] = 2**20
+
+    def __init__(
+        self,
+        *,
+        min_df: float = 0.01,
+        max_features: int | None = None,
+        chunk_size: int = 1000,
+    ) -> None:
+        self.min_df = min_df
+        self.max_features = max_features
+        self.chunk_size = chunk_size
+        # The hashed features which are kept, sorted
+        self.columns_: ndarray | None = None
+
+    def _chunks(self, documents: Iterable[str]):
+        import numpy as np
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        hashing = HashingVectorizer(
+            analyzer="word",
+            ngram_range=(1, 2),
+            n_features=self.N_HASHED_FEATURES,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32,
+        )
+        documents = iter(documents)
+        while chunk := list(islice(documents, self.chunk_size)):
+            yield hashing.transform(chunk)
+
+    def fit(self, documents: Iterable[str]) -> ChunkedHashingVectorizer:
+        import numpy as np
+
+        document_frequency = np.zeros(self.N_HASHED_FEATURES, dtype=np.int64)
+        num_documents = 0
+        for chunk in self._chunks(documents):
+            # Each row contains a feature at most once
+            document_frequency += np.bincount(
+                chunk.indices,
+                minlength=self.N_HASHED_FEATURES,
+            )
+            num_documents += chunk.shape[0]
+
+        columns = np.flatnonzero(
+            document_frequency >= max(self.min_df * num_documents, 1),
+        )
+        if self.max_features is not None and len(columns) > self.max_features:
+            most_used = np.argsort(-document_frequency[columns], kind="stable")
+            columns = np.sort(columns[most_used[: self.max_features]])
+        if len(columns) == 0:
+            raise ValueError("After pruning, no features remain.")
+
+        self.columns_ = columns
+        return self
+
+    def transform(self, documents: Iterable[str]):
+        import numpy as np
+        import scipy.sparse
+
+        chunks = [chunk[:, self.columns_] for chunk in self._chunks(documents)]
+        if not chunks:
+            return scipy.sparse.csr_matrix(
+                (0, len(self.columns_)),
+                dtype=np.float32,
+            )
+        return scipy.sparse.vstack(chunks, format="csr")
+
+
+@dataclass(frozen=True)
+class ClassifierPredictions:
+    """
+    The predictions of all classifiers for a single document.  None (or no tags)
+    means nothing was predicted
+    """
+
+    correspondent: int | None = None
+    document_type: int | None = None
+    tags: list[int] = field(default_factory=list)
+    storage_path: int | None = None
+
+
 class DocumentClassifier:
     # v7 - Updated scikit-learn package version
     # v8 - Added storage path classifier
     # v9 - Changed from hashing to time/ids for re-train check
-    FORMAT_VERSION = 9
+    # v10 - Memory mappable arrays instead of a single pickle stream
+    # v11 - Added time of the last full training
+    # v12 - Added the labels of each trained document
+    FORMAT_VERSION = 12
+
+    # Number of changed documents the classifiers are updated with at once
+    INCREMENTAL_BATCH_SIZE: Final[int] = 1000
 
     def __init__(self) -> None:
         # last time a document changed and therefore training might be required
         self.last_doc_change_time: datetime | None = None
         # Hash of primary keys of AUTO matching values last used in training
         self.last_auto_type_hash: bytes | None = None
+        # last time the classifier was trained from scratch, instead of updated
+        self.last_full_train_time: datetime | None = None
+        # the labels of each document the classifier was trained with
+        self.trained_labels: TrainedLabels | None = None
 
         self.data_vectorizer = None
         self.tags_binarizer = None
@@ -98,15 +766,45 @@ class DocumentClassifier:
         self.document_type_classifier = None
         self.storage_path_classifier = None
 
+        # Seconds the steps of the last training took, not stored
+        self.train_times: dict[str, float] = {}
+        # Seconds it took to fit each classifier in the last full training
+        self.fit_times: dict[str, float] = {}
+
         self._stemmer = None
         self._stop_words = None
 
-    def load(self) -> None:
+    # The classifier attributes, each trained to predict one kind of label
+    _HEADS: Final[tuple[str, ...]] = (
+        "tags_classifier",
+        "correspondent_classifier",
+        "document_type_classifier",
+        "storage_path_classifier",
+    )
+
+    # The estimator attributes, in the order they are stored in the model file.
+    # The trained labels are stored the same way.
+    _ESTIMATORS: Final[tuple[str, ...]] = (
+        "data_vectorizer",
+        "tags_binarizer",
+        "tags_classifier",
+        "correspondent_classifier",
+        "document_type_classifier",
+        "storage_path_classifier",
+        "trained_labels",
+    )
+
+    def load(self, model_file: Path | None = None) -> None:
+        """
+        Loads the classifier from the given or the configured model file
+        """
+        import mmap
+
         from sklearn.exceptions import InconsistentVersionWarning
 
         # Catch warnings for processing
         with warnings.catch_warnings(record=True) as w:
-            with Path(settings.MODEL_FILE).open("rb") as f:
+            with Path(model_file or settings.MODEL_FILE).open("rb") as f:
                 schema_version = pickle.load(f)
 
                 if schema_version != self.FORMAT_VERSION:
@@ -117,14 +815,33 @@ class DocumentClassifier:
                     try:
                         self.last_doc_change_time = pickle.load(f)
                         self.last_auto_type_hash = pickle.load(f)
-
-                        self.data_vectorizer = pickle.load(f)
-                        self.tags_binarizer = pickle.load(f)
-
-                        self.tags_classifier = pickle.load(f)
-                        self.correspondent_classifier = pickle.load(f)
-                        self.document_type_classifier = pickle.load(f)
-                        self.storage_path_classifier = pickle.load(f)
+                        self.last_full_train_time = pickle.load(f)
+
+                        estimators = {name: pickle.load(f) for name in self._ESTIMATORS}
+                        array_table: dict[str, tuple[str, tuple[int, ...], int]] = (
+                            pickle.load(f)
+                        )
+                        data_start = _align_offset(f.tell())
+
+                        # Map the file, the arrays are views into the mapping and
+                        # are paged in by the OS on demand and shared between
+                        # all processes using the same model file
+                        mapped_file = (
+                            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                            if array_table
+                            else None
+                        )
+                        arrays = {
+                            key: _array_from_buffer(
+                                mapped_file,
+                                dtype,
+                                shape,
+                                data_start + offset,
+                            )
+                            for key, (dtype, shape, offset) in array_table.items()
+                        }
+                        for name, estimator in estimators.items():
+                            setattr(self, name, _attach_arrays(estimator, arrays))
                     except Exception as err:
                         raise ClassifierModelCorruptError from err
 
@@ -143,81 +860,153 @@ class DocumentClassifier:
                 ):
                     raise IncompatibleClassifierVersionError("sklearn version update")
 
-    def save(self) -> None:
-        target_file: Path = settings.MODEL_FILE
+    def save(self, target_file: Path | None = None) -> None:
+        """
+        Saves the classifier to the given or the configured model file.
+
+        The file contains a small pickle stream with the format version, training
+        information and the estimators, with their large arrays (vocabulary,
+        binarizer classes and network weights) replaced by references.  The
+        arrays follow as raw, aligned data, so they can be memory mapped on load
+        """
+        import numpy as np
+
+        target_file = Path(target_file or settings.MODEL_FILE)
         target_file_temp: Path = target_file.with_suffix(".pickle.part")
 
+        arrays: dict[str, ndarray] = {}
+        estimators = {
+            name: _detach_arrays(name, getattr(self, name), arrays)
+            for name in self._ESTIMATORS
+        }
+
+        array_table: dict[str, tuple[str, tuple[int, ...], int]] = {}
+        offset = 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            arrays[key] = array
+            offset = _align_offset(offset)
+            array_table[key] = (array.dtype.str, array.shape, offset)
+            offset += array.nbytes
+
         with target_file_temp.open("wb") as f:
             pickle.dump(self.FORMAT_VERSION, f)
 
             pickle.dump(self.last_doc_change_time, f)
             pickle.dump(self.last_auto_type_hash, f)
+            pickle.dump(self.last_full_train_time, f)
 
-            pickle.dump(self.data_vectorizer, f)
+            for name in self._ESTIMATORS:
+                pickle.dump(estimators[name], f)
 
-            pickle.dump(self.tags_binarizer, f)
-            pickle.dump(self.tags_classifier, f)
+            pickle.dump(array_table, f)
 
-            pickle.dump(self.correspondent_classifier, f)
-            pickle.dump(self.document_type_classifier, f)
-            pickle.dump(self.storage_path_classifier, f)
+            data_start = _align_offset(f.tell())
+            for key, array in arrays.items():
+                array_start = data_start + array_table[key][2]
+                f.write(b"\0" * (array_start - f.tell()))
+                f.write(memoryview(array).cast("B"))
 
         target_file_temp.rename(target_file)
 
-    def train(self) -> bool:
+    def train(
+        self,
+        documents: QuerySet[Document] | None = None,
+        *,
+        content_cache_file: Path | None = None,
+    ) -> bool:
+        """
+        Trains the classifier with the given (by default all) documents, if
+        anything changed since the last training.  Returns if it was trained
+        """
+        from array import array
+
+        import numpy as np
+
+        start = time.perf_counter()
+        # Only a training with all documents knows which cached preprocessed
+        # contents are no longer needed
+        training_all_documents = documents is None
+        if documents is None:
+            documents = Document.objects.all()
+
         # Get non-inbox documents
-        docs_queryset = (
-            Document.objects.exclude(
-                tags__is_inbox_tag=True,
-            )
-            .select_related("document_type", "correspondent", "storage_path")
-            .prefetch_related("tags")
-            .order_by("pk")
-        )
+        docs_queryset = documents.exclude(
+            tags__is_inbox_tag=True,
+        ).order_by("pk")
 
         # No documents exit to train against
         if docs_queryset.count() == 0:
             raise ValueError("No training data available.")
 
-        labels_tags = []
-        labels_correspondent = []
-        labels_document_type = []
-        labels_storage_path = []
+        labels_tags: list[list[int]] = []
+        labels_correspondent = array("q")
+        labels_document_type = array("q")
+        labels_storage_path = array("q")
+        doc_pks = array("q")
+        label_hashes = array("q")
 
         # Step 1: Extract and preprocess training data from the database.
+        # Instead of querying the labels per document, the label ids and the
+        # tags through table are streamed in primary key order
         logger.debug("Gathering data from database...")
+        auto_correspondents, auto_document_types, auto_storage_paths = (
+            set(
+                model.objects.filter(
+                    matching_algorithm=MatchingModel.MATCH_AUTO,
+                ).values_list("pk", flat=True),
+            )
+            for model in (Correspondent, DocumentType, StoragePath)
+        )
+        document_tags = (
+            Document.tags.through.objects.filter(
+                document__in=docs_queryset,
+                tag__matching_algorithm=MatchingModel.MATCH_AUTO,
+            )
+            .order_by("document_id", "tag_id")
+            .values_list("document_id", "tag_id")
+            .iterator()
+        )
+        document_tag = next(document_tags, None)
+
+        label_ids = docs_queryset.values_list(
+            "pk",
+            "document_type_id",
+            "correspondent_id",
+            "storage_path_id",
+        ).iterator()
+
         hasher = sha256()
-        for doc in docs_queryset:
-            y = -1
-            dt = doc.document_type
-            if dt and dt.matching_algorithm == MatchingModel.MATCH_AUTO:
-                y = dt.pk
-            hasher.update(y.to_bytes(4, "little", signed=True))
+        for pk, document_type_id, correspondent_id, storage_path_id in label_ids:
+            doc_pks.append(pk)
+            label = array("i")
+
+            y = document_type_id if document_type_id in auto_document_types else -1
+            label.append(y)
             labels_document_type.append(y)
 
-            y = -1
-            cor = doc.correspondent
-            if cor and cor.matching_algorithm == MatchingModel.MATCH_AUTO:
-                y = cor.pk
-            hasher.update(y.to_bytes(4, "little", signed=True))
+            y = correspondent_id if correspondent_id in auto_correspondents else -1
+            label.append(y)
             labels_correspondent.append(y)
 
-            tags: list[int] = list(
-                doc.tags.filter(matching_algorithm=MatchingModel.MATCH_AUTO)
-                .order_by("pk")
-                .values_list("pk", flat=True),
-            )
-            for tag in tags:
-                hasher.update(tag.to_bytes(4, "little", signed=True))
+            tags: list[int] = []
+            while document_tag is not None and document_tag[0] <= pk:
+                if document_tag[0] == pk:
+                    tags.append(document_tag[1])
+                document_tag = next(document_tags, None)
+            label.extend(tags)
             labels_tags.append(tags)
 
-            y = -1
-            sp = doc.storage_path
-            if sp and sp.matching_algorithm == MatchingModel.MATCH_AUTO:
-                y = sp.pk
-            hasher.update(y.to_bytes(4, "little", signed=True))
+            y = storage_path_id if storage_path_id in auto_storage_paths else -1
+            label.append(y)
             labels_storage_path.append(y)
 
+            label_bytes = label.tobytes()
+            hasher.update(label_bytes)
+            label_hashes.append(TrainedLabels.hash(label_bytes))
+
+        self.train_times = {"gather_data": time.perf_counter() - start}
+
         labels_tags_unique = {tag for tags in labels_tags for tag in tags}
 
         num_tags = len(labels_tags_unique)
@@ -256,97 +1045,188 @@ class DocumentClassifier:
             f"{num_document_types} document type(s). {num_storage_paths} storage path(s)",
         )
 
-        from sklearn.feature_extraction.text import CountVectorizer
-        from sklearn.neural_network import MLPClassifier
+        if self._incremental_update_possible(
+            labels_tags,
+            labels_correspondent,
+            labels_document_type,
+            labels_storage_path,
+        ):
+            logger.debug("Updating classifiers with changed documents...")
+            # Documents whose content changed, or whose labels changed, which
+            # does not always change the modification time
+            changed_ids = set(
+                docs_queryset.filter(
+                    modified__gt=self.last_doc_change_time,
+                ).values_list("pk", flat=True),
+            )
+            changed_ids.update(
+                self.trained_labels.changed(
+                    np.frombuffer(doc_pks, dtype="int64"),
+                    np.frombuffer(label_hashes, dtype="int64"),
+                ).tolist(),
+            )
+            self._update_incrementally(
+                sorted(changed_ids),
+                dict(
+                    zip(
+                        doc_pks,
+                        zip(
+                            labels_tags,
+                            labels_correspondent,
+                            labels_document_type,
+                            labels_storage_path,
+                        ),
+                    ),
+                ),
+            )
+            self._set_training_info(latest_doc_change, hasher, doc_pks, label_hashes)
+            return True
+
         from sklearn.preprocessing import LabelBinarizer
         from sklearn.preprocessing import MultiLabelBinarizer
 
         # Step 2: vectorize data
         logger.debug("Vectorizing data...")
+        start = time.perf_counter()
+
+        content_cache = PreprocessedContentCache(
+            Path(content_cache_file or settings.CLASSIFIER_CONTENT_CACHE),
+            self.preprocess_content,
+        )
 
         def content_generator() -> Iterator[str]:
             """
-            Generates the content for documents, but once at a time
+            Generates the content for documents, but once at a time.  Only
+            documents with changed content are actually preprocessed
             """
-            for doc in docs_queryset:
-                yield self.preprocess_content(doc.content)
+            yield from content_cache.preprocess_all(
+                docs_queryset.values_list("pk", "content").iterator(),
+                prune=training_all_documents,
+            )
 
-        self.data_vectorizer = CountVectorizer(
-            analyzer="word",
-            ngram_range=(1, 2),
-            min_df=0.01,
-        )
+        self.data_vectorizer = self._create_vectorizer()
 
-        data_vectorized: ndarray = self.data_vectorizer.fit_transform(
-            content_generator(),
-        )
+        if isinstance(self.data_vectorizer, ChunkedHashingVectorizer):
+            # Two passes over the documents, the second one uses the
+            # preprocessed content cached by the first one
+            self.data_vectorizer.fit(content_generator())
+            data_vectorized: ndarray = self.data_vectorizer.transform(
+                content_generator(),
+            )
+        else:
+            data_vectorized = self.data_vectorizer.fit_transform(
+                content_generator(),
+            )
 
-        # See the notes here:
-        # https://scikit-learn.org/stable/modules/generated/sklearn.feature_extraction.text.CountVectorizer.html
-        # This attribute isn't needed to function and can be large
-        self.data_vectorizer.stop_words_ = None
+            # See the notes here:
+            # https://scikit-learn.org/stable/modules/generated/sklearn.feature_extraction.text.CountVectorizer.html
+            # This attribute isn't needed to function and can be large
+            self.data_vectorizer.stop_words_ = None
+
+        self.train_times["vectorize"] = time.perf_counter() - start
+        logger.debug(
+            f"Preprocessed {content_cache.misses} document(s), reused "
+            f"{content_cache.hits} cached document(s), "
+            f"{data_vectorized.shape[1]} feature(s)",
+        )
 
         # Step 3: train the classifiers
+        heads: dict[str, ndarray] = {}
         if num_tags > 0:
-            logger.debug("Training tags classifier...")
-
             if num_tags == 1:
                 # Special case where only one tag has auto:
                 # Fallback to binary classification.
-                labels_tags = [
-                    label[0] if len(label) == 1 else -1 for label in labels_tags
-                ]
+                labels_tags = self._single_tag_labels(labels_tags)
                 self.tags_binarizer = LabelBinarizer()
-                labels_tags_vectorized: ndarray = self.tags_binarizer.fit_transform(
+                heads["tags_classifier"] = self.tags_binarizer.fit_transform(
                     labels_tags,
                 ).ravel()
             else:
                 self.tags_binarizer = MultiLabelBinarizer()
-                labels_tags_vectorized = self.tags_binarizer.fit_transform(labels_tags)
-
-            self.tags_classifier = MLPClassifier(tol=0.01)
-            self.tags_classifier.fit(data_vectorized, labels_tags_vectorized)
+                heads["tags_classifier"] = self.tags_binarizer.fit_transform(
+                    labels_tags,
+                )
         else:
-            self.tags_classifier = None
             logger.debug("There are no tags. Not training tags classifier.")
 
         if num_correspondents > 0:
-            logger.debug("Training correspondent classifier...")
-            self.correspondent_classifier = MLPClassifier(tol=0.01)
-            self.correspondent_classifier.fit(data_vectorized, labels_correspondent)
+            heads["correspondent_classifier"] = labels_correspondent
         else:
-            self.correspondent_classifier = None
             logger.debug(
                 "There are no correspondents. Not training correspondent classifier.",
             )
 
         if num_document_types > 0:
-            logger.debug("Training document type classifier...")
-            self.document_type_classifier = MLPClassifier(tol=0.01)
-            self.document_type_classifier.fit(data_vectorized, labels_document_type)
+            heads["document_type_classifier"] = labels_document_type
         else:
-            self.document_type_classifier = None
             logger.debug(
                 "There are no document types. Not training document type classifier.",
             )
 
         if num_storage_paths > 0:
-            logger.debug(
-                "Training storage paths classifier...",
-            )
-            self.storage_path_classifier = MLPClassifier(tol=0.01)
-            self.storage_path_classifier.fit(
-                data_vectorized,
-                labels_storage_path,
-            )
+            heads["storage_path_classifier"] = labels_storage_path
         else:
-            self.storage_path_classifier = None
             logger.debug(
                 "There are no storage paths. Not training storage path classifier.",
             )
 
+        logger.debug(f"Training {len(heads)} classifier(s)...")
+        start = time.perf_counter()
+        fitted = _fit_classifiers(
+            data_vectorized,
+            heads,
+            settings.CLASSIFIER_TRAINING_WORKERS,
+        )
+        self.train_times["fit"] = time.perf_counter() - start
+        self.fit_times = {}
+        for name in self._HEADS:
+            classifier, seconds = fitted.get(name, (None, None))
+            setattr(self, name, classifier)
+            if classifier is not None:
+                self.fit_times[name] = seconds
+                logger.info(f"Trained {name} in {seconds:.2f}s")
+
+        self.last_full_train_time = timezone.now()
+        self._set_training_info(latest_doc_change, hasher, doc_pks, label_hashes)
+
+        return True
+
+    @staticmethod
+    def _create_vectorizer():
+        """
+        Creates the configured, unfitted vectorizer for the document contents
+        """
+        if settings.CLASSIFIER_FEATURES == "hashing":
+            return ChunkedHashingVectorizer(
+                min_df=0.01,
+                max_features=settings.CLASSIFIER_MAX_FEATURES,
+                chunk_size=settings.CLASSIFIER_CHUNK_SIZE,
+            )
+
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        return CountVectorizer(
+            analyzer="word",
+            ngram_range=(1, 2),
+            min_df=0.01,
+            max_features=settings.CLASSIFIER_MAX_FEATURES,
+        )
+
+    def _set_training_info(
+        self,
+        latest_doc_change: datetime,
+        hasher,
+        doc_pks: array,
+        label_hashes: array,
+    ) -> None:
+        import numpy as np
+
         self.last_doc_change_time = latest_doc_change
         self.last_auto_type_hash = hasher.digest()
+        self.trained_labels = TrainedLabels(
+            np.array(doc_pks, dtype="int64"),
+            np.array(label_hashes, dtype="int64"),
+        )
 
         # Set the classifier information into the cache
         # Caching for 50 minutes, so slightly less than the normal retrain time
@@ -354,8 +1234,127 @@ class DocumentClassifier:
         cache.set(CLASSIFIER_HASH_KEY, hasher.hexdigest(), CACHE_50_MINUTES)
         cache.set(CLASSIFIER_VERSION_KEY, self.FORMAT_VERSION, CACHE_50_MINUTES)
 
+    @staticmethod
+    def _single_tag_labels(labels_tags: list[list[int]]) -> list[int]:
+        """
+        With only one AUTO tag, the tags are a binary classification of that
+        tag (or -1) per document
+        """
+        return [label[0] if len(label) == 1 else -1 for label in labels_tags]
+
+    def _incremental_update_possible(
+        self,
+        labels_tags: list[list[int]],
+        labels_correspondent: list[int],
+        labels_document_type: list[int],
+        labels_storage_path: list[int],
+    ) -> bool:
+        """
+        Checks if the existing classifiers can be updated with just the changed
+        documents.  This requires an earlier full training, which isn't too long
+        ago and the same labels (classes) as back then
+        """
+        if (
+            not settings.CLASSIFIER_INCREMENTAL_UPDATES
+            or self.data_vectorizer is None
+            or self.last_doc_change_time is None
+            or self.last_full_train_time is None
+            or self.trained_labels is None
+        ):
+            return False
+
+        if timezone.now() - self.last_full_train_time >= timedelta(
+            days=settings.CLASSIFIER_FULL_RETRAIN_DAYS,
+        ):
+            logger.debug("Full training is due")
+            return False
+
+        # The vectorizers keep the maximum number of features they were
+        # created with, which is saved with the model
+        if (
+            type(self.data_vectorizer) is not type(self._create_vectorizer())
+            or self.data_vectorizer.max_features != settings.CLASSIFIER_MAX_FEATURES
+        ):
+            logger.debug("Feature extraction changed, full training is required")
+            return False
+
+        def classes(estimator) -> set[int]:
+            return set() if estimator is None else set(estimator.classes_.tolist())
+
+        def labels(values: list[int]) -> set[int]:
+            # Without any label, there is no classifier
+            return set(values) if set(values) - {-1} else set()
+
+        tags = {tag for tags in labels_tags for tag in tags}
+        if len(tags) == 1:
+            tags = set(self._single_tag_labels(labels_tags))
+
+        if (
+            classes(self.tags_binarizer if self.tags_classifier else None) != tags
+            or classes(self.correspondent_classifier) != labels(labels_correspondent)
+            or classes(self.document_type_classifier) != labels(labels_document_type)
+            or classes(self.storage_path_classifier) != labels(labels_storage_path)
+        ):
+            logger.debug("Labels changed, full training is required")
+            return False
+
         return True
 
+    def _update_incrementally(
+        self,
+        changed_ids: list[int],
+        labels: dict[int, tuple[list[int], int, int, int]],
+    ) -> None:
+        """
+        Updates the classifiers with the documents of the given IDs, using the
+        vocabulary of the last full training
+        """
+        from sklearn.preprocessing import LabelBinarizer
+
+        heads = (
+            self.tags_classifier,
+            self.correspondent_classifier,
+            self.document_type_classifier,
+            self.storage_path_classifier,
+        )
+        for classifier in heads:
+            if classifier is not None:
+                # The loaded arrays are read only views of the model file
+                _ensure_writable(classifier)
+
+        # Skip documents added since the labels were gathered
+        changed_ids = [pk for pk in changed_ids if pk in labels]
+        for start in range(0, len(changed_ids), self.INCREMENTAL_BATCH_SIZE):
+            batch = list(
+                Document.objects.filter(
+                    pk__in=changed_ids[start : start + self.INCREMENTAL_BATCH_SIZE],
+                ).values_list("pk", "content"),
+            )
+            if not batch:
+                continue
+            logger.debug(f"Updating classifiers with {len(batch)} document(s)...")
+            X = self._vectorize([content for _, content in batch])
+            tags, correspondents, document_types, storage_paths = zip(
+                *(labels[pk] for pk, _ in batch),
+            )
+
+            if self.tags_classifier is not None:
+                if isinstance(self.tags_binarizer, LabelBinarizer):
+                    labels_tags_vectorized = self.tags_binarizer.transform(
+                        self._single_tag_labels(tags),
+                    ).ravel()
+                else:
+                    labels_tags_vectorized = self.tags_binarizer.transform(tags)
+                self.tags_classifier.partial_fit(X, labels_tags_vectorized)
+
+            for classifier, y in (
+                (self.correspondent_classifier, correspondents),
+                (self.document_type_classifier, document_types),
+                (self.storage_path_classifier, storage_paths),
+            ):
+                if classifier is not None:
+                    classifier.partial_fit(X, list(y))
+
     def preprocess_content(self, content: str) -> str:  # pragma: no cover
         """
         Process to contents of a document, distilling it down into
@@ -419,56 +1418,122 @@ class DocumentClassifier:
 
         return content
 
+    def _vectorize(self, contents: list[str]):
+        """
+        Preprocesses and vectorizes the given contents into one sparse matrix,
+        one row per content
+        """
+        return self.data_vectorizer.transform(
+            [self.preprocess_content(content) for content in contents],
+        )
+
+    @staticmethod
+    def _predict_ids(classifier, X) -> list[int | None]:
+        """
+        Predicts a single label per row of X, with -1 (no label) as None
+        """
+        if not classifier:
+            return [None] * X.shape[0]
+        return [
+            int(label_id) if label_id != -1 else None
+            for label_id in classifier.predict(X)
+        ]
+
+    def _predict_tag_ids(self, X) -> list[list[int]]:
+        """
+        Predicts the list of tag ids per row of X
+        """
+        from sklearn.utils.multiclass import type_of_target
+
+        if not self.tags_classifier:
+            return [[] for _ in range(X.shape[0])]
+
+        y = self.tags_classifier.predict(X)
+        tags_ids = self.tags_binarizer.inverse_transform(y)
+        if type_of_target(y).startswith("multilabel"):
+            # the usual case when there are multiple tags.
+            return [[int(tag_id) for tag_id in row] for row in tags_ids]
+        elif type_of_target(y) == "binary":
+            # This is for when we have binary classification with only one
+            # tag and the result is to assign this tag (or not, with -1).
+            return [[int(tag_id)] if tag_id != -1 else [] for tag_id in tags_ids]
+        else:
+            # Usually binary as well with -1 as the result, but we're
+            # going to catch everything else here as well.
+            return [[] for _ in range(X.shape[0])]
+
+    def predict_all(self, contents: list[str]) -> list[ClassifierPredictions]:
+        """
+        Predicts correspondent, document type, tags and storage path of all
+        the given contents at once.
+
+        Each content is preprocessed and vectorized only once and every
+        classifier predicts the whole batch in one go, which is a lot cheaper
+        than predicting each value for each document on its own.
+        """
+        if not contents or not any(
+            [
+                self.correspondent_classifier,
+                self.document_type_classifier,
+                self.tags_classifier,
+                self.storage_path_classifier,
+            ],
+        ):
+            return [ClassifierPredictions() for _ in contents]
+
+        X = self._vectorize(contents)
+
+        return [
+            ClassifierPredictions(
+                correspondent=correspondent,
+                document_type=document_type,
+                tags=tags,
+                storage_path=storage_path,
+            )
+            for correspondent, document_type, tags, storage_path in zip(
+                self._predict_ids(self.correspondent_classifier, X),
+                self._predict_ids(self.document_type_classifier, X),
+                self._predict_tag_ids(X),
+                self._predict_ids(self.storage_path_classifier, X),
+            )
+        ]
+
+    def predict(self, content: str) -> ClassifierPredictions:
+        """
+        Predicts correspondent, document type, tags and storage path of a single
+        document content
+        """
+        return self.predict_all([content])[0]
+
     def predict_correspondent(self, content: str) -> int | None:
         if self.correspondent_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            correspondent_id = self.correspondent_classifier.predict(X)
-            if correspondent_id != -1:
-                return correspondent_id
-            else:
-                return None
+            return self._predict_ids(
+                self.correspondent_classifier,
+                self._vectorize([content]),
+            )[0]
         else:
             return None
 
     def predict_document_type(self, content: str) -> int | None:
         if self.document_type_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            document_type_id = self.document_type_classifier.predict(X)
-            if document_type_id != -1:
-                return document_type_id
-            else:
-                return None
+            return self._predict_ids(
+                self.document_type_classifier,
+                self._vectorize([content]),
+            )[0]
         else:
             return None
 
     def predict_tags(self, content: str) -> list[int]:
-        from sklearn.utils.multiclass import type_of_target
-
         if self.tags_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            y = self.tags_classifier.predict(X)
-            tags_ids = self.tags_binarizer.inverse_transform(y)[0]
-            if type_of_target(y).startswith("multilabel"):
-                # the usual case when there are multiple tags.
-                return list(tags_ids)
-            elif type_of_target(y) == "binary" and tags_ids != -1:
-                # This is for when we have binary classification with only one
-                # tag and the result is to assign this tag.
-                return [tags_ids]
-            else:
-                # Usually binary as well with -1 as the result, but we're
-                # going to catch everything else here as well.
-                return []
+            return self._predict_tag_ids(self._vectorize([content]))[0]
         else:
             return []
 
     def predict_storage_path(self, content: str) -> int | None:
         if self.storage_path_classifier:
-            X = self.data_vectorizer.transform([self.preprocess_content(content)])
-            storage_path_id = self.storage_path_classifier.predict(X)
-            if storage_path_id != -1:
-                return storage_path_id
-            else:
-                return None
+            return self._predict_ids(
+                self.storage_path_classifier,
+                self._vectorize([content]),
+            )[0]
         else:
             return None
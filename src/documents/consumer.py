@@ -569,11 +569,17 @@ class ConsumerPlugin(
                 # If we get here, it was successful. Proceed with post-consume
                 # hooks. If they fail, nothing will get changed.
 
+                # Predict everything at once, instead of once per handler
+                predictions = (
+                    classifier.predict(document.content) if classifier else None
+                )
+
                 document_consumption_finished.send(
                     sender=self.__class__,
                     document=document,
                     logging_group=self.logging_group,
                     classifier=classifier,
+                    predictions=predictions,
                     original_file=self.unmodified_original
                     if self.unmodified_original
                     else self.working_copy,
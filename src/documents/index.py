@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import atexit
+import heapq
+import itertools
 import logging
 import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
 from collections import Counter
+from collections import OrderedDict
+from collections import defaultdict
 from contextlib import contextmanager
 from datetime import datetime
 from datetime import timezone
@@ -10,8 +22,16 @@ from shutil import rmtree
 from typing import TYPE_CHECKING
 from typing import Literal
 
+import tqdm
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db import transaction
 from django.utils import timezone as django_timezone
+from django.utils.module_loading import import_string
+from guardian.models import GroupObjectPermission
+from guardian.models import UserObjectPermission
 from guardian.shortcuts import get_users_with_perms
 from whoosh import classify
 from whoosh import highlight
@@ -30,27 +50,80 @@ from whoosh.index import create_in
 from whoosh.index import exists_in
 from whoosh.index import open_dir
 from whoosh.qparser import MultifieldParser
-from whoosh.qparser import QueryParser
 from whoosh.qparser.dateparse import DateParserPlugin
 from whoosh.qparser.dateparse import English
-from whoosh.qparser.plugins import FieldsPlugin
-from whoosh.scoring import TF_IDF
+from whoosh.reading import SegmentReader
+from whoosh.searching import Results
+from whoosh.searching import ResultsPage
+from whoosh.util.times import datetime_to_long
 from whoosh.util.times import timespan
+from whoosh.writing import OPTIMIZE
 from whoosh.writing import AsyncWriter
-
+from whoosh.writing import LockError
+
+from documents import similarity
+from documents.caching import SearchResultsCacheData
+from documents.caching import get_search_facets_cache
+from documents.caching import get_search_facets_cache_key
+from documents.caching import get_search_filter_cache
+from documents.caching import get_search_filter_cache_key
+from documents.caching import get_search_results_cache
+from documents.caching import get_search_results_cache_key
+from documents.caching import set_search_facets_cache
+from documents.caching import set_search_filter_cache
+from documents.caching import set_search_results_cache
 from documents.models import CustomFieldInstance
 from documents.models import Document
 from documents.models import Note
 from documents.models import User
+from documents.permissions import get_objects_for_user_owner_aware
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+
     from django.db.models import QuerySet
+    from whoosh.codec.base import Segment
+    from whoosh.filedb.filestore import Storage
     from whoosh.reading import IndexReader
-    from whoosh.searching import ResultsPage
     from whoosh.searching import Searcher
 
+    from documents.models import Tag
+
 logger = logging.getLogger("paperless.index")
 
+# Number of documents loaded from the database at once while reindexing
+REINDEX_CHUNK_SIZE = 1000
+# Number of idle searchers kept open per process, see open_index_searcher
+SEARCHER_POOL_SIZE = 4
+# Minimum number of top hits of a search which are cached, see DelayedQuery
+SEARCH_RESULTS_CACHE_HITS = 500
+# Number of similar documents found by a "more like this" query, if there is
+# a similarity index
+MORE_LIKE_THIS_LIMIT = 100
+
+# Fields of the IDs of the objects the search results are counted by
+FACET_FIELDS = (
+    "correspondent_id",
+    "tag_id",
+    "type_id",
+    "path_id",
+    "custom_fields_id",
+)
+
+# Number of segments merged at once by the tiered merge policy, which is also
+# the ratio of the sizes of the segments of consecutive tiers
+MERGE_FACTOR = 10
+# Segments up to this size in bytes are all in the lowest tier
+MERGE_FLOOR_SIZE = 1024 * 1024
+# Segments with at least this share of deleted documents are rewritten
+MERGE_DELETED_RATIO = 0.2
+# Commits only merge segments themselves if there are this many, because the
+# scheduled merges are not running or fell far behind
+MAX_UNMERGED_SEGMENTS = 100
+# Seconds a scheduled merge waits for the writers of the index
+MERGE_LOCK_TIMEOUT = 10.0
+
 
 def get_schema() -> Schema:
     return Schema(
@@ -98,6 +171,7 @@ def open_index(*, recreate=False) -> FileIndex:
         logger.exception("Error while opening the index, recreating.")
 
     # create_in doesn't handle corrupted indexes very well, remove the directory entirely first
+    clear_index_searchers()
     if settings.INDEX_DIR.is_dir():
         rmtree(settings.INDEX_DIR)
     settings.INDEX_DIR.mkdir(parents=True, exist_ok=True)
@@ -115,29 +189,273 @@ def open_index_writer(*, optimize=False) -> AsyncWriter:
         logger.exception(str(e))
         writer.cancel()
     finally:
-        writer.commit(optimize=optimize)
+        writer.commit(mergetype=OPTIMIZE if optimize else _merge_if_behind)
+
+
+def get_segment_sizes(storage: Storage, segments: list[Segment]) -> list[int]:
+    """
+    Returns the size in bytes of the files of each of the given segments
+    """
+    file_lengths = {name: storage.file_length(name) for name in storage.list()}
+    return [
+        sum(
+            length
+            for name, length in file_lengths.items()
+            if name.startswith(f"{segment.segment_id()}.")
+        )
+        for segment in segments
+    ]
+
+
+def get_index_segments(ix: FileIndex) -> list[Segment]:
+    """
+    Returns the segments of the latest generation of the index
+    """
+    with ix.reader() as reader:
+        # An empty index has no segment readers
+        return [
+            segment_reader.segment()
+            for segment_reader, _ in reader.leaf_readers()
+            if isinstance(segment_reader, SegmentReader)
+        ]
+
+
+def get_segment_tier(size: int) -> int:
+    tier = 0
+    while size > MERGE_FLOOR_SIZE * MERGE_FACTOR**tier:
+        tier += 1
+    return tier
+
+
+def select_merges(
+    segments: list[Segment],
+    sizes: list[int],
+) -> list[list[tuple[Segment, int]]]:
+    """
+    The tiered merge policy: returns the groups of segments which should be
+    merged, each into a single segment, with their sizes, smallest first.
+
+    Segments of about the same size are in the same tier and every
+    MERGE_FACTOR segments of a tier are merged into one segment of the next
+    tier, so the number of segments only grows with the logarithm of the size
+    of the index, and every document is merged about once per tier.  Segments
+    with many deleted documents are rewritten on their own.
+    """
+    tiers: dict[int, list[tuple[Segment, int]]] = defaultdict(list)
+    for segment, size in zip(segments, sizes):
+        tiers[get_segment_tier(size)].append((segment, size))
+
+    merges = []
+    rewrites = []
+    for tier in sorted(tiers):
+        members = sorted(tiers[tier], key=lambda member: member[1])
+        while len(members) >= MERGE_FACTOR:
+            merges.append(members[:MERGE_FACTOR])
+            members = members[MERGE_FACTOR:]
+        rewrites.extend(
+            [(segment, size)]
+            for segment, size in members
+            if segment.deleted_count() >= segment.doc_count_all() * MERGE_DELETED_RATIO
+        )
+    merges.extend(rewrites)
+    return sorted(merges, key=lambda group: sum(size for _, size in group))
+
+
+def _merge_segment_group(
+    writer,
+    segments: list[Segment],
+    group: list[tuple[Segment, int]],
+) -> list[Segment]:
+    merged_ids = {segment.segment_id() for segment, _ in group}
+    for segment, _ in group:
+        reader = SegmentReader(writer.storage, writer.schema, segment)
+        writer.add_reader(reader)
+        reader.close()
+    return [segment for segment in segments if segment.segment_id() not in merged_ids]
+
+
+def _merge_if_behind(writer, segments: list[Segment]) -> list[Segment]:
+    """
+    The merge policy of regular commits: merging is left to the scheduled
+    merge_segments, so commits stay fast, unless there are so many segments
+    that searches would suffer.
+    """
+    if len(segments) < MAX_UNMERGED_SEGMENTS:
+        return segments
+    merges = select_merges(segments, get_segment_sizes(writer.storage, segments))
+    if not merges:
+        return segments
+    return _merge_segment_group(writer, segments, merges[0])
+
+
+def _merge_next_segments(ix: FileIndex, max_bytes: int) -> int | None:
+    """
+    Commits the smallest merge of the tiered merge policy of up to max_bytes.
+    Returns the size of the merged segments, or None if there is nothing to
+    merge or the index is locked.
+    """
+    try:
+        writer = ix.writer(timeout=MERGE_LOCK_TIMEOUT)
+    except LockError:
+        logger.info("The index is locked, postponing merging its segments")
+        return None
+
+    merges = select_merges(
+        writer.segments,
+        get_segment_sizes(writer.storage, writer.segments),
+    )
+    group = next(
+        (group for group in merges if sum(size for _, size in group) <= max_bytes),
+        None,
+    )
+    if group is None:
+        writer.cancel()
+        return None
+
+    writer.commit(
+        mergetype=lambda writer, segments: _merge_segment_group(
+            writer,
+            segments,
+            group,
+        ),
+    )
+    return sum(size for _, size in group)
+
+
+def merge_segments(*, max_bytes: int, max_seconds: float) -> tuple[int, int]:
+    """
+    Merges segments of the index with the tiered merge policy, until there is
+    nothing left to merge, max_bytes of segments were merged or max_seconds
+    passed.  Every merge is committed on its own, so writers only wait for one
+    merge at a time.
+
+    Returns the number of merges and the size of the merged segments.
+    """
+    ix = open_index()
+    start = time.monotonic()
+    merges = 0
+    merged_bytes = 0
+    while time.monotonic() - start < max_seconds:
+        size = _merge_next_segments(ix, max_bytes - merged_bytes)
+        if size is None:
+            break
+        merges += 1
+        merged_bytes += size
+
+    logger.info(
+        f"Merged {merges} groups of index segments of {merged_bytes} bytes "
+        f"in {time.monotonic() - start:.1f}s",
+    )
+    return merges, merged_bytes
+
+
+class SearcherPool:
+    """
+    Keeps searchers of the index open between searches, so opening the index
+    and the caches of the readers (for sorting, for example) are reused.
+
+    Each searcher is used by one thread at a time.  When taken from the pool,
+    a searcher is refreshed if the index generation changed since, which only
+    opens the changed segments.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.index_dir = settings.INDEX_DIR
+        self._lock = threading.Lock()
+        self._idle: list[Searcher] = []
+
+    def acquire(self) -> Searcher:
+        with self._lock:
+            searcher = self._idle.pop() if self._idle else None
+        if searcher is None:
+            return open_index().searcher()
+        try:
+            return searcher.refresh()
+        except Exception:
+            # For example, the index was recreated meanwhile
+            logger.debug("Could not refresh the index searcher, reopening")
+            searcher.close()
+            return open_index().searcher()
+
+    def release(self, searcher: Searcher) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(searcher)
+                return
+        searcher.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            searchers, self._idle = self._idle, []
+        for searcher in searchers:
+            searcher.close()
+
+
+_searcher_pool: SearcherPool | None = None
+_searcher_pool_lock = threading.Lock()
+
+
+def _reset_searcher_pool() -> None:
+    # The open files are shared with the parent, so a child opens its own
+    global _searcher_pool
+    _searcher_pool = None
+
+
+os.register_at_fork(after_in_child=_reset_searcher_pool)
+
+
+def _get_searcher_pool() -> SearcherPool:
+    global _searcher_pool
+    with _searcher_pool_lock:
+        if _searcher_pool is None or _searcher_pool.index_dir != settings.INDEX_DIR:
+            if _searcher_pool is not None:
+                _searcher_pool.clear()
+            _searcher_pool = SearcherPool(SEARCHER_POOL_SIZE)
+        return _searcher_pool
+
+
+def clear_index_searchers() -> None:
+    """
+    Closes the idle searchers of this process
+    """
+    if _searcher_pool is not None:
+        _searcher_pool.clear()
 
 
 @contextmanager
 def open_index_searcher() -> Searcher:
-    searcher = open_index().searcher()
+    """
+    Provides an up to date searcher of the index, which is kept open for
+    later searches afterwards
+    """
+    pool = _get_searcher_pool()
+    searcher = pool.acquire()
 
     try:
         yield searcher
-    finally:
+    except BaseException:
         searcher.close()
-
-
-def update_document(writer: AsyncWriter, doc: Document) -> None:
-    tags = ",".join([t.name for t in doc.tags.all()])
-    tags_ids = ",".join([str(t.id) for t in doc.tags.all()])
-    notes = ",".join([str(c.note) for c in Note.objects.filter(document=doc)])
-    custom_fields = ",".join(
-        [str(c) for c in CustomFieldInstance.objects.filter(document=doc)],
-    )
-    custom_fields_ids = ",".join(
-        [str(f.field.id) for f in CustomFieldInstance.objects.filter(document=doc)],
-    )
+        raise
+    pool.release(searcher)
+
+
+def get_document_fields(
+    doc: Document,
+    *,
+    tags: list[Tag],
+    notes: list[Note],
+    custom_fields: list[CustomFieldInstance],
+    viewer_ids: Iterable[int],
+) -> dict:
+    """
+    Returns the index fields of the given document with its related objects
+    """
+    tags_names = ",".join([t.name for t in tags])
+    tags_ids = ",".join([str(t.id) for t in tags])
+    notes_text = ",".join([str(c.note) for c in notes])
+    custom_fields_text = ",".join([str(c) for c in custom_fields])
+    custom_fields_ids = ",".join([str(f.field.id) for f in custom_fields])
     asn: int | None = doc.archive_serial_number
     if asn is not None and (
         asn < Document.ARCHIVE_SERIAL_NUMBER_MIN
@@ -150,48 +468,213 @@ def update_document(writer: AsyncWriter, doc: Document) -> None:
             f"{Document.ARCHIVE_SERIAL_NUMBER_MAX:,}.",
         )
         asn = 0
+    viewers: str = ",".join([str(user_id) for user_id in viewer_ids])
+    return {
+        "id": doc.pk,
+        "title": doc.title,
+        "content": doc.content,
+        "correspondent": doc.correspondent.name if doc.correspondent else None,
+        "correspondent_id": doc.correspondent.id if doc.correspondent else None,
+        "has_correspondent": doc.correspondent is not None,
+        "tag": tags_names if tags_names else None,
+        "tag_id": tags_ids if tags_ids else None,
+        "has_tag": len(tags_names) > 0,
+        "type": doc.document_type.name if doc.document_type else None,
+        "type_id": doc.document_type.id if doc.document_type else None,
+        "has_type": doc.document_type is not None,
+        "created": doc.created,
+        "added": doc.added,
+        "asn": asn,
+        "modified": doc.modified,
+        "path": doc.storage_path.name if doc.storage_path else None,
+        "path_id": doc.storage_path.id if doc.storage_path else None,
+        "has_path": doc.storage_path is not None,
+        "notes": notes_text,
+        "num_notes": len(notes_text),
+        "custom_fields": custom_fields_text,
+        "custom_field_count": len(custom_fields),
+        "has_custom_fields": len(custom_fields_text) > 0,
+        "custom_fields_id": custom_fields_ids if custom_fields_ids else None,
+        "owner": doc.owner.username if doc.owner else None,
+        "owner_id": doc.owner.id if doc.owner else None,
+        "has_owner": doc.owner is not None,
+        "viewer_id": viewers if viewers else None,
+        "checksum": doc.checksum,
+        "page_count": doc.page_count,
+        "original_filename": doc.original_filename,
+        "is_shared": len(viewers) > 0,
+    }
+
+
+def update_document(writer: AsyncWriter, doc: Document) -> None:
     users_with_perms = get_users_with_perms(
         doc,
         only_with_perms_in=["view_document"],
     )
-    viewer_ids: str = ",".join([str(u.id) for u in users_with_perms])
     writer.update_document(
-        id=doc.pk,
-        title=doc.title,
-        content=doc.content,
-        correspondent=doc.correspondent.name if doc.correspondent else None,
-        correspondent_id=doc.correspondent.id if doc.correspondent else None,
-        has_correspondent=doc.correspondent is not None,
-        tag=tags if tags else None,
-        tag_id=tags_ids if tags_ids else None,
-        has_tag=len(tags) > 0,
-        type=doc.document_type.name if doc.document_type else None,
-        type_id=doc.document_type.id if doc.document_type else None,
-        has_type=doc.document_type is not None,
-        created=doc.created,
-        added=doc.added,
-        asn=asn,
-        modified=doc.modified,
-        path=doc.storage_path.name if doc.storage_path else None,
-        path_id=doc.storage_path.id if doc.storage_path else None,
-        has_path=doc.storage_path is not None,
-        notes=notes,
-        num_notes=len(notes),
-        custom_fields=custom_fields,
-        custom_field_count=len(doc.custom_fields.all()),
-        has_custom_fields=len(custom_fields) > 0,
-        custom_fields_id=custom_fields_ids if custom_fields_ids else None,
-        owner=doc.owner.username if doc.owner else None,
-        owner_id=doc.owner.id if doc.owner else None,
-        has_owner=doc.owner is not None,
-        viewer_id=viewer_ids if viewer_ids else None,
-        checksum=doc.checksum,
-        page_count=doc.page_count,
-        original_filename=doc.original_filename,
-        is_shared=len(viewer_ids) > 0,
+        **get_document_fields(
+            doc,
+            tags=list(doc.tags.all()),
+            notes=list(Note.objects.filter(document=doc)),
+            custom_fields=list(CustomFieldInstance.objects.filter(document=doc)),
+            viewer_ids=[u.id for u in users_with_perms],
+        ),
     )
 
 
+def get_viewer_ids(document_ids: Iterable[int]) -> dict[int, set[int]]:
+    """
+    Returns the IDs of the users with the view permission of each of the given
+    documents, directly or through one of their groups, with a fixed number of
+    queries.  This matches get_users_with_perms for a single document.
+    """
+    object_pks = [str(pk) for pk in document_ids]
+    permission_filter = {
+        "content_type": ContentType.objects.get_for_model(Document),
+        "permission__codename": "view_document",
+        "object_pk__in": object_pks,
+    }
+    viewer_ids: dict[int, set[int]] = defaultdict(set)
+    for object_pk, user_id in UserObjectPermission.objects.filter(
+        **permission_filter,
+    ).values_list("object_pk", "user_id"):
+        viewer_ids[int(object_pk)].add(user_id)
+
+    group_perms = list(
+        GroupObjectPermission.objects.filter(**permission_filter).values_list(
+            "object_pk",
+            "group_id",
+        ),
+    )
+    if group_perms:
+        group_users: dict[int, set[int]] = defaultdict(set)
+        for group_id, user_id in User.groups.through.objects.filter(
+            group_id__in={group_id for _, group_id in group_perms},
+        ).values_list("group_id", "user_id"):
+            group_users[group_id].add(user_id)
+        for object_pk, group_id in group_perms:
+            viewer_ids[int(object_pk)].update(group_users[group_id])
+    return viewer_ids
+
+
+def iter_document_fields(
+    documents: QuerySet[Document],
+    *,
+    chunk_size: int = REINDEX_CHUNK_SIZE,
+) -> Iterator[dict]:
+    """
+    Yields the index fields of all the given documents.  The documents and
+    their related objects are loaded in chunks, with a fixed number of queries
+    per chunk instead of several queries per document.
+    """
+    document_ids = list(documents.order_by("pk").values_list("pk", flat=True))
+    for i in range(0, len(document_ids), chunk_size):
+        chunk_ids = document_ids[i : i + chunk_size]
+        chunk = (
+            Document.objects.filter(pk__in=chunk_ids)
+            .order_by("pk")
+            .select_related("correspondent", "document_type", "storage_path", "owner")
+            .prefetch_related("tags", "notes", "custom_fields__field")
+        )
+        viewer_ids = get_viewer_ids(chunk_ids)
+        for doc in chunk:
+            yield get_document_fields(
+                doc,
+                tags=list(doc.tags.all()),
+                notes=list(doc.notes.all()),
+                custom_fields=list(doc.custom_fields.all()),
+                viewer_ids=sorted(viewer_ids.get(doc.pk, ())),
+            )
+
+
+def reindex(
+    documents: QuerySet[Document],
+    *,
+    processes: int = 1,
+    progress_bar_disable: bool = False,
+) -> None:
+    """
+    Recreates the index with the given documents.
+
+    With more than one process, the documents are analyzed in that many
+    processes, each writing its own segment, and the segments are merged
+    into the index at the end.
+    """
+    ix = open_index(recreate=True)
+    if processes > 1:
+        writer = ix.writer(procs=processes, multisegment=False)
+    else:
+        writer = ix.writer()
+
+    with writer:
+        for fields in tqdm.tqdm(
+            iter_document_fields(documents),
+            total=documents.count(),
+            disable=progress_bar_disable,
+        ):
+            # The index is empty, so there is nothing to update
+            writer.add_document(**fields)
+
+
+def reconcile(
+    documents: QuerySet[Document],
+    *,
+    progress_bar_disable: bool = False,
+) -> tuple[int, int, int]:
+    """
+    Brings the existing index in line with the given documents, while it keeps
+    serving queries.  Documents missing from the index are added, documents
+    whose modified time differs from the indexed one are updated and indexed
+    documents which no longer exist are removed.
+
+    Returns the number of added, updated and removed documents.
+    """
+    ix = open_index()
+    indexed: dict[int, int] = {}
+    duplicated: set[int] = set()
+    with ix.searcher() as searcher:
+        reader = searcher.reader()
+        # An empty index has no columns
+        if reader.has_column("modified"):
+            # The raw values, the same as datetime_to_long of the indexed datetime
+            modified_column = reader.column_reader("modified", translate=False)
+            for docnum in reader.all_doc_ids():
+                doc_id = reader.stored_fields(docnum)["id"]
+                if doc_id in indexed:
+                    duplicated.add(doc_id)
+                indexed[doc_id] = modified_column[docnum]
+
+    added_ids = []
+    updated_ids = []
+    for doc_id, modified in documents.values_list("pk", "modified").iterator():
+        indexed_modified = indexed.pop(doc_id, None)
+        if indexed_modified is None:
+            added_ids.append(doc_id)
+        elif indexed_modified != datetime_to_long(modified) or doc_id in duplicated:
+            updated_ids.append(doc_id)
+    # Whatever is left is not a document (anymore)
+    removed_ids = list(indexed)
+
+    if added_ids or updated_ids or removed_ids:
+        with open_index_writer() as writer:
+            for doc_id in removed_ids:
+                remove_document_by_id(writer, doc_id)
+            for fields in tqdm.tqdm(
+                iter_document_fields(
+                    Document.objects.filter(pk__in=added_ids + updated_ids),
+                ),
+                total=len(added_ids) + len(updated_ids),
+                disable=progress_bar_disable,
+            ):
+                writer.update_document(**fields)
+
+    logger.info(
+        f"Reconciled the index: {len(added_ids)} added, {len(updated_ids)} "
+        f"updated, {len(removed_ids)} removed",
+    )
+    return len(added_ids), len(updated_ids), len(removed_ids)
+
+
 def remove_document(writer: AsyncWriter, doc: Document) -> None:
     remove_document_by_id(writer, doc.pk)
 
@@ -201,13 +684,411 @@ def remove_document_by_id(writer: AsyncWriter, doc_id) -> None:
 
 
 def add_or_update_document(document: Document) -> None:
-    with open_index_writer() as writer:
-        update_document(writer, document)
+    get_search_backend().update_documents([document.pk])
 
 
 def remove_document_from_index(document: Document) -> None:
-    with open_index_writer() as writer:
-        remove_document(writer, document)
+    get_search_backend().remove_documents([document.pk])
+
+
+class IndexUpdateQueue:
+    """
+    Collects the IDs of documents to update in or remove from the index and
+    applies them in batches, each with a single writer and commit, instead of
+    committing a segment for every single change.
+
+    Repeated changes of a document before the next batch are coalesced into
+    one.  Batches are applied by a background thread an interval after the
+    first change, or once the batch size is reached, and whenever flush is
+    called.  Batches which fail are queued again and retried after the next
+    interval.
+    """
+
+    def __init__(self, interval: float, batch_size: int) -> None:
+        self.interval = interval
+        self.batch_size = batch_size
+        # Document ID -> whether to remove it, in the order of the first change
+        self._pending: dict[int, bool] = {}
+        # Document ID -> time of its first change since it was last applied
+        self._enqueued_at: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        # Set by the first change, and when a batch is ready
+        self._changed = threading.Event()
+        self._batch_ready = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.enqueued = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.applied = 0
+        self.last_batch_lag = 0.0
+        self.max_lag = 0.0
+
+    def enqueue(self, document_id: int, *, remove: bool = False) -> None:
+        with self._lock:
+            self.enqueued += 1
+            if document_id in self._pending:
+                self.coalesced += 1
+            else:
+                self._enqueued_at[document_id] = time.monotonic()
+            first_change = not self._pending
+            self._pending[document_id] = remove
+            batch_ready = len(self._pending) >= self.batch_size
+            self._ensure_consumer()
+        if first_change:
+            self._changed.set()
+        if batch_ready:
+            self._batch_ready.set()
+
+    def flush(self) -> bool:
+        """
+        Applies all pending changes in the calling thread.  Returns if there
+        were any.
+        """
+        flushed = False
+        with self._apply_lock:
+            while batch := self._take_batch():
+                try:
+                    self._apply(batch)
+                except Exception:
+                    self._requeue(batch)
+                    raise
+                flushed = True
+        return flushed
+
+    def metrics(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "pending": len(self._pending),
+                "lag": now - min(self._enqueued_at.values(), default=now),
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "batches": self.batches,
+                "applied": self.applied,
+                "last_batch_lag": self.last_batch_lag,
+                "max_lag": self.max_lag,
+            }
+
+    def _ensure_consumer(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._consume,
+                name="index-update-queue",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _consume(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._pending
+            if idle:
+                # Sleep until the first change, which is then applied after
+                # the interval
+                self._changed.wait()
+                self._changed.clear()
+                continue
+
+            self._batch_ready.wait(self.interval)
+            self._batch_ready.clear()
+            try:
+                flushed = self.flush()
+            except Exception:
+                logger.exception("Error while applying queued index updates")
+                flushed = True
+            if flushed:
+                # Connections of this thread are not cleaned up by Django
+                connections.close_all()
+
+    def _take_batch(self) -> list[tuple[int, bool, float]]:
+        with self._lock:
+            batch_ids = list(itertools.islice(self._pending, self.batch_size))
+            return [
+                (
+                    doc_id,
+                    self._pending.pop(doc_id),
+                    self._enqueued_at.pop(doc_id),
+                )
+                for doc_id in batch_ids
+            ]
+
+    def _requeue(self, batch: list[tuple[int, bool, float]]) -> None:
+        """
+        Queues the changes of a batch which failed again, before all others,
+        unless a document was changed again in the meantime
+        """
+        with self._lock:
+            pending = {doc_id: remove for doc_id, remove, _ in batch}
+            pending.update(self._pending)
+            self._pending = pending
+            for doc_id, _, enqueued_at in batch:
+                self._enqueued_at[doc_id] = min(
+                    enqueued_at,
+                    self._enqueued_at.get(doc_id, enqueued_at),
+                )
+
+    def _apply(self, batch: list[tuple[int, bool, float]]) -> None:
+        get_search_backend().update_documents(
+            [doc_id for doc_id, remove, _ in batch if not remove],
+            remove_ids=[doc_id for doc_id, remove, _ in batch if remove],
+        )
+        similarity.update_documents(doc_id for doc_id, _, _ in batch)
+
+        lag = time.monotonic() - min(enqueued_at for _, _, enqueued_at in batch)
+        with self._lock:
+            self.batches += 1
+            self.applied += len(batch)
+            self.last_batch_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+        logger.debug(
+            f"Applied {len(batch)} queued index updates, {lag:.2f}s after the "
+            f"oldest change",
+        )
+
+
+_update_queue: IndexUpdateQueue | None = None
+_update_queue_lock = threading.Lock()
+
+
+def _reset_update_queue() -> None:
+    # The consumer thread does not survive a fork, so a child starts anew
+    global _update_queue
+    _update_queue = None
+
+
+os.register_at_fork(after_in_child=_reset_update_queue)
+
+
+def _get_update_queue() -> IndexUpdateQueue:
+    global _update_queue
+    with _update_queue_lock:
+        if _update_queue is None:
+            _update_queue = IndexUpdateQueue(
+                settings.INDEX_UPDATE_INTERVAL,
+                settings.INDEX_UPDATE_BATCH_SIZE,
+            )
+            atexit.register(_update_queue.flush)
+        return _update_queue
+
+
+def _enqueue(document_id: int, *, remove: bool) -> None:
+    if settings.INDEX_UPDATE_INTERVAL <= 0:
+        if remove:
+            get_search_backend().remove_documents([document_id])
+        else:
+            get_search_backend().update_documents([document_id])
+        similarity.update_documents([document_id])
+        return
+    _get_update_queue().enqueue(document_id, remove=remove)
+
+
+def queue_document_update(document: Document) -> None:
+    """
+    Updates the document in the index with the next batch of index updates,
+    once the current transaction is committed
+    """
+    document_id = document.pk
+    transaction.on_commit(lambda: _enqueue(document_id, remove=False))
+
+
+def queue_document_removal(document: Document) -> None:
+    """
+    Removes the document from the index with the next batch of index updates,
+    once the current transaction is committed
+    """
+    document_id = document.pk
+    transaction.on_commit(lambda: _enqueue(document_id, remove=True))
+
+
+def flush_index_updates() -> None:
+    """
+    Applies all queued index updates of this process immediately
+    """
+    if _update_queue is not None:
+        _update_queue.flush()
+
+
+def get_index_update_metrics() -> dict | None:
+    """
+    Returns the metrics of the index update queue of this process, if it
+    was used yet
+    """
+    if _update_queue is None:
+        return None
+    return _update_queue.metrics()
+
+
+# Document IDs by docnum of each index segment.  Segments never change once
+# written, apart from deletions, and deleted documents never match a query.
+_segment_document_ids: dict[str, array] = {}
+# The combined document IDs by the segment combination of recent readers, as
+# pooled searchers may still use older combinations.  Least recently used
+# first.
+_reader_document_ids: OrderedDict[tuple[str, ...], array] = OrderedDict()
+_READER_DOCUMENT_IDS_SIZE = 4
+_document_ids_lock = threading.Lock()
+
+
+def _get_segment_document_ids(segment_reader: IndexReader) -> array:
+    segment_id = segment_reader.segment().segment_id()
+    document_ids = _segment_document_ids.get(segment_id)
+    if document_ids is None:
+        document_ids = array(
+            "q",
+            (
+                segment_reader.stored_fields(docnum)["id"]
+                for docnum in range(segment_reader.doc_count_all())
+            ),
+        )
+        _segment_document_ids[segment_id] = document_ids
+    return document_ids
+
+
+def get_docnum_document_ids(ixreader: IndexReader) -> array:
+    """
+    Returns the document ID of every docnum of the given reader.
+
+    The IDs are loaded from the stored fields of each segment only once, and
+    are reused by all readers until the segment is merged away.
+    """
+    if ixreader.doc_count_all() == 0:
+        return array("q")
+
+    segment_readers = [
+        segment_reader
+        for segment_reader, _ in ixreader.leaf_readers()
+        if segment_reader.doc_count_all() > 0
+    ]
+    segment_ids = tuple(
+        segment_reader.segment().segment_id() for segment_reader in segment_readers
+    )
+    with _document_ids_lock:
+        document_ids = _reader_document_ids.get(segment_ids)
+        if document_ids is not None:
+            _reader_document_ids.move_to_end(segment_ids)
+            return document_ids
+
+        document_ids = array("q")
+        for segment_reader in segment_readers:
+            document_ids.extend(_get_segment_document_ids(segment_reader))
+        _reader_document_ids[segment_ids] = document_ids
+        while len(_reader_document_ids) > _READER_DOCUMENT_IDS_SIZE:
+            _reader_document_ids.popitem(last=False)
+        # Forget about segments which no recent reader uses anymore
+        used_segment_ids = set(itertools.chain.from_iterable(_reader_document_ids))
+        for segment_id in _segment_document_ids.keys() - used_segment_ids:
+            _segment_document_ids.pop(segment_id, None)
+        return document_ids
+
+
+def get_filter_document_ids(
+    filter_queryset: QuerySet,
+    user: User | None = None,
+) -> BitSet:
+    """
+    Returns the IDs of the documents in `filter_queryset` as a bitset.
+
+    The bitset is cached per user and filter until documents or permissions
+    change, so paging through results does not query the documents again.
+    """
+    try:
+        key = get_search_filter_cache_key(
+            user.pk if user is not None else None,
+            filter_queryset,
+        )
+    except EmptyResultSet:
+        # The filter can never match a document
+        return BitSet()
+
+    cached = get_search_filter_cache(key)
+    if cached is not None:
+        return BitSet.from_bytes(cached)
+
+    document_ids = list(
+        filter_queryset.order_by("id").values_list("id", flat=True),
+    )
+    bitset = BitSet(document_ids, size=document_ids[-1]) if document_ids else BitSet()
+    set_search_filter_cache(key, bitset.bits.tobytes())
+    return bitset
+
+
+def get_index_version(ixreader: IndexReader) -> str:
+    """
+    Returns a marker of the state of the index the reader is reading, which
+    changes whenever the index or its document numbers change
+    """
+    segment_ids = [
+        segment_reader.segment().segment_id()
+        for segment_reader, _ in ixreader.leaf_readers()
+        if segment_reader.doc_count_all() > 0
+    ]
+    return f"{ixreader.generation()}:{','.join(segment_ids)}"
+
+
+class FacetValues:
+    """
+    The values of a facet field of every docnum of an index segment, packed
+    as consecutive runs of values with the offset of the run of each docnum.
+    """
+
+    def __init__(self, doc_count: int, postings: Iterable[tuple[int, int]]) -> None:
+        docnum_values: list[list[int]] = [[] for _ in range(doc_count)]
+        for value, docnum in postings:
+            docnum_values[docnum].append(value)
+        self.offsets = array("q", [0])
+        self.values = array("q")
+        for values in docnum_values:
+            self.values.extend(values)
+            self.offsets.append(len(self.values))
+
+    def __getitem__(self, docnum: int) -> array:
+        return self.values[self.offsets[docnum] : self.offsets[docnum + 1]]
+
+    @classmethod
+    def from_reader(cls, segment_reader: IndexReader, fieldname: str) -> FacetValues:
+        field = segment_reader.schema[fieldname]
+        return cls(
+            segment_reader.doc_count_all(),
+            (
+                (int(field.from_bytes(term)), docnum)
+                # Only the full precision terms of numeric fields
+                for term in field.sortable_terms(segment_reader, fieldname)
+                for docnum in segment_reader.postings(fieldname, term).all_ids()
+            ),
+        )
+
+
+# The FacetValues of each facet field of each index segment
+_segment_facet_values: dict[str, dict[str, FacetValues]] = {}
+
+
+def get_facet_values(segment_reader: IndexReader) -> dict[str, FacetValues]:
+    """
+    Returns the FacetValues of the facet fields of the given segment reader.
+
+    The values of each segment are loaded from its postings only once, and
+    are reused by all readers until the segment is merged away.
+    """
+    segment_id = segment_reader.segment().segment_id()
+    facet_values = _segment_facet_values.get(segment_id)
+    if facet_values is None:
+        facet_values = {
+            fieldname: FacetValues.from_reader(segment_reader, fieldname)
+            for fieldname in FACET_FIELDS
+        }
+        _segment_facet_values[segment_id] = facet_values
+    return facet_values
+
+
+def _forget_merged_facet_values(ixreader: IndexReader) -> None:
+    segment_ids = {
+        segment_reader.segment().segment_id()
+        for segment_reader, _ in ixreader.leaf_readers()
+        if segment_reader.doc_count_all() > 0
+    }
+    for segment_id in _segment_facet_values.keys() - segment_ids:
+        _segment_facet_values.pop(segment_id, None)
 
 
 class MappedDocIdSet(DocIdSet):
@@ -216,16 +1097,19 @@ class MappedDocIdSet(DocIdSet):
     Supports efficiently looking up if a whoosh docnum is in the provided `filter_queryset`.
     """
 
-    def __init__(self, filter_queryset: QuerySet, ixreader: IndexReader) -> None:
+    def __init__(
+        self,
+        filter_queryset: QuerySet,
+        ixreader: IndexReader,
+        *,
+        user: User | None = None,
+    ) -> None:
         super().__init__()
-        document_ids = filter_queryset.order_by("id").values_list("id", flat=True)
-        max_id = document_ids.last() or 0
-        self.document_ids = BitSet(document_ids, size=max_id)
-        self.ixreader = ixreader
+        self.document_ids = get_filter_document_ids(filter_queryset, user)
+        self.docnum_document_ids = get_docnum_document_ids(ixreader)
 
     def __contains__(self, docnum) -> bool:
-        document_id = self.ixreader.stored_fields(docnum)["id"]
-        return document_id in self.document_ids
+        return self.docnum_document_ids[docnum] in self.document_ids
 
     def __bool__(self) -> Literal[True]:
         # searcher.search ignores a filter if it's "falsy".
@@ -233,6 +1117,29 @@ class MappedDocIdSet(DocIdSet):
         return True
 
 
+class CachedResults(Results):
+    """
+    The results of a query restored from the search results cache.  There is
+    no collector to count the matches again, so their number is carried along.
+    """
+
+    def __init__(self, searcher: Searcher, q: query.Query, top_n, total: int):
+        super().__init__(searcher, q, top_n)
+        self.total = total
+
+    def __len__(self) -> int:
+        return self.total
+
+    def has_exact_length(self) -> bool:
+        return True
+
+    def estimated_length(self) -> int:
+        return self.total
+
+    def estimated_min_length(self) -> int:
+        return self.total
+
+
 class DelayedQuery:
     def _get_query(self):
         raise NotImplementedError  # pragma: no cover
@@ -273,6 +1180,7 @@ class DelayedQuery:
         query_params,
         page_size,
         filter_queryset: QuerySet,
+        user: User | None = None,
     ) -> None:
         self.searcher = searcher
         self.query_params = query_params
@@ -280,6 +1188,146 @@ class DelayedQuery:
         self.saved_results = dict()
         self.first_score = None
         self.filter_queryset = filter_queryset
+        self.user = user
+        self._filter: MappedDocIdSet | None = None
+
+    @property
+    def filter(self) -> MappedDocIdSet:
+        """
+        The documents visible to the query, shared by all pages and the count
+        """
+        if self._filter is None:
+            self._filter = MappedDocIdSet(
+                self.filter_queryset,
+                self.searcher.ixreader,
+                user=self.user,
+            )
+        return self._filter
+
+    def _get_results_cache_key(self) -> str | None:
+        """
+        Returns the cache key of the results of this query, which covers the
+        query, the sorting, the visible documents and the index version
+        """
+        try:
+            visibility = get_search_filter_cache_key(
+                self.user.pk if self.user is not None else None,
+                self.filter_queryset,
+            )
+        except EmptyResultSet:
+            # Nothing is visible, there is no point in caching
+            return None
+        return get_search_results_cache_key(
+            (
+                type(self).__name__,
+                " ".join(self.query_params.get("query", "").split()),
+                self.query_params.get("more_like_id"),
+                self._get_query_sortedby(),
+                visibility,
+                get_index_version(self.searcher.ixreader),
+            ),
+        )
+
+    def _get_results(self, limit: int) -> Results:
+        """
+        Returns at least the given number of top hits, from the cache if
+        possible.  Otherwise the query is run and the top hits are cached, at
+        least SEARCH_RESULTS_CACHE_HITS of them, so that following pages and
+        the count are served from the cache.
+        """
+        key = self._get_results_cache_key()
+        cached = get_search_results_cache(key) if key is not None else None
+        if cached is not None and (
+            len(cached.top_n) >= limit or len(cached.top_n) == cached.total
+        ):
+            return CachedResults(
+                self.searcher,
+                cached.query,
+                list(cached.top_n),
+                cached.total,
+            )
+
+        q, mask = self._get_query()
+        sortedby, reverse = self._get_query_sortedby()
+
+        results = self.searcher.search(
+            q,
+            mask=mask,
+            filter=self.filter,
+            limit=max(limit, SEARCH_RESULTS_CACHE_HITS),
+            sortedby=sortedby,
+            reverse=reverse,
+        )
+        if key is not None:
+            set_search_results_cache(
+                key,
+                SearchResultsCacheData(
+                    query=q,
+                    top_n=list(results.top_n),
+                    total=len(results),
+                ),
+            )
+        return results
+
+    def get_facet_counts(self) -> dict[str, dict[int, int]]:
+        """
+        Returns the number of all visible hits of the query per ID of each of
+        the FACET_FIELDS, counted from the index rather than the database.
+        The counts are cached like the results.
+        """
+        key = self._get_results_cache_key()
+        if key is None:
+            return {fieldname: {} for fieldname in FACET_FIELDS}
+        key = get_search_facets_cache_key(key)
+        cached = get_search_facets_cache(key)
+        if cached is not None:
+            return cached
+
+        q, mask = self._get_query()
+        counts: dict[str, Counter] = {
+            fieldname: Counter() for fieldname in FACET_FIELDS
+        }
+        for subsearcher, offset in self.searcher.leaf_searchers():
+            segment_reader = subsearcher.reader()
+            if segment_reader.doc_count_all() == 0:
+                continue
+            docnums = [
+                docnum
+                for docnum in q.docs(subsearcher)
+                if offset + docnum in self.filter
+                and not (mask and offset + docnum in mask)
+            ]
+            if not docnums:
+                continue
+            facet_values = get_facet_values(segment_reader)
+            for fieldname in FACET_FIELDS:
+                values = facet_values[fieldname]
+                counts[fieldname].update(
+                    itertools.chain.from_iterable(values[docnum] for docnum in docnums),
+                )
+        _forget_merged_facet_values(self.searcher.ixreader)
+
+        facets = {fieldname: dict(counter) for fieldname, counter in counts.items()}
+        set_search_facets_cache(key, facets)
+        return facets
+
+    def get_all_result_ids(self) -> list[int]:
+        """
+        Returns the IDs of the hits of the first page
+        """
+        ids = []
+        results_page = self.saved_results.get(0)
+        if results_page is not None:
+            # The results also hold the hits cached along with the first page
+            scored_length = results_page.results.scored_length()
+            for i in range(min(scored_length, self.page_size)):
+                try:
+                    fields = results_page.results.fields(i)
+                    if "id" in fields:
+                        ids.append(fields["id"])
+                except Exception:
+                    pass
+        return ids
 
     def __len__(self) -> int:
         page = self[0:1]
@@ -289,19 +1337,18 @@ class DelayedQuery:
         if item.start in self.saved_results:
             return self.saved_results[item.start]
 
-        q, mask = self._get_query()
-        sortedby, reverse = self._get_query_sortedby()
+        sortedby, _ = self._get_query_sortedby()
+        pagenum = math.floor(item.start / self.page_size) + 1
 
-        page: ResultsPage = self.searcher.search_page(
-            q,
-            mask=mask,
-            filter=MappedDocIdSet(self.filter_queryset, self.searcher.ixreader),
-            pagenum=math.floor(item.start / self.page_size) + 1,
-            pagelen=self.page_size,
-            sortedby=sortedby,
-            reverse=reverse,
+        page = ResultsPage(
+            self._get_results(pagenum * self.page_size),
+            pagenum,
+            self.page_size,
+        )
+        page.results.fragmenter = highlight.ContextFragmenter(
+            surround=50,
+            charlimit=settings.SEARCH_HIGHLIGHT_MAX_CHARS,
         )
-        page.results.fragmenter = highlight.ContextFragmenter(surround=50)
         page.results.formatter = HtmlFormatter(tagname="span", between=" ... ")
 
         if not self.first_score and len(page.results) > 0 and sortedby is None:
@@ -371,6 +1418,19 @@ class DelayedFullTextQuery(DelayedQuery):
 class DelayedMoreLikeThisQuery(DelayedQuery):
     def _get_query(self) -> tuple:
         more_like_doc_id = int(self.query_params["more_like_id"])
+
+        similar = similarity.get_similar_documents(
+            more_like_doc_id,
+            limit=MORE_LIKE_THIS_LIMIT,
+            visible=self.filter.document_ids,
+        )
+        if similar is not None:
+            # Match exactly the similar documents, scored by their similarity
+            q = query.Or(
+                [query.Term("id", doc_id, boost=score) for doc_id, score in similar],
+            )
+            return q, None
+
         content = Document.objects.get(id=more_like_doc_id).content
 
         docnum = self.searcher.document_number(id=more_like_doc_id)
@@ -389,6 +1449,78 @@ class DelayedMoreLikeThisQuery(DelayedQuery):
         return q, mask
 
 
+class PrefixTermIndex:
+    """
+    The terms of the content field of an index segment, in sorted order and
+    with their document frequencies.  The terms are packed into one bytes
+    object, so the terms with a prefix are found by binary search.
+    """
+
+    def __init__(self, terms: Iterable[tuple[bytes, int]]) -> None:
+        packed = bytearray()
+        self.offsets = array("q", [0])
+        self.doc_frequencies = array("q")
+        for term, doc_frequency in terms:
+            packed += term
+            self.offsets.append(len(packed))
+            self.doc_frequencies.append(doc_frequency)
+        self.terms = bytes(packed)
+
+    def __len__(self) -> int:
+        return len(self.doc_frequencies)
+
+    def term(self, i: int) -> bytes:
+        return self.terms[self.offsets[i] : self.offsets[i + 1]]
+
+    def iter_prefix(self, prefix: bytes) -> Iterator[tuple[bytes, int]]:
+        """
+        Yields (term, document frequency) of all terms with the given prefix
+        """
+        start = bisect_left(range(len(self)), prefix, key=self.term)
+        end = bisect_right(
+            range(len(self)),
+            prefix,
+            lo=start,
+            key=lambda i: self.term(i)[: len(prefix)],
+        )
+        for i in range(start, end):
+            yield self.term(i), self.doc_frequencies[i]
+
+
+# The PrefixTermIndex of each index segment, see get_prefix_term_frequencies
+_segment_prefix_terms: dict[str, PrefixTermIndex] = {}
+
+
+def get_prefix_term_frequencies(ixreader: IndexReader, prefix: bytes) -> Counter:
+    """
+    Returns the document frequencies of the content terms with the given prefix.
+
+    The terms of each segment are loaded only once, and are reused by all
+    readers until the segment is merged away.  The frequencies include
+    deleted documents.
+    """
+    frequencies: Counter = Counter()
+    segment_ids = set()
+    for segment_reader, _ in ixreader.leaf_readers():
+        if segment_reader.doc_count_all() == 0:
+            continue
+        segment_id = segment_reader.segment().segment_id()
+        segment_ids.add(segment_id)
+        terms = _segment_prefix_terms.get(segment_id)
+        if terms is None:
+            terms = PrefixTermIndex(
+                (term, terminfo.doc_frequency())
+                for term, terminfo in segment_reader.iter_field("content")
+            )
+            _segment_prefix_terms[segment_id] = terms
+        for term, doc_frequency in terms.iter_prefix(prefix):
+            frequencies[term] += doc_frequency
+    # Forget about segments which were merged away
+    for segment_id in _segment_prefix_terms.keys() - segment_ids:
+        _segment_prefix_terms.pop(segment_id, None)
+    return frequencies
+
+
 def autocomplete(
     ix: FileIndex,
     term: str,
@@ -396,39 +1528,97 @@ def autocomplete(
     user: User | None = None,
 ) -> list:
     """
-    Mimics whoosh.reading.IndexReader.most_distinctive_terms with permissions
-    and without scoring
+    Returns the content terms starting with the given term, which occur in
+    most documents visible to the user.
+
+    The candidates are taken in order of their document frequency, which is
+    an upper bound of the visible documents containing them, so only the
+    visible documents of the top candidates have to be counted.  Terms in the
+    same number of documents are ordered alphabetically.
     """
     terms = []
-
-    with ix.searcher(weighting=TF_IDF()) as s:
-        qp = QueryParser("content", schema=ix.schema)
-        # Don't let searches with a query that happen to match a field override the
-        # content field query instead and return bogus, not text data
-        qp.remove_plugin_class(FieldsPlugin)
-        q = qp.parse(f"{term.lower()}*")
-        user_criterias: list = get_permissions_criterias(user)
-
-        results = s.search(
-            q,
-            terms=True,
-            filter=query.Or(user_criterias) if user_criterias is not None else None,
+    if limit <= 0:
+        return terms
+
+    prefix: bytes = term.lower().encode("UTF-8")
+
+    with ix.searcher() as s:
+        reader = s.reader()
+        candidates = [
+            (-doc_frequency, candidate)
+            for candidate, doc_frequency in get_prefix_term_frequencies(
+                reader,
+                prefix,
+            ).items()
+        ]
+        heapq.heapify(candidates)
+
+        visible_documents = get_visible_documents(user)
+        visible = (
+            MappedDocIdSet(visible_documents, reader, user=user)
+            if visible_documents is not None
+            else None
         )
 
-        termCounts = Counter()
-        if results.has_matched_terms():
-            for hit in results:
-                for _, match in hit.matched_terms():
-                    termCounts[match] += 1
-            terms = [t for t, _ in termCounts.most_common(limit)]
+        # The best terms so far as (-visible documents, term)
+        best: list[tuple[int, bytes]] = []
+        while candidates:
+            negative_doc_frequency, candidate = heapq.heappop(candidates)
+            if len(best) == limit and (negative_doc_frequency, candidate) > best[-1]:
+                # Neither this nor any later candidate can be visible in more
+                # documents than the current terms
+                break
+            count = count_visible_documents(reader, candidate, visible)
+            if count > 0:
+                insort(best, (-count, candidate))
+                del best[limit:]
 
-        term_encoded: bytes = term.encode("UTF-8")
-        if term_encoded in terms:
-            terms.insert(0, terms.pop(terms.index(term_encoded)))
+        terms = [candidate for _, candidate in best]
+
+    if prefix in terms:
+        terms.insert(0, terms.pop(terms.index(prefix)))
 
     return terms
 
 
+def count_visible_documents(
+    ixreader: IndexReader,
+    term: bytes,
+    visible: MappedDocIdSet | None,
+) -> int:
+    """
+    Returns the number of visible (by default all) documents containing the
+    given content term.  Only the postings of segments with deleted documents
+    or of documents which are not all visible are read.
+    """
+    count = 0
+    for segment_reader, offset in ixreader.leaf_readers():
+        doc_frequency = segment_reader.doc_frequency("content", term)
+        if doc_frequency == 0:
+            continue
+        if visible is None and not segment_reader.has_deletions():
+            count += doc_frequency
+            continue
+        # The postings exclude deleted documents
+        count += sum(
+            1
+            for docnum in segment_reader.postings("content", term).all_ids()
+            if visible is None or docnum + offset in visible
+        )
+    return count
+
+
+def get_visible_documents(user: User | None = None) -> QuerySet | None:
+    """
+    Returns the documents visible to the user, or None if all documents are
+    """
+    if user is None:
+        return Document.objects.filter(owner__isnull=True)
+    if user.is_superuser:
+        return None
+    return get_objects_for_user_owner_aware(user, "documents.view_document", Document)
+
+
 def get_permissions_criterias(user: User | None = None) -> list:
     user_criterias = [query.Term("has_owner", text=False)]
     if user is not None:
@@ -440,3 +1630,230 @@ def get_permissions_criterias(user: User | None = None) -> list:
                 query.Term("viewer_id", str(user.id)),
             )
     return user_criterias
+
+
+class SearchBackend:
+    """
+    A full text search engine the documents are indexed in and searched with.
+    Which one is used is configured with PAPERLESS_SEARCH_BACKEND, see
+    get_search_backend.
+    """
+
+    def update_documents(
+        self,
+        document_ids: Iterable[int],
+        *,
+        remove_ids: Iterable[int] = (),
+    ) -> None:
+        """
+        Indexes the current state of the given documents and removes the
+        documents with the given remove_ids from the index, at once.
+        Documents which no longer exist are removed as well.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def remove_documents(self, document_ids: Iterable[int]) -> None:
+        self.update_documents((), remove_ids=document_ids)
+
+    def reindex(
+        self,
+        documents: QuerySet[Document],
+        *,
+        processes: int = 1,
+        progress_bar_disable: bool = False,
+    ) -> None:
+        """
+        Recreates the index with the given documents
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def reconcile(
+        self,
+        documents: QuerySet[Document],
+        *,
+        progress_bar_disable: bool = False,
+    ) -> tuple[int, int, int]:
+        """
+        Brings the index in line with the given documents.  Returns the
+        number of added, updated and removed documents.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def optimize(self) -> None:
+        raise NotImplementedError  # pragma: no cover
+
+    def merge(self) -> tuple[int, int]:
+        """
+        Merges parts of the index within the budget of INDEX_MERGE_MAX_MB and
+        INDEX_MERGE_MAX_SECONDS.  Returns the number of merges and the number
+        of merged bytes.  Indexes which merge by themselves do nothing.
+        """
+        return 0, 0
+
+    def segment_sizes(self) -> list[int] | None:
+        """
+        Returns the sizes in bytes of the segments of the index, or None if
+        the index is not made of segments
+        """
+        return None
+
+    def clear(self) -> None:
+        """
+        Removes all documents from the index
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def count(self) -> int:
+        """
+        Returns the number of indexed documents
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def last_modified(self) -> datetime | None:
+        raise NotImplementedError  # pragma: no cover
+
+    def open_searcher(self):
+        """
+        Returns a context manager of the searcher the queries of a request
+        are run with
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def get_query(
+        self,
+        searcher,
+        query_params,
+        page_size: int,
+        *,
+        filter_queryset: QuerySet,
+        user: User | None = None,
+    ):
+        """
+        Returns the lazy results of the full text ("query") or more like this
+        ("more_like_id") search of the given query parameters, among the
+        documents of filter_queryset.  The results are a sequence of pages of
+        hits, which can be paginated like a queryset.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def autocomplete(self, term: str, limit: int, user: User | None) -> list[bytes]:
+        """
+        Returns up to limit indexed words of the content starting with the
+        whole lowercased term, which occur in the most documents visible to
+        user.  A word equal to the term comes first.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+
+class WhooshSearchBackend(SearchBackend):
+    """
+    The Whoosh index in INDEX_DIR
+    """
+
+    def update_documents(
+        self,
+        document_ids: Iterable[int],
+        *,
+        remove_ids: Iterable[int] = (),
+    ) -> None:
+        update_ids = set(document_ids)
+        with open_index_writer() as writer:
+            for fields in iter_document_fields(
+                Document.objects.filter(pk__in=update_ids),
+            ):
+                writer.update_document(**fields)
+                update_ids.discard(fields["id"])
+            # Documents deleted in the meantime
+            for doc_id in update_ids.union(remove_ids):
+                remove_document_by_id(writer, doc_id)
+
+    def reindex(
+        self,
+        documents: QuerySet[Document],
+        *,
+        processes: int = 1,
+        progress_bar_disable: bool = False,
+    ) -> None:
+        reindex(
+            documents,
+            processes=processes,
+            progress_bar_disable=progress_bar_disable,
+        )
+
+    def reconcile(
+        self,
+        documents: QuerySet[Document],
+        *,
+        progress_bar_disable: bool = False,
+    ) -> tuple[int, int, int]:
+        return reconcile(documents, progress_bar_disable=progress_bar_disable)
+
+    def optimize(self) -> None:
+        writer = AsyncWriter(open_index())
+        writer.commit(optimize=True)
+
+    def merge(self) -> tuple[int, int]:
+        return merge_segments(
+            max_bytes=settings.INDEX_MERGE_MAX_MB * 1024 * 1024,
+            max_seconds=settings.INDEX_MERGE_MAX_SECONDS,
+        )
+
+    def segment_sizes(self) -> list[int] | None:
+        ix = open_index()
+        return get_segment_sizes(ix.storage, get_index_segments(ix))
+
+    def clear(self) -> None:
+        open_index(recreate=True)
+
+    def count(self) -> int:
+        with open_index().searcher() as searcher:
+            return searcher.doc_count()
+
+    def last_modified(self) -> datetime | None:
+        return django_timezone.make_aware(
+            datetime.fromtimestamp(open_index().last_modified()),
+        )
+
+    def open_searcher(self):
+        return open_index_searcher()
+
+    def get_query(
+        self,
+        searcher,
+        query_params,
+        page_size: int,
+        *,
+        filter_queryset: QuerySet,
+        user: User | None = None,
+    ) -> DelayedQuery:
+        if "query" in query_params:
+            query_class = DelayedFullTextQuery
+        elif "more_like_id" in query_params:
+            query_class = DelayedMoreLikeThisQuery
+        else:
+            raise ValueError
+        return query_class(
+            searcher,
+            query_params,
+            page_size,
+            filter_queryset=filter_queryset,
+            user=user,
+        )
+
+    def autocomplete(self, term: str, limit: int, user: User | None) -> list[bytes]:
+        return autocomplete(open_index(), term, limit, user)
+
+
+# The search backends by the name they are configured with
+SEARCH_BACKENDS = {
+    "whoosh": "documents.index.WhooshSearchBackend",
+    "database": "documents.search_database.DatabaseSearchBackend",
+}
+
+
+def get_search_backend(name: str | None = None) -> SearchBackend:
+    """
+    Returns the search backend with the given name, by default the one
+    configured with PAPERLESS_SEARCH_BACKEND
+    """
+    return import_string(SEARCH_BACKENDS[name or settings.SEARCH_BACKEND])()
@@ -0,0 +1,276 @@
+import json
+import random
+import resource
+import statistics
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from documents.caching import CACHE_50_MINUTES
+from documents.caching import CLASSIFIER_HASH_KEY
+from documents.caching import CLASSIFIER_MODIFIED_KEY
+from documents.caching import CLASSIFIER_VERSION_KEY
+from documents.classifier import DocumentClassifier
+from documents.models import Correspondent
+from documents.models import Document
+from documents.models import DocumentType
+from documents.models import MatchingModel
+from documents.models import StoragePath
+from documents.models import Tag
+
+# Sizes of the generated corpus
+GENERATED_VOCABULARY_SIZE = 5000
+GENERATED_WORDS_PER_DOCUMENT = 300
+GENERATED_LABELS = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the training, loading and prediction performance of the "
+        "classifier with the current settings, without changing the current "
+        "classifier model.  Either the most recent existing documents are used, "
+        "or a corpus is generated (and removed again).  The results are written "
+        "as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--documents",
+            default=1000,
+            type=int,
+            help="Number of documents to train with",
+        )
+        parser.add_argument(
+            "--generate",
+            default=False,
+            action="store_true",
+            help=(
+                "Generate documents with random content and labels, instead of "
+                "using the most recent existing documents.  The generated "
+                "documents and labels are removed afterwards."
+            ),
+        )
+        parser.add_argument(
+            "--predictions",
+            default=100,
+            type=int,
+            help="Number of documents to measure the prediction latency with",
+        )
+        parser.add_argument(
+            "--seed",
+            default=None,
+            type=int,
+            help="Seed for the generated documents, for repeatable results",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            type=Path,
+            help="File to write the results to, instead of the standard output",
+        )
+
+    def handle(self, *args, **options):
+        if options["documents"] < 1:
+            raise CommandError("There must be at least 1 document")
+
+        # Training updates the information about the current classifier
+        cached_info = cache.get_many(
+            [CLASSIFIER_MODIFIED_KEY, CLASSIFIER_HASH_KEY, CLASSIFIER_VERSION_KEY],
+        )
+        try:
+            with transaction.atomic():
+                if options["generate"]:
+                    documents = self.generate_documents(
+                        options["documents"],
+                        random.Random(options["seed"]),
+                    )
+                else:
+                    documents = self.recent_documents(options["documents"])
+
+                results = self.benchmark(documents, options["predictions"])
+                results["corpus"] = "generated" if options["generate"] else "recent"
+
+                # Remove the generated documents and labels again
+                transaction.set_rollback(True)
+        finally:
+            cache.delete_many(
+                [CLASSIFIER_MODIFIED_KEY, CLASSIFIER_HASH_KEY, CLASSIFIER_VERSION_KEY],
+            )
+            cache.set_many(cached_info, CACHE_50_MINUTES)
+
+        output = json.dumps(results, indent=2)
+        if options["output"] is not None:
+            options["output"].write_text(output)
+        else:
+            self.stdout.write(output)
+
+    def recent_documents(self, count: int):
+        """
+        Returns the given number of most recently added documents
+        """
+        pks = list(
+            Document.objects.order_by("-pk").values_list("pk", flat=True)[:count],
+        )
+        if not pks:
+            raise CommandError("There are no documents, try --generate")
+        return Document.objects.filter(pk__gte=pks[-1])
+
+    def generate_documents(self, count: int, rng: random.Random):
+        """
+        Creates the given number of documents, with random words as content
+        and random AUTO labels, which are related to some of the words
+        """
+        vocabulary = [
+            "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 10)))
+            for _ in range(GENERATED_VOCABULARY_SIZE)
+        ]
+        suffix = uuid.uuid4().hex[:8]
+        labels = {
+            model: [
+                (
+                    model.objects.create(
+                        name=f"benchmark {i} {suffix}",
+                        matching_algorithm=MatchingModel.MATCH_AUTO,
+                        **({"path": f"benchmark/{i}"} if model is StoragePath else {}),
+                    ),
+                    rng.sample(vocabulary, 20),
+                )
+                for i in range(GENERATED_LABELS)
+            ]
+            for model in (Correspondent, DocumentType, StoragePath, Tag)
+        }
+
+        first_pk = (Document.global_objects.aggregate(Max("pk"))["pk__max"] or 0) + 1
+        documents = []
+        document_tags = []
+        for i in range(count):
+            words = rng.choices(vocabulary, k=GENERATED_WORDS_PER_DOCUMENT)
+            assigned = {}
+            for model, choices in labels.items():
+                label, label_words = rng.choice(choices)
+                assigned[model] = label
+                words.extend(rng.choices(label_words, k=10))
+            rng.shuffle(words)
+            documents.append(
+                Document(
+                    pk=first_pk + i,
+                    title=f"benchmark {i}",
+                    content=" ".join(words),
+                    checksum=f"benchmark-{suffix}-{i}",
+                    mime_type="application/pdf",
+                    correspondent=assigned[Correspondent],
+                    document_type=assigned[DocumentType],
+                    storage_path=assigned[StoragePath],
+                ),
+            )
+            document_tags.append(
+                Document.tags.through(
+                    document_id=first_pk + i,
+                    tag_id=assigned[Tag].pk,
+                ),
+            )
+
+        Document.objects.bulk_create(documents, batch_size=1000)
+        Document.tags.through.objects.bulk_create(document_tags, batch_size=1000)
+        return Document.objects.filter(pk__gte=first_pk)
+
+    def benchmark(self, documents, predictions: int) -> dict:
+        classifier = DocumentClassifier()
+
+        # Measure the time of the preprocessing, which is part of vectorizing
+        preprocess_time = 0.0
+        preprocess_content = classifier.preprocess_content
+
+        def timed_preprocess_content(content: str) -> str:
+            nonlocal preprocess_time
+            start = time.perf_counter()
+            try:
+                return preprocess_content(content)
+            finally:
+                preprocess_time += time.perf_counter() - start
+
+        classifier.preprocess_content = timed_preprocess_content
+
+        with tempfile.TemporaryDirectory(dir=settings.SCRATCH_DIR) as tmp_dir:
+            model_file = Path(tmp_dir) / "classification_model.pickle"
+
+            start = time.perf_counter()
+            classifier.train(
+                documents,
+                content_cache_file=Path(tmp_dir) / "content_cache.sqlite3",
+            )
+            train_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            classifier.save(model_file)
+            save_time = time.perf_counter() - start
+            model_size = model_file.stat().st_size
+
+            loaded = DocumentClassifier()
+            start = time.perf_counter()
+            loaded.load(model_file)
+            load_time = time.perf_counter() - start
+
+            contents = list(
+                documents.order_by("pk").values_list("content", flat=True)[
+                    :predictions
+                ],
+            )
+            latencies = []
+            for content in contents:
+                start = time.perf_counter()
+                loaded.predict(content)
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            loaded.predict_all(contents)
+            batch_time = time.perf_counter() - start
+
+        train_times = dict(classifier.train_times)
+        train_times["preprocess"] = preprocess_time
+        train_times["vectorize"] = train_times.get("vectorize", 0.0) - preprocess_time
+        train_times["total"] = train_time
+
+        return {
+            "documents": documents.count(),
+            "settings": {
+                "nltk_enabled": settings.NLTK_ENABLED,
+                "nltk_language": settings.NLTK_LANGUAGE,
+                "features": settings.CLASSIFIER_FEATURES,
+                "max_features": settings.CLASSIFIER_MAX_FEATURES,
+                "training_workers": settings.CLASSIFIER_TRAINING_WORKERS,
+                "chunk_size": settings.CLASSIFIER_CHUNK_SIZE,
+            },
+            "train_seconds": train_times,
+            "fit_seconds": classifier.fit_times,
+            "save_seconds": save_time,
+            "model_size_bytes": model_size,
+            "load_seconds": load_time,
+            "prediction_seconds": {
+                "documents": len(latencies),
+                "mean": statistics.fmean(latencies) if latencies else None,
+                "median": statistics.median(latencies) if latencies else None,
+                "p95": (
+                    statistics.quantiles(latencies, n=20)[-1]
+                    if len(latencies) > 1
+                    else None
+                ),
+                "max": max(latencies, default=None),
+                "batch_per_document": (
+                    batch_time / len(contents) if contents else None
+                ),
+            },
+            # Kilobytes on Linux, includes forked training processes
+            "peak_rss": {
+                "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+            },
+        }
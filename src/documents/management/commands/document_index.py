@@ -1,22 +1,59 @@
 from django.core.management import BaseCommand
+from django.core.management.base import CommandError
 from django.db import transaction
 
+from documents.index import SEARCH_BACKENDS
+from documents.management.commands.mixins import MultiProcessMixin
 from documents.management.commands.mixins import ProgressBarMixin
+from documents.tasks import index_merge
+from documents.tasks import index_migrate
 from documents.tasks import index_optimize
+from documents.tasks import index_reconcile
 from documents.tasks import index_reindex
 
 
-class Command(ProgressBarMixin, BaseCommand):
+class Command(MultiProcessMixin, ProgressBarMixin, BaseCommand):
     help = "Manages the document index."
 
     def add_arguments(self, parser):
-        parser.add_argument("command", choices=["reindex", "optimize"])
+        parser.add_argument(
+            "command",
+            choices=["reindex", "reconcile", "optimize", "merge", "migrate"],
+        )
+        parser.add_argument(
+            "--to",
+            choices=sorted(SEARCH_BACKENDS),
+            help="The search backend to migrate the index to",
+        )
         self.add_argument_progress_bar_mixin(parser)
+        self.add_argument_processes_mixin(parser)
 
     def handle(self, *args, **options):
         self.handle_progress_bar_mixin(**options)
+        self.handle_processes_mixin(**options)
         with transaction.atomic():
             if options["command"] == "reindex":
-                index_reindex(progress_bar_disable=self.no_progress_bar)
+                index_reindex(
+                    processes=self.process_count,
+                    progress_bar_disable=self.no_progress_bar,
+                )
+            elif options["command"] == "reconcile":
+                index_reconcile(progress_bar_disable=self.no_progress_bar)
             elif options["command"] == "optimize":
                 index_optimize()
+            elif options["command"] == "merge":
+                self.stdout.write(index_merge())
+            elif options["command"] == "migrate":
+                if options["to"] is None:
+                    raise CommandError("Specify the search backend to migrate to")
+                count = index_migrate(
+                    options["to"],
+                    progress_bar_disable=self.no_progress_bar,
+                )
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Indexed {count} documents with the {options['to']} search "
+                        f"backend, set PAPERLESS_SEARCH_BACKEND={options['to']} to "
+                        f"search with it",
+                    ),
+                )
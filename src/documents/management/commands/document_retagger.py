@@ -1,4 +1,5 @@
 import logging
+from itertools import islice
 
 import tqdm
 from django.core.management.base import BaseCommand
@@ -13,6 +14,9 @@ from documents.signals.handlers import set_tags
 
 logger = logging.getLogger("paperless.management.retagger")
 
+# Number of documents the classifier predicts at once
+PREDICTION_BATCH_SIZE = 100
+
 
 class Command(ProgressBarMixin, BaseCommand):
     help = (
@@ -69,6 +73,7 @@ class Command(ProgressBarMixin, BaseCommand):
 
     def handle(self, *args, **options):
         self.handle_progress_bar_mixin(**options)
+        self.options = options
 
         if options["inbox_only"]:
             queryset = Document.objects.filter(tags__is_inbox_tag=True)
@@ -84,53 +89,74 @@ class Command(ProgressBarMixin, BaseCommand):
 
         classifier = load_classifier()
 
-        for document in tqdm.tqdm(documents, disable=self.no_progress_bar):
-            if options["correspondent"]:
-                set_correspondent(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    use_first=options["use_first"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    stdout=self.stdout,
-                    style_func=self.style,
-                )
-
-            if options["document_type"]:
-                set_document_type(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    use_first=options["use_first"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    stdout=self.stdout,
-                    style_func=self.style,
-                )
-
-            if options["tags"]:
-                set_tags(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    stdout=self.stdout,
-                    style_func=self.style,
-                )
-            if options["storage_path"]:
-                set_storage_path(
-                    sender=None,
-                    document=document,
-                    classifier=classifier,
-                    replace=options["overwrite"],
-                    use_first=options["use_first"],
-                    suggest=options["suggest"],
-                    base_url=options["base_url"],
-                    stdout=self.stdout,
-                    style_func=self.style,
-                )
+        with tqdm.tqdm(total=len(documents), disable=self.no_progress_bar) as bar:
+            document_iterator = iter(documents)
+            while batch := list(islice(document_iterator, PREDICTION_BATCH_SIZE)):
+                # Vectorize and predict the whole batch at once
+                if classifier:
+                    predictions = classifier.predict_all(
+                        [document.content for document in batch],
+                    )
+                else:
+                    predictions = [None] * len(batch)
+
+                for document, document_predictions in zip(batch, predictions):
+                    self.handle_document(document, classifier, document_predictions)
+                    bar.update()
+
+    def handle_document(self, document, classifier, predictions):
+        options = self.options
+
+        if options["correspondent"]:
+            set_correspondent(
+                sender=None,
+                document=document,
+                classifier=classifier,
+                predictions=predictions,
+                replace=options["overwrite"],
+                use_first=options["use_first"],
+                suggest=options["suggest"],
+                base_url=options["base_url"],
+                stdout=self.stdout,
+                style_func=self.style,
+            )
+
+        if options["document_type"]:
+            set_document_type(
+                sender=None,
+                document=document,
+                classifier=classifier,
+                predictions=predictions,
+                replace=options["overwrite"],
+                use_first=options["use_first"],
+                suggest=options["suggest"],
+                base_url=options["base_url"],
+                stdout=self.stdout,
+                style_func=self.style,
+            )
+
+        if options["tags"]:
+            set_tags(
+                sender=None,
+                document=document,
+                classifier=classifier,
+                predictions=predictions,
+                replace=options["overwrite"],
+                suggest=options["suggest"],
+                base_url=options["base_url"],
+                stdout=self.stdout,
+                style_func=self.style,
+            )
+        if options["storage_path"]:
+            set_storage_path(
+                sender=None,
+                document=document,
+                classifier=classifier,
+                predictions=predictions,
+                replace=options["overwrite"],
+                use_first=options["use_first"],
+                suggest=options["suggest"],
+                base_url=options["base_url"],
+                stdout=self.stdout,
+                style_func=self.style,
+            )
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import itertools
 import logging
 import re
 from fnmatch import fnmatch
+from functools import lru_cache
 from typing import TYPE_CHECKING
 
+from django.conf import settings
+
+from documents.caching import get_matching_generation
 from documents.data_models import ConsumableDocument
 from documents.data_models import DocumentSource
 from documents.models import Correspondent
@@ -15,13 +20,21 @@ from documents.models import StoragePath
 from documents.models import Tag
 from documents.models import Workflow
 from documents.models import WorkflowTrigger
+from documents.parsers import parse_date_generator
 from documents.permissions import get_objects_for_user_owner_aware
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from documents.classifier import ClassifierPredictions
     from documents.classifier import DocumentClassifier
 
 logger = logging.getLogger("paperless.matching")
 
+_FIND_TERMS = re.compile(r'"([^"]+)"|(\S+)')
+_NORMALIZE_SPACE = re.compile(r"\s+")
+_NON_WORD_CHARACTERS = re.compile(r"[^\w\s]")
+
 
 def log_reason(
     matching_model: MatchingModel | WorkflowTrigger,
@@ -37,13 +50,27 @@ def log_reason(
     )
 
 
-def match_correspondents(document: Document, classifier: DocumentClassifier, user=None):
-    pred_id = classifier.predict_correspondent(document.content) if classifier else None
+def match_correspondents(
+    document: Document,
+    classifier: DocumentClassifier,
+    user=None,
+    *,
+    predictions: ClassifierPredictions | None = None,
+    candidates: Iterable[MatchingModel] | None = None,
+):
+    if predictions is not None:
+        pred_id = predictions.correspondent
+    else:
+        pred_id = (
+            classifier.predict_correspondent(document.content) if classifier else None
+        )
 
     if user is None and document.owner is not None:
         user = document.owner
 
-    if user is not None:
+    if candidates is not None:
+        correspondents = candidates
+    elif user is not None:
         correspondents = get_objects_for_user_owner_aware(
             user,
             "documents.view_correspondent",
@@ -52,22 +79,37 @@ def match_correspondents(document: Document, classifier: DocumentClassifier, use
     else:
         correspondents = Correspondent.objects.all()
 
+    matchers = get_matchers()
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: matches(o, document, matchers=matchers)
             or (o.pk == pred_id and o.matching_algorithm == MatchingModel.MATCH_AUTO),
             correspondents,
         ),
     )
 
 
-def match_document_types(document: Document, classifier: DocumentClassifier, user=None):
-    pred_id = classifier.predict_document_type(document.content) if classifier else None
+def match_document_types(
+    document: Document,
+    classifier: DocumentClassifier,
+    user=None,
+    *,
+    predictions: ClassifierPredictions | None = None,
+    candidates: Iterable[MatchingModel] | None = None,
+):
+    if predictions is not None:
+        pred_id = predictions.document_type
+    else:
+        pred_id = (
+            classifier.predict_document_type(document.content) if classifier else None
+        )
 
     if user is None and document.owner is not None:
         user = document.owner
 
-    if user is not None:
+    if candidates is not None:
+        document_types = candidates
+    elif user is not None:
         document_types = get_objects_for_user_owner_aware(
             user,
             "documents.view_documenttype",
@@ -76,29 +118,45 @@ def match_document_types(document: Document, classifier: DocumentClassifier, use
     else:
         document_types = DocumentType.objects.all()
 
+    matchers = get_matchers()
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: matches(o, document, matchers=matchers)
             or (o.pk == pred_id and o.matching_algorithm == MatchingModel.MATCH_AUTO),
             document_types,
         ),
     )
 
 
-def match_tags(document: Document, classifier: DocumentClassifier, user=None):
-    predicted_tag_ids = classifier.predict_tags(document.content) if classifier else []
+def match_tags(
+    document: Document,
+    classifier: DocumentClassifier,
+    user=None,
+    *,
+    predictions: ClassifierPredictions | None = None,
+    candidates: Iterable[MatchingModel] | None = None,
+):
+    if predictions is not None:
+        predicted_tag_ids = predictions.tags
+    else:
+        predicted_tag_ids = (
+            classifier.predict_tags(document.content) if classifier else []
+        )
 
     if user is None and document.owner is not None:
         user = document.owner
 
-    if user is not None:
+    if candidates is not None:
+        tags = candidates
+    elif user is not None:
         tags = get_objects_for_user_owner_aware(user, "documents.view_tag", Tag)
     else:
         tags = Tag.objects.all()
 
+    matchers = get_matchers()
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: matches(o, document, matchers=matchers)
             or (
                 o.matching_algorithm == MatchingModel.MATCH_AUTO
                 and o.pk in predicted_tag_ids
@@ -108,13 +166,27 @@ def match_tags(document: Document, classifier: DocumentClassifier, user=None):
     )
 
 
-def match_storage_paths(document: Document, classifier: DocumentClassifier, user=None):
-    pred_id = classifier.predict_storage_path(document.content) if classifier else None
+def match_storage_paths(
+    document: Document,
+    classifier: DocumentClassifier,
+    user=None,
+    *,
+    predictions: ClassifierPredictions | None = None,
+    candidates: Iterable[MatchingModel] | None = None,
+):
+    if predictions is not None:
+        pred_id = predictions.storage_path
+    else:
+        pred_id = (
+            classifier.predict_storage_path(document.content) if classifier else None
+        )
 
     if user is None and document.owner is not None:
         user = document.owner
 
-    if user is not None:
+    if candidates is not None:
+        storage_paths = candidates
+    elif user is not None:
         storage_paths = get_objects_for_user_owner_aware(
             user,
             "documents.view_storagepath",
@@ -123,114 +195,310 @@ def match_storage_paths(document: Document, classifier: DocumentClassifier, user
     else:
         storage_paths = StoragePath.objects.all()
 
+    matchers = get_matchers()
     return list(
         filter(
-            lambda o: matches(o, document)
+            lambda o: matches(o, document, matchers=matchers)
             or (o.pk == pred_id and o.matching_algorithm == MatchingModel.MATCH_AUTO),
             storage_paths,
         ),
     )
 
 
-def matches(matching_model: MatchingModel, document: Document):
-    search_kwargs = {}
+def _suggestion_candidates(user) -> tuple[list, list, list, list]:
+    """
+    Returns the correspondents, tags, document types and storage paths the
+    given user may see, which are all of them without a user
+    """
+    if user is None:
+        return (
+            list(Correspondent.objects.all()),
+            list(Tag.objects.all()),
+            list(DocumentType.objects.all()),
+            list(StoragePath.objects.all()),
+        )
+    return (
+        list(
+            get_objects_for_user_owner_aware(
+                user,
+                "documents.view_correspondent",
+                Correspondent,
+            ),
+        ),
+        list(get_objects_for_user_owner_aware(user, "documents.view_tag", Tag)),
+        list(
+            get_objects_for_user_owner_aware(
+                user,
+                "documents.view_documenttype",
+                DocumentType,
+            ),
+        ),
+        list(
+            get_objects_for_user_owner_aware(
+                user,
+                "documents.view_storagepath",
+                StoragePath,
+            ),
+        ),
+    )
 
-    document_content = document.content
 
-    # Check that match is not empty
-    if not matching_model.match.strip():
-        return False
+def get_suggestions(
+    documents: Iterable[Document],
+    classifier: DocumentClassifier | None,
+    user=None,
+) -> dict[int, dict]:
+    """
+    Returns the suggested correspondents, tags, document types, storage paths
+    and dates of each of the given documents, by document ID.
 
-    if matching_model.is_insensitive:
-        search_kwargs = {"flags": re.IGNORECASE}
+    The classifier predicts all documents at once and the matching objects are
+    loaded only once per user (or per owner, if no user is given), so this is a
+    lot cheaper than suggesting for each document on its own.
+    """
+    documents = list(documents)
+    if classifier is not None:
+        all_predictions = classifier.predict_all(
+            [document.content for document in documents],
+        )
+    else:
+        all_predictions = [None] * len(documents)
+
+    candidates_by_user = {}
+    suggestions = {}
+    for document, predictions in zip(documents, all_predictions):
+        document_user = user if user is not None else document.owner
+        user_key = document_user.pk if document_user is not None else None
+        if user_key not in candidates_by_user:
+            candidates_by_user[user_key] = _suggestion_candidates(document_user)
+        correspondents, tags, document_types, storage_paths = candidates_by_user[
+            user_key
+        ]
+
+        dates = []
+        if settings.NUMBER_OF_SUGGESTED_DATES > 0:
+            gen = parse_date_generator(document.filename, document.content)
+            dates = sorted(
+                set(itertools.islice(gen, settings.NUMBER_OF_SUGGESTED_DATES)),
+            )
 
-    if matching_model.matching_algorithm == MatchingModel.MATCH_NONE:
-        return False
+        suggestions[document.pk] = {
+            "correspondents": [
+                c.id
+                for c in match_correspondents(
+                    document,
+                    classifier,
+                    document_user,
+                    predictions=predictions,
+                    candidates=correspondents,
+                )
+            ],
+            "tags": [
+                t.id
+                for t in match_tags(
+                    document,
+                    classifier,
+                    document_user,
+                    predictions=predictions,
+                    candidates=tags,
+                )
+            ],
+            "document_types": [
+                dt.id
+                for dt in match_document_types(
+                    document,
+                    classifier,
+                    document_user,
+                    predictions=predictions,
+                    candidates=document_types,
+                )
+            ],
+            "storage_paths": [
+                sp.id
+                for sp in match_storage_paths(
+                    document,
+                    classifier,
+                    document_user,
+                    predictions=predictions,
+                    candidates=storage_paths,
+                )
+            ],
+            "dates": [date.strftime("%Y-%m-%d") for date in dates if date is not None],
+        }
+
+    return suggestions
+
+
+class Matcher:
+    """
+    The compiled match of a matching model, see get_matchers
+    """
+
+    def __init__(self, algorithm: int, match: str, *, is_insensitive: bool) -> None:
+        self.algorithm = algorithm
+        self.match = match
+        self.is_insensitive = is_insensitive
+        self.patterns: list[re.Pattern] = []
+        self.fuzzy_match = ""
+
+        flags = re.IGNORECASE if is_insensitive else 0
+        if not match.strip() or algorithm in (
+            MatchingModel.MATCH_NONE,
+            MatchingModel.MATCH_AUTO,
+        ):
+            # Automatic matching is done elsewhere
+            self.algorithm = MatchingModel.MATCH_NONE
+        elif algorithm == MatchingModel.MATCH_ALL:
+            self.patterns = [
+                re.compile(rf"\b{word}\b", flags) for word in _split_match(match)
+            ]
+        elif algorithm == MatchingModel.MATCH_ANY:
+            self.patterns = [
+                re.compile(rf"\b(?:{'|'.join(_split_match(match))})\b", flags),
+            ]
+        elif algorithm == MatchingModel.MATCH_LITERAL:
+            self.patterns = [re.compile(rf"\b{re.escape(match)}\b", flags)]
+        elif algorithm == MatchingModel.MATCH_REGEX:
+            try:
+                self.patterns = [re.compile(match, flags)]
+            except re.error:
+                logger.error(f"Error while processing regular expression {match}")
+                self.algorithm = MatchingModel.MATCH_NONE
+        elif algorithm == MatchingModel.MATCH_FUZZY:
+            self.fuzzy_match = _normalize_fuzzy(match, is_insensitive=is_insensitive)
+        else:
+            logger.error(f"Unsupported matching algorithm {algorithm}")
+            self.algorithm = MatchingModel.MATCH_NONE
+
+    def get_reason(self, content: str) -> str | None:
+        """
+        Returns why the given content matches, or None if it does not
+        """
+        if self.algorithm == MatchingModel.MATCH_NONE:
+            return None
+
+        elif self.algorithm == MatchingModel.MATCH_ALL:
+            if all(pattern.search(content) for pattern in self.patterns):
+                return f"it contains all of these words: {self.match}"
+            return None
+
+        elif self.algorithm == MatchingModel.MATCH_ANY:
+            match = self.patterns[0].search(content)
+            return f"it contains this word: {match.group()}" if match else None
+
+        elif self.algorithm == MatchingModel.MATCH_LITERAL:
+            if self.patterns[0].search(content):
+                return f'it contains this string: "{self.match}"'
+            return None
+
+        elif self.algorithm == MatchingModel.MATCH_REGEX:
+            match = self.patterns[0].search(content)
+            if match:
+                return (
+                    f"the string {match.group()} matches the regular expression "
+                    f"{self.match}"
+                )
+            return None
+
+        else:
+            from rapidfuzz import fuzz
+
+            text = _normalize_fuzzy(content, is_insensitive=self.is_insensitive)
+            if fuzz.partial_ratio(self.fuzzy_match, text, score_cutoff=90):
+                # TODO: make this better
+                return (
+                    f"parts of the document content somehow match the string "
+                    f"{self.match}"
+                )
+            return None
+
+
+@lru_cache(maxsize=128)
+def _get_other_matcher(key: tuple[int, str, bool]) -> Matcher:
+    algorithm, match, is_insensitive = key
+    return Matcher(algorithm, match, is_insensitive=is_insensitive)
+
+
+class MatcherSet:
+    """
+    The compiled matchers of one generation of the matching objects, by
+    their algorithm, match and case sensitivity.  Matchers of other objects,
+    like workflow triggers or objects which are not saved yet, are compiled
+    when they are needed, and only the most recently used of them are kept.
+    """
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_ALL:
-        for word in _split_match(matching_model):
-            search_result = re.search(rf"\b{word}\b", document_content, **search_kwargs)
-            if not search_result:
-                return False
-        log_reason(
-            matching_model,
-            document,
-            f"it contains all of these words: {matching_model.match}",
+    def __init__(self, generation: str, keys: Iterable[tuple[int, str, bool]]) -> None:
+        self.generation = generation
+        self._matchers: dict[tuple[int, str, bool], Matcher] = {
+            key: Matcher(key[0], key[1], is_insensitive=key[2]) for key in keys
+        }
+
+    def __len__(self) -> int:
+        return len(self._matchers)
+
+    def _get(self, key: tuple[int, str, bool]) -> Matcher:
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = _get_other_matcher(key)
+        return matcher
+
+    def get(self, matching_model: MatchingModel | WorkflowTrigger) -> Matcher:
+        return self._get(
+            (
+                matching_model.matching_algorithm,
+                matching_model.match,
+                matching_model.is_insensitive,
+            ),
         )
-        return True
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_ANY:
-        for word in _split_match(matching_model):
-            if re.search(rf"\b{word}\b", document_content, **search_kwargs):
-                log_reason(matching_model, document, f"it contains this word: {word}")
-                return True
-        return False
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_LITERAL:
-        result = bool(
-            re.search(
-                rf"\b{re.escape(matching_model.match)}\b",
-                document_content,
-                **search_kwargs,
+_matchers: MatcherSet | None = None
+
+
+def get_matchers() -> MatcherSet:
+    """
+    Returns the compiled matchers of all tags, correspondents, document types
+    and storage paths.  They are compiled once per process and compiled again
+    whenever one of these objects is saved or deleted by any process, see
+    bump_matching_generation.
+    """
+    global _matchers
+    generation = get_matching_generation()
+    matchers = _matchers
+    if matchers is None or matchers.generation != generation:
+        fields = ("matching_algorithm", "match", "is_insensitive")
+        matchers = MatcherSet(
+            generation,
+            itertools.chain.from_iterable(
+                model.objects.values_list(*fields).distinct()
+                for model in (Correspondent, Tag, DocumentType, StoragePath)
             ),
         )
-        if result:
-            log_reason(
-                matching_model,
-                document,
-                f'it contains this string: "{matching_model.match}"',
-            )
-        return result
+        _matchers = matchers
+    return matchers
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_REGEX:
-        try:
-            match = re.search(
-                re.compile(matching_model.match, **search_kwargs),
-                document_content,
-            )
-        except re.error:
-            logger.error(
-                f"Error while processing regular expression {matching_model.match}",
-            )
-            return False
-        if match:
-            log_reason(
-                matching_model,
-                document,
-                f"the string {match.group()} matches the regular expression "
-                f"{matching_model.match}",
-            )
-        return bool(match)
-
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_FUZZY:
-        from rapidfuzz import fuzz
-
-        match = re.sub(r"[^\w\s]", "", matching_model.match)
-        text = re.sub(r"[^\w\s]", "", document_content)
-        if matching_model.is_insensitive:
-            match = match.lower()
-            text = text.lower()
-        if fuzz.partial_ratio(match, text, score_cutoff=90):
-            # TODO: make this better
-            log_reason(
-                matching_model,
-                document,
-                f"parts of the document content somehow match the string "
-                f"{matching_model.match}",
-            )
-            return True
-        else:
-            return False
 
-    elif matching_model.matching_algorithm == MatchingModel.MATCH_AUTO:
-        # this is done elsewhere.
+def matches(
+    matching_model: MatchingModel | WorkflowTrigger,
+    document: Document,
+    *,
+    matchers: MatcherSet | None = None,
+) -> bool:
+    if matchers is None:
+        matchers = get_matchers()
+    reason = matchers.get(matching_model).get_reason(document.content)
+    if reason is None:
         return False
+    log_reason(matching_model, document, reason)
+    return True
 
-    else:
-        raise NotImplementedError("Unsupported matching algorithm")
 
+def _normalize_fuzzy(text: str, *, is_insensitive: bool) -> str:
+    text = _NON_WORD_CHARACTERS.sub("", text)
+    return text.lower() if is_insensitive else text
 
-def _split_match(matching_model):
+
+def _split_match(match: str) -> list[str]:
     """
     Splits the match to individual keywords, getting rid of unnecessary
     spaces and grouping quoted words together.
@@ -240,12 +508,12 @@ def _split_match(matching_model):
         ==>
       ["some", "random", "words", "with+quotes", "and", "spaces"]
     """
-    findterms = re.compile(r'"([^"]+)"|(\S+)').findall
-    normspace = re.compile(r"\s+").sub
     return [
-        # normspace(" ", (t[0] or t[1]).strip()).replace(" ", r"\s+")
-        re.escape(normspace(" ", (t[0] or t[1]).strip())).replace(r"\ ", r"\s+")
-        for t in findterms(matching_model.match)
+        re.escape(_NORMALIZE_SPACE.sub(" ", (t[0] or t[1]).strip())).replace(
+            r"\ ",
+            r"\s+",
+        )
+        for t in _FIND_TERMS.findall(match)
     ]
 
 
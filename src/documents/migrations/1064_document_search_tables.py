@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# The tables of the database search backend, see documents.search_database,
+# are created by the backend when it is first used, so that only deployments
+# using it get them.  Migrating back drops them, if they were created.
+
+DROP = {
+    "sqlite": [
+        "DROP TABLE IF EXISTS documents_search_terms",
+        "DROP TABLE IF EXISTS documents_search",
+    ],
+    "postgresql": [
+        "DROP TABLE IF EXISTS documents_search",
+    ],
+}
+
+
+def drop_search_tables(apps, schema_editor):
+    for statement in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("documents", "1063_paperlesstask_type_alter_paperlesstask_task_name_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop,
+            drop_search_tables,
+        ),
+    ]
@@ -0,0 +1,874 @@
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import tqdm
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.db import connection
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from whoosh import highlight
+from whoosh.analysis import STOP_WORDS
+from whoosh.analysis import LowercaseFilter
+from whoosh.analysis import RegexTokenizer
+
+from documents import similarity
+from documents.index import MORE_LIKE_THIS_LIMIT
+from documents.index import REINDEX_CHUNK_SIZE
+from documents.index import SearchBackend
+from documents.index import get_filter_document_ids
+from documents.index import get_visible_documents
+from documents.index import iter_document_fields
+from documents.models import CustomFieldInstance
+from documents.models import Document
+from documents.models import User
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from collections.abc import Iterator
+
+    from django.db.backends.utils import CursorWrapper
+    from django.db.models import QuerySet
+
+logger = logging.getLogger("paperless.search_database")
+
+# The indexed text fields, which can be searched in with field:word
+SEARCH_FIELDS = (
+    "title",
+    "content",
+    "correspondent",
+    "tag",
+    "type",
+    "notes",
+    "custom_fields",
+)
+# Document fields the results can be ordered by, by the ordering parameter
+ORDERING_FIELDS = {
+    "created": "created",
+    "modified": "modified",
+    "added": "added",
+    "title": "title",
+    "correspondent__name": "correspondent__name",
+    "document_type__name": "document_type__name",
+    "archive_serial_number": "archive_serial_number",
+    "num_notes": "num_notes",
+    "owner": "owner__username",
+    "page_count": "page_count",
+}
+# Number of the most frequent words of a document a more like this query is
+# made of, if there is no similarity index
+MORE_LIKE_THIS_TERMS = 20
+
+# The aliases of the databases whose search tables were created by this process
+_search_tables_created: set[str] = set()
+
+_CLAUSE_RE = re.compile(
+    r'(?P<negated>-)?(?:(?P<field>\w+):)?(?:"(?P<phrase>[^"]*)"?|(?P<term>\S+))',
+)
+# Words as the search engines of the databases split them
+_WORD_RE = re.compile(r"[^\W_]+")
+
+
+@dataclass(frozen=True)
+class SearchClause:
+    """
+    Consecutive words a document has to contain, or not contain if negated,
+    in the given field or in any field.  The last word is a prefix of a word
+    if prefix is set.
+    """
+
+    words: tuple[str, ...]
+    field: str | None = None
+    prefix: bool = False
+    negated: bool = False
+
+
+def parse_query(query_string: str) -> list[SearchClause]:
+    """
+    Parses a query of words, which all have to match, "quoted phrases",
+    words ending with * which match as a prefix, field:word which match in
+    the given field only and -word or NOT word which must not match.
+
+    Other query syntax of the Whoosh backend, like OR and date ranges, is
+    searched for as words.
+    """
+    clauses = []
+    negate_next = False
+    for match in _CLAUSE_RE.finditer(query_string):
+        if match["term"] in ("AND", "NOT"):
+            negate_next = match["term"] == "NOT"
+            continue
+        field = match["field"].lower() if match["field"] else None
+        text = match["phrase"] if match["phrase"] is not None else match["term"]
+        if field is not None and field not in SEARCH_FIELDS:
+            # Not a field, but a word with a colon
+            field = None
+            text = f"{match['field']}:{text}"
+        words = tuple(word.lower() for word in _WORD_RE.findall(text))
+        if words:
+            clauses.append(
+                SearchClause(
+                    words=words,
+                    field=field,
+                    prefix=match["term"] is not None and text.endswith("*"),
+                    negated=negate_next or match["negated"] is not None,
+                ),
+            )
+        negate_next = False
+    return clauses
+
+
+def get_frequent_words(content: str, limit: int) -> list[str]:
+    """
+    Returns the words occurring most often in the given content, apart from
+    short words, numbers and English stop words
+    """
+    counts = Counter(
+        word
+        for word in _WORD_RE.findall(content.lower())
+        if len(word) > 2 and not word.isdigit() and word not in STOP_WORDS
+    )
+    return [word for word, _ in counts.most_common(limit)]
+
+
+def get_ids_sql(queryset: QuerySet) -> tuple[str, tuple] | None:
+    """
+    Returns the SQL and parameters selecting the IDs of the documents of the
+    given queryset, or None if the queryset can never match a document
+    """
+    try:
+        return queryset.order_by().values("pk").query.sql_with_params()
+    except EmptyResultSet:
+        return None
+
+
+class SearchDialect:
+    """
+    The SQL of the full text search engine of a database
+    """
+
+    def create_tables(self, cursor: CursorWrapper) -> None:
+        """
+        Creates the search tables, unless they exist
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def delete(self, cursor: CursorWrapper, document_ids: Iterable[int]) -> None:
+        raise NotImplementedError  # pragma: no cover
+
+    def insert(self, cursor: CursorWrapper, rows: list[dict]) -> None:
+        """
+        Inserts or replaces the index fields of documents
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def clear(self, cursor: CursorWrapper) -> None:
+        cursor.execute("DELETE FROM documents_search")
+
+    def optimize(self, cursor: CursorWrapper) -> None:
+        raise NotImplementedError  # pragma: no cover
+
+    def indexed_documents(self, cursor: CursorWrapper) -> Iterator[tuple[int, str]]:
+        """
+        Yields the ID and the modified time, in ISO format, of every indexed
+        document
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def render(self, clauses: list[SearchClause], *, any_clause=False) -> str | None:
+        """
+        Returns the clauses as a query of the search engine, which matches
+        documents matching all (or any) of the clauses.  Returns None if the
+        query can match no documents.
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def match_sql(self) -> str:
+        """
+        Returns the SQL of the IDs of the documents matching a query
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def hits_sql(self, visible_sql: str) -> str:
+        """
+        Returns the SQL of the IDs and scores of the visible documents
+        matching a query, best first
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    def autocomplete(
+        self,
+        cursor: CursorWrapper,
+        prefix: str,
+        limit: int,
+        visible: QuerySet | None,
+    ) -> list[str]:
+        """
+        Returns up to limit words of the content starting with prefix, which
+        occur in most of the visible (by default all) documents, with words
+        in as many documents ordered alphabetically
+        """
+        raise NotImplementedError  # pragma: no cover
+
+
+class SqliteSearchDialect(SearchDialect):
+    """
+    An FTS5 table of the text of the indexed documents, by document ID
+    """
+
+    # Weights of the SEARCH_FIELDS in the score of a hit
+    WEIGHTS = (10.0, 1.0, 5.0, 5.0, 5.0, 2.0, 2.0)
+
+    def create_tables(self, cursor: CursorWrapper) -> None:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS documents_search USING fts5("
+            f"{', '.join(SEARCH_FIELDS)}, modified UNINDEXED, indexed UNINDEXED, "
+            f"tokenize = 'unicode61 remove_diacritics 2')",
+        )
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents_search_terms "
+            "USING fts5vocab(documents_search, 'col')",
+        )
+
+    def delete(self, cursor: CursorWrapper, document_ids: Iterable[int]) -> None:
+        cursor.executemany(
+            "DELETE FROM documents_search WHERE rowid = %s",
+            [(document_id,) for document_id in document_ids],
+        )
+
+    def insert(self, cursor: CursorWrapper, rows: list[dict]) -> None:
+        self.delete(cursor, [row["id"] for row in rows])
+        cursor.executemany(
+            f"INSERT INTO documents_search (rowid, {', '.join(SEARCH_FIELDS)}, "
+            f"modified, indexed) VALUES ({', '.join(['%s'] * 10)})",
+            [
+                (
+                    row["id"],
+                    *(row[field] or "" for field in SEARCH_FIELDS),
+                    row["modified"].isoformat(),
+                    row["indexed"].isoformat(),
+                )
+                for row in rows
+            ],
+        )
+
+    def optimize(self, cursor: CursorWrapper) -> None:
+        cursor.execute(
+            "INSERT INTO documents_search (documents_search) VALUES ('optimize')",
+        )
+
+    def indexed_documents(self, cursor: CursorWrapper) -> Iterator[tuple[int, str]]:
+        cursor.execute("SELECT rowid, modified FROM documents_search")
+        yield from cursor.fetchall()
+
+    def render(self, clauses: list[SearchClause], *, any_clause=False) -> str | None:
+        def render_clause(clause: SearchClause) -> str:
+            rendered = f'"{" ".join(clause.words)}"'
+            if clause.prefix:
+                rendered += " *"
+            if clause.field is not None:
+                rendered = f"{clause.field} : {rendered}"
+            return rendered
+
+        positive = [render_clause(clause) for clause in clauses if not clause.negated]
+        if not positive:
+            # FTS5 can only exclude documents from matches
+            return None
+        rendered = f"({(' OR ' if any_clause else ' AND ').join(positive)})"
+        for clause in clauses:
+            if clause.negated:
+                rendered += f" NOT {render_clause(clause)}"
+        return rendered
+
+    def match_sql(self) -> str:
+        return "SELECT rowid FROM documents_search WHERE documents_search MATCH %s"
+
+    def hits_sql(self, visible_sql: str) -> str:
+        weights = ", ".join(str(weight) for weight in self.WEIGHTS)
+        return (
+            f"SELECT rowid, -bm25(documents_search, {weights}) AS score "
+            f"FROM documents_search WHERE documents_search MATCH %s "
+            f"AND rowid IN ({visible_sql}) ORDER BY score DESC, rowid"
+        )
+
+    def autocomplete(
+        self,
+        cursor: CursorWrapper,
+        prefix: str,
+        limit: int,
+        visible: QuerySet | None,
+    ) -> list[str]:
+        cursor.execute(
+            "SELECT term, doc FROM documents_search_terms "
+            "WHERE col = 'content' AND term >= %s AND term < %s "
+            "ORDER BY doc DESC, term",
+            [prefix, prefix + "\U0010ffff"],
+        )
+        candidates = cursor.fetchall()
+        if visible is None:
+            return [term for term, _ in candidates[:limit]]
+
+        visible_ids = get_ids_sql(visible)
+        if visible_ids is None:
+            return []
+        visible_sql, visible_params = visible_ids
+        # The best terms so far as (-visible documents, term)
+        best: list[tuple[int, str]] = []
+        for term, doc_frequency in candidates:
+            if len(best) == limit and (-doc_frequency, term) > best[-1]:
+                # The document frequency is an upper bound of the visible
+                # documents, so no later candidate can beat the current terms
+                break
+            cursor.execute(
+                f"SELECT count(*) FROM documents_search "
+                f"WHERE documents_search MATCH %s AND rowid IN ({visible_sql})",
+                [f'content : "{term}"', *visible_params],
+            )
+            (count,) = cursor.fetchone()
+            if count > 0:
+                best.append((-count, term))
+                best.sort()
+                del best[limit:]
+        return [term for _, term in best]
+
+
+class PostgresqlSearchDialect(SearchDialect):
+    """
+    A table of the tsvector of each indexed document, with a GIN index.  The
+    SEARCH_FIELDS are told apart by the weights of their lexemes.
+    """
+
+    # The weight of the lexemes of each of the SEARCH_FIELDS
+    WEIGHTS = {
+        "title": "A",
+        "content": "D",
+        "correspondent": "B",
+        "tag": "B",
+        "type": "B",
+        "notes": "C",
+        "custom_fields": "C",
+    }
+
+    def create_tables(self, cursor: CursorWrapper) -> None:
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS documents_search ("
+            "document_id integer PRIMARY KEY, "
+            "vector tsvector NOT NULL, "
+            "modified timestamp with time zone NOT NULL, "
+            "indexed timestamp with time zone NOT NULL)",
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS documents_search_vector "
+            "ON documents_search USING GIN (vector)",
+        )
+
+    def delete(self, cursor: CursorWrapper, document_ids: Iterable[int]) -> None:
+        cursor.execute(
+            "DELETE FROM documents_search WHERE document_id = ANY(%s)",
+            [list(document_ids)],
+        )
+
+    def insert(self, cursor: CursorWrapper, rows: list[dict]) -> None:
+        vector_sql = " || ".join(
+            f"setweight(to_tsvector('simple', %s), '{self.WEIGHTS[field]}')"
+            for field in SEARCH_FIELDS
+        )
+        cursor.executemany(
+            f"INSERT INTO documents_search (document_id, vector, modified, indexed) "
+            f"VALUES (%s, {vector_sql}, %s, %s) "
+            f"ON CONFLICT (document_id) DO UPDATE SET vector = EXCLUDED.vector, "
+            f"modified = EXCLUDED.modified, indexed = EXCLUDED.indexed",
+            [
+                (
+                    row["id"],
+                    *(row[field] or "" for field in SEARCH_FIELDS),
+                    row["modified"],
+                    row["indexed"],
+                )
+                for row in rows
+            ],
+        )
+
+    def optimize(self, cursor: CursorWrapper) -> None:
+        cursor.execute("SELECT gin_clean_pending_list('documents_search_vector')")
+        cursor.execute("ANALYZE documents_search")
+
+    def indexed_documents(self, cursor: CursorWrapper) -> Iterator[tuple[int, str]]:
+        cursor.execute("SELECT document_id, modified FROM documents_search")
+        for document_id, modified in cursor.fetchall():
+            yield document_id, modified.isoformat()
+
+    def render(self, clauses: list[SearchClause], *, any_clause=False) -> str | None:
+        def render_clause(clause: SearchClause) -> str:
+            weight = self.WEIGHTS[clause.field] if clause.field is not None else ""
+            lexemes = [f"'{word}':{weight}" for word in clause.words]
+            if clause.prefix:
+                lexemes[-1] = f"'{clause.words[-1]}':*{weight}"
+            rendered = f"({' <-> '.join(lexemes)})"
+            return f"!{rendered}" if clause.negated else rendered
+
+        if all(clause.negated for clause in clauses):
+            return None
+        return (" | " if any_clause else " & ").join(
+            render_clause(clause) for clause in clauses
+        )
+
+    def match_sql(self) -> str:
+        return (
+            "SELECT document_id FROM documents_search "
+            "WHERE vector @@ to_tsquery('simple', %s)"
+        )
+
+    def hits_sql(self, visible_sql: str) -> str:
+        return (
+            f"SELECT document_id, ts_rank_cd(vector, query) AS score "
+            f"FROM documents_search, to_tsquery('simple', %s) query "
+            f"WHERE vector @@ query AND document_id IN ({visible_sql}) "
+            f"ORDER BY score DESC, document_id"
+        )
+
+    def autocomplete(
+        self,
+        cursor: CursorWrapper,
+        prefix: str,
+        limit: int,
+        visible: QuerySet | None,
+    ) -> list[str]:
+        words = _WORD_RE.findall(prefix)
+        if words != [prefix]:
+            # Not a single word, which the content could start with
+            return []
+        statistics_sql = (
+            "SELECT vector FROM documents_search "
+            "WHERE vector @@ to_tsquery('simple', %s)"
+        )
+        statistics_params = [
+            self.render([SearchClause((prefix,), field="content", prefix=True)]),
+        ]
+        if visible is not None:
+            visible_ids = get_ids_sql(visible)
+            if visible_ids is None:
+                return []
+            visible_sql, visible_params = visible_ids
+            statistics_sql += f" AND document_id IN ({visible_sql})"
+            statistics_params.extend(visible_params)
+        # ts_stat runs a query given as text, so its parameters are bound by
+        # the database driver first
+        statistics_sql = connection.ops.compose_sql(statistics_sql, statistics_params)
+        # ts_stat counts the documents of the words of the given weights
+        cursor.execute(
+            "SELECT word FROM ts_stat(%s, 'D') WHERE starts_with(word, %s) "
+            "ORDER BY ndoc DESC, word LIMIT %s",
+            [statistics_sql, prefix, limit],
+        )
+        return [word for (word,) in cursor.fetchall()]
+
+
+class DatabaseSearchHit:
+    """
+    A hit of a DatabaseSearchQuery, which is serialized like a Whoosh hit
+    """
+
+    def __init__(
+        self,
+        document_id: int,
+        score: float | None,
+        rank: int,
+        clauses: list[SearchClause],
+    ) -> None:
+        self.document_id = document_id
+        self.score = score
+        self.rank = rank
+        self.clauses = clauses
+
+    def __getitem__(self, fieldname: str):
+        if fieldname != "id":
+            raise KeyError(fieldname)
+        return self.document_id
+
+    def highlights(self, fieldname: str, text: str) -> str:
+        words = set()
+        prefixes = set()
+        for clause in self.clauses:
+            if clause.negated or clause.field not in (None, fieldname):
+                continue
+            words.update(clause.words)
+            if clause.prefix:
+                prefixes.add(clause.words[-1])
+        if prefixes:
+            words.update(
+                word
+                for word in _WORD_RE.findall(
+                    text[: settings.SEARCH_HIGHLIGHT_MAX_CHARS].lower(),
+                )
+                if word.startswith(tuple(prefixes))
+            )
+        if not words:
+            return ""
+        return highlight.highlight(
+            text,
+            frozenset(words),
+            RegexTokenizer() | LowercaseFilter(),
+            highlight.ContextFragmenter(
+                surround=50,
+                charlimit=settings.SEARCH_HIGHLIGHT_MAX_CHARS,
+            ),
+            highlight.HtmlFormatter(tagname="span", between=" ... "),
+        )
+
+
+class DatabaseSearchQuery:
+    """
+    The lazy results of a search with the database search backend, which are
+    paginated like a queryset.  Either a query of the search engine or the
+    scores of similar documents are searched for, among the documents of
+    filter_queryset.
+    """
+
+    def __init__(
+        self,
+        dialect: SearchDialect,
+        query_params,
+        *,
+        filter_queryset: QuerySet,
+        clauses: list[SearchClause],
+        match: str | None = None,
+        scores: dict[int, float] | None = None,
+    ) -> None:
+        self.dialect = dialect
+        self.query_params = query_params
+        self.filter_queryset = filter_queryset
+        self.clauses = clauses
+        self.match = match
+        self.scores = scores
+        self._hits: list[tuple[int, float | None]] | None = None
+
+    def _get_ordering(self) -> str | None:
+        field: str = self.query_params.get("ordering", "")
+        reverse = field.startswith("-")
+        field = ORDERING_FIELDS.get(field.removeprefix("-"))
+        if field is None:
+            return None
+        return f"-{field}" if reverse else field
+
+    def _get_documents(self) -> QuerySet:
+        """
+        Returns the visible documents matching the query
+        """
+        if self.scores is not None:
+            return self.filter_queryset.filter(pk__in=list(self.scores))
+        if self.match is None:
+            return self.filter_queryset.none()
+        return self.filter_queryset.filter(
+            pk__in=RawSQL(self.dialect.match_sql(), [self.match]),
+        )
+
+    def _get_hits(self) -> list[tuple[int, float | None]]:
+        """
+        Returns the IDs of all hits in the order of the results, with their
+        score relative to the best hit unless ordered by a field
+        """
+        if self._hits is not None:
+            return self._hits
+
+        ordering = self._get_ordering()
+        if ordering is not None:
+            hits = [
+                (document_id, None)
+                for document_id in self._get_documents()
+                .order_by(ordering, "pk")
+                .values_list("pk", flat=True)
+            ]
+        elif self.scores is not None:
+            visible = set(self._get_documents().values_list("pk", flat=True))
+            hits = [
+                (document_id, score)
+                for document_id, score in self.scores.items()
+                if document_id in visible
+            ]
+        elif self.match is None or (
+            (visible_ids := get_ids_sql(self.filter_queryset)) is None
+        ):
+            hits = []
+        else:
+            visible_sql, visible_params = visible_ids
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    self.dialect.hits_sql(visible_sql),
+                    [self.match, *visible_params],
+                )
+                hits = cursor.fetchall()
+
+        first_score = hits[0][1] if hits else None
+        self._hits = [
+            (document_id, score / first_score if first_score and score else None)
+            for document_id, score in hits
+        ]
+        return self._hits
+
+    def get_all_result_ids(self) -> list[int]:
+        return [document_id for document_id, _ in self._get_hits()]
+
+    def get_facet_counts(self) -> dict[str, dict[int, int]]:
+        """
+        Returns the number of all hits per ID of each of the FACET_FIELDS
+        """
+        documents = Document.objects.filter(pk__in=self._get_documents().values("pk"))
+
+        def count(queryset: QuerySet, fieldname: str) -> dict[int, int]:
+            return dict(
+                queryset.exclude(**{f"{fieldname}__isnull": True})
+                .order_by()
+                .values_list(fieldname)
+                .annotate(count=Count("pk")),
+            )
+
+        return {
+            "correspondent_id": count(documents, "correspondent_id"),
+            "tag_id": count(
+                Document.tags.through.objects.filter(document__in=documents),
+                "tag_id",
+            ),
+            "type_id": count(documents, "document_type_id"),
+            "path_id": count(documents, "storage_path_id"),
+            "custom_fields_id": count(
+                CustomFieldInstance.objects.filter(document__in=documents),
+                "field_id",
+            ),
+        }
+
+    def __len__(self) -> int:
+        return len(self._get_hits())
+
+    def __getitem__(self, item: slice) -> list[DatabaseSearchHit]:
+        hits = self._get_hits()
+        start = item.start or 0
+        return [
+            DatabaseSearchHit(document_id, score, rank, self.clauses)
+            for rank, (document_id, score) in enumerate(
+                hits[item],
+                start=start,
+            )
+        ]
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    The full text search engine of the database, FTS5 for SQLite and
+    tsvector for PostgreSQL
+    """
+
+    DIALECTS = {
+        "sqlite": SqliteSearchDialect,
+        "postgresql": PostgresqlSearchDialect,
+    }
+
+    def __init__(self) -> None:
+        if connection.vendor not in self.DIALECTS:
+            raise ImproperlyConfigured(
+                f"The database search backend does not support {connection.vendor}",
+            )
+        self.dialect: SearchDialect = self.DIALECTS[connection.vendor]()
+        if connection.alias not in _search_tables_created:
+            # Only deployments using the backend get the tables
+            try:
+                with connection.cursor() as cursor:
+                    self.dialect.create_tables(cursor)
+            except DatabaseError as e:
+                # For example SQLite built without FTS5
+                raise ImproperlyConfigured(
+                    f"The tables of the database search backend could not be "
+                    f"created: {e}",
+                ) from e
+            _search_tables_created.add(connection.alias)
+
+    def _write(
+        self,
+        documents: QuerySet[Document],
+        *,
+        progress_bar_disable: bool = True,
+    ) -> set[int]:
+        """
+        Indexes the given documents, returns their IDs
+        """
+        indexed = timezone.now()
+        written = set()
+        rows = []
+        with connection.cursor() as cursor:
+            for fields in tqdm.tqdm(
+                iter_document_fields(documents),
+                total=documents.count(),
+                disable=progress_bar_disable,
+            ):
+                rows.append({**fields, "indexed": indexed})
+                written.add(fields["id"])
+                if len(rows) == REINDEX_CHUNK_SIZE:
+                    self.dialect.insert(cursor, rows)
+                    rows = []
+            if rows:
+                self.dialect.insert(cursor, rows)
+        return written
+
+    def update_documents(
+        self,
+        document_ids: Iterable[int],
+        *,
+        remove_ids: Iterable[int] = (),
+    ) -> None:
+        update_ids = set(document_ids)
+        remove_ids = set(remove_ids)
+        with transaction.atomic():
+            if update_ids:
+                update_ids -= self._write(Document.objects.filter(pk__in=update_ids))
+            # Documents deleted in the meantime
+            if update_ids or remove_ids:
+                with connection.cursor() as cursor:
+                    self.dialect.delete(cursor, update_ids | remove_ids)
+
+    def reindex(
+        self,
+        documents: QuerySet[Document],
+        *,
+        processes: int = 1,
+        progress_bar_disable: bool = False,
+    ) -> None:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                self.dialect.clear(cursor)
+            self._write(documents, progress_bar_disable=progress_bar_disable)
+
+    def reconcile(
+        self,
+        documents: QuerySet[Document],
+        *,
+        progress_bar_disable: bool = False,
+    ) -> tuple[int, int, int]:
+        with connection.cursor() as cursor:
+            indexed = dict(self.dialect.indexed_documents(cursor))
+
+        added_ids = []
+        updated_ids = []
+        for doc_id, modified in documents.values_list("pk", "modified").iterator():
+            indexed_modified = indexed.pop(doc_id, None)
+            if indexed_modified is None:
+                added_ids.append(doc_id)
+            elif indexed_modified != modified.isoformat():
+                updated_ids.append(doc_id)
+        # Whatever is left is not a document (anymore)
+        removed_ids = list(indexed)
+
+        with transaction.atomic():
+            if removed_ids:
+                with connection.cursor() as cursor:
+                    self.dialect.delete(cursor, removed_ids)
+            if added_ids or updated_ids:
+                self._write(
+                    Document.objects.filter(pk__in=added_ids + updated_ids),
+                    progress_bar_disable=progress_bar_disable,
+                )
+
+        logger.info(
+            f"Reconciled the index: {len(added_ids)} added, {len(updated_ids)} "
+            f"updated, {len(removed_ids)} removed",
+        )
+        return len(added_ids), len(updated_ids), len(removed_ids)
+
+    def optimize(self) -> None:
+        with connection.cursor() as cursor:
+            self.dialect.optimize(cursor)
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            self.dialect.clear(cursor)
+
+    def count(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM documents_search")
+            (count,) = cursor.fetchone()
+        return count
+
+    def last_modified(self) -> datetime | None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT max(indexed) FROM documents_search")
+            (indexed,) = cursor.fetchone()
+        if isinstance(indexed, str):
+            return datetime.fromisoformat(indexed)
+        return indexed
+
+    def open_searcher(self):
+        # The queries are run with the connection of the request
+        return nullcontext()
+
+    def get_query(
+        self,
+        searcher,
+        query_params,
+        page_size: int,
+        *,
+        filter_queryset: QuerySet,
+        user: User | None = None,
+    ) -> DatabaseSearchQuery:
+        if "query" in query_params:
+            clauses = parse_query(query_params["query"])
+            return DatabaseSearchQuery(
+                self.dialect,
+                query_params,
+                filter_queryset=filter_queryset,
+                clauses=clauses,
+                match=self.dialect.render(clauses) if clauses else None,
+            )
+        elif "more_like_id" in query_params:
+            more_like_doc_id = int(query_params["more_like_id"])
+            filter_queryset = filter_queryset.exclude(pk=more_like_doc_id)
+            similar = similarity.get_similar_documents(
+                more_like_doc_id,
+                limit=MORE_LIKE_THIS_LIMIT,
+                visible=get_filter_document_ids(filter_queryset, user),
+            )
+            if similar is not None:
+                return DatabaseSearchQuery(
+                    self.dialect,
+                    query_params,
+                    filter_queryset=filter_queryset,
+                    clauses=[],
+                    scores=dict(similar),
+                )
+
+            content = Document.objects.get(id=more_like_doc_id).content
+            clauses = [
+                SearchClause(words=(word,), field="content")
+                for word in get_frequent_words(content, MORE_LIKE_THIS_TERMS)
+            ]
+            return DatabaseSearchQuery(
+                self.dialect,
+                query_params,
+                filter_queryset=filter_queryset,
+                clauses=clauses,
+                match=(
+                    self.dialect.render(clauses, any_clause=True) if clauses else None
+                ),
+            )
+        else:
+            raise ValueError
+
+    def autocomplete(self, term: str, limit: int, user: User | None) -> list[bytes]:
+        if limit <= 0:
+            return []
+        prefix = term.lower()
+        visible = get_visible_documents(user)
+        with connection.cursor() as cursor:
+            terms = self.dialect.autocomplete(cursor, prefix, limit, visible)
+        if prefix in terms:
+            terms.insert(0, terms.pop(terms.index(prefix)))
+        return [term.encode() for term in terms]
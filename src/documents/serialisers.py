@@ -18,6 +18,7 @@ from django.core.validators import DecimalValidator
 from django.core.validators import MaxLengthValidator
 from django.core.validators import RegexValidator
 from django.core.validators import integer_validator
+from django.db.models.functions import Substr
 from django.utils.crypto import get_random_string
 from django.utils.text import slugify
 from django.utils.translation import gettext as _
@@ -866,6 +867,9 @@ class DocumentSerializer(
     NestedUpdateMixin,
     DynamicFieldsModelSerializer,
 ):
+    # The number of characters of the content returned with truncate_content
+    TRUNCATED_CONTENT_CHARS = 550
+
     correspondent = CorrespondentField(allow_null=True)
     tags = TagsField(many=True)
     document_type = DocumentTypeField(allow_null=True)
@@ -910,7 +914,7 @@ class DocumentSerializer(
     def to_representation(self, instance):
         doc = super().to_representation(instance)
         if self.truncate_content and "content" in self.fields:
-            doc["content"] = doc.get("content")[0:550]
+            doc["content"] = doc.get("content")[0 : self.TRUNCATED_CONTENT_CHARS]
         return doc
 
     def validate(self, attrs):
@@ -1041,8 +1045,22 @@ class DocumentSerializer(
 class SearchResultListSerializer(serializers.ListSerializer):
     def to_representation(self, hits):
         document_ids = [hit["id"] for hit in hits]
+        # Only the beginning of the content is needed for the highlights and
+        # the truncated content
+        if "content" not in self.child.fields:
+            content_chars = settings.SEARCH_HIGHLIGHT_MAX_CHARS
+        elif self.child.truncate_content:
+            content_chars = max(
+                settings.SEARCH_HIGHLIGHT_MAX_CHARS,
+                self.child.TRUNCATED_CONTENT_CHARS,
+            )
+        else:
+            content_chars = None
         # Fetch all Document objects in the list in one SQL query.
-        documents = self.child.fetch_documents(document_ids)
+        documents = self.child.fetch_documents(
+            document_ids,
+            content_chars=content_chars,
+        )
         self.child.context["documents"] = documents
         # Also check if they are shared with other users / groups.
         self.child.context["shared_object_pks"] = self.child.get_shared_object_pks(
@@ -1054,13 +1072,14 @@ class SearchResultListSerializer(serializers.ListSerializer):
 
 class SearchResultSerializer(DocumentSerializer):
     @staticmethod
-    def fetch_documents(ids):
+    def fetch_documents(ids, *, content_chars: int | None = None):
         """
         Return a dict that maps given document IDs to Document objects.
+        If content_chars is given, only that many characters of the content
+        are loaded.
         """
-        return {
-            document.id: document
-            for document in Document.objects.select_related(
+        documents = (
+            Document.objects.select_related(
                 "correspondent",
                 "storage_path",
                 "document_type",
@@ -1068,7 +1087,17 @@ class SearchResultSerializer(DocumentSerializer):
             )
             .prefetch_related("tags", "custom_fields", "notes")
             .filter(id__in=ids)
-        }
+        )
+        if content_chars is not None:
+            documents = documents.defer("content").annotate(
+                truncated_content=Substr("content", 1, content_chars),
+            )
+        fetched = {}
+        for document in documents:
+            if content_chars is not None:
+                document.content = document.truncated_content
+            fetched[document.id] = document
+        return fetched
 
     def to_representation(self, hit):
         # Again we first check if the parent has already fetched the documents.
@@ -1086,7 +1115,10 @@ class SearchResultSerializer(DocumentSerializer):
         r = super().to_representation(document)
         r["__search_hit__"] = {
             "score": hit.score,
-            "highlights": hit.highlights("content", text=document.content),
+            "highlights": hit.highlights(
+                "content",
+                text=document.content[: settings.SEARCH_HIGHLIGHT_MAX_CHARS],
+            ),
             "note_highlights": (
                 hit.highlights("notes", text=notes) if document else None
             ),
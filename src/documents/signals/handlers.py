@@ -21,9 +21,14 @@ from django.db.models import Q
 from django.dispatch import receiver
 from django.utils import timezone
 from filelock import FileLock
+from guardian.models import GroupObjectPermission
+from guardian.models import UserObjectPermission
 from guardian.shortcuts import remove_perm
 
 from documents import matching
+from documents.caching import bump_classifier_generation
+from documents.caching import bump_matching_generation
+from documents.caching import bump_search_filter_generation
 from documents.caching import clear_document_caches
 from documents.file_handling import create_source_path_directory
 from documents.file_handling import delete_empty_directories
@@ -35,8 +40,10 @@ from documents.models import CustomFieldInstance
 from documents.models import Document
 from documents.models import DocumentType
 from documents.models import MatchingModel
+from documents.models import Note
 from documents.models import PaperlessTask
 from documents.models import SavedView
+from documents.models import StoragePath
 from documents.models import Tag
 from documents.models import Workflow
 from documents.models import WorkflowAction
@@ -49,6 +56,7 @@ from documents.templating.workflows import parse_w_workflow_placeholders
 if TYPE_CHECKING:
     from pathlib import Path
 
+    from documents.classifier import ClassifierPredictions
     from documents.classifier import DocumentClassifier
     from documents.data_models import ConsumableDocument
     from documents.data_models import DocumentMetadataOverrides
@@ -95,6 +103,7 @@ def set_correspondent(
     *,
     logging_group=None,
     classifier: DocumentClassifier | None = None,
+    predictions: ClassifierPredictions | None = None,
     replace=False,
     use_first=True,
     suggest=False,
@@ -106,7 +115,11 @@ def set_correspondent(
     if document.correspondent and not replace:
         return
 
-    potential_correspondents = matching.match_correspondents(document, classifier)
+    potential_correspondents = matching.match_correspondents(
+        document,
+        classifier,
+        predictions=predictions,
+    )
 
     potential_count = len(potential_correspondents)
     selected = potential_correspondents[0] if potential_correspondents else None
@@ -151,6 +164,7 @@ def set_document_type(
     *,
     logging_group=None,
     classifier: DocumentClassifier | None = None,
+    predictions: ClassifierPredictions | None = None,
     replace=False,
     use_first=True,
     suggest=False,
@@ -162,7 +176,11 @@ def set_document_type(
     if document.document_type and not replace:
         return
 
-    potential_document_type = matching.match_document_types(document, classifier)
+    potential_document_type = matching.match_document_types(
+        document,
+        classifier,
+        predictions=predictions,
+    )
 
     potential_count = len(potential_document_type)
     selected = potential_document_type[0] if potential_document_type else None
@@ -208,6 +226,7 @@ def set_tags(
     *,
     logging_group=None,
     classifier: DocumentClassifier | None = None,
+    predictions: ClassifierPredictions | None = None,
     replace=False,
     suggest=False,
     base_url=None,
@@ -224,7 +243,11 @@ def set_tags(
 
     current_tags = set(document.tags.all())
 
-    matched_tags = matching.match_tags(document, classifier)
+    matched_tags = matching.match_tags(
+        document,
+        classifier,
+        predictions=predictions,
+    )
 
     relevant_tags = set(matched_tags) - current_tags
 
@@ -264,6 +287,7 @@ def set_storage_path(
     *,
     logging_group=None,
     classifier: DocumentClassifier | None = None,
+    predictions: ClassifierPredictions | None = None,
     replace=False,
     use_first=True,
     suggest=False,
@@ -278,6 +302,7 @@ def set_storage_path(
     potential_storage_path = matching.match_storage_paths(
         document,
         classifier,
+        predictions=predictions,
     )
 
     potential_count = len(potential_storage_path)
@@ -318,6 +343,71 @@ def set_storage_path(
             document.save(update_fields=("storage_path",))
 
 
+@receiver(models.signals.post_save, sender=Document)
+@receiver(models.signals.post_delete, sender=Document)
+@receiver(models.signals.m2m_changed, sender=Document.tags.through)
+@receiver(models.signals.post_save, sender=Tag)
+@receiver(models.signals.post_delete, sender=Tag)
+@receiver(models.signals.post_save, sender=Correspondent)
+@receiver(models.signals.post_delete, sender=Correspondent)
+@receiver(models.signals.post_save, sender=DocumentType)
+@receiver(models.signals.post_delete, sender=DocumentType)
+@receiver(models.signals.post_save, sender=StoragePath)
+@receiver(models.signals.post_delete, sender=StoragePath)
+def update_classifier_generation(sender, **kwargs):
+    """
+    Documents, their labels or the matching of labels changed, so the
+    classifier might need to be trained again
+    """
+    bump_classifier_generation()
+
+
+@receiver(models.signals.post_save, sender=Tag)
+@receiver(models.signals.post_delete, sender=Tag)
+@receiver(models.signals.post_save, sender=Correspondent)
+@receiver(models.signals.post_delete, sender=Correspondent)
+@receiver(models.signals.post_save, sender=DocumentType)
+@receiver(models.signals.post_delete, sender=DocumentType)
+@receiver(models.signals.post_save, sender=StoragePath)
+@receiver(models.signals.post_delete, sender=StoragePath)
+def update_matching_generation(sender, **kwargs):
+    """
+    Labels or their matching changed, so the compiled matchers of all
+    processes need to be built again
+    """
+    bump_matching_generation()
+
+
+@receiver(models.signals.post_save, sender=Document)
+@receiver(models.signals.post_delete, sender=Document)
+@receiver(models.signals.m2m_changed, sender=Document.tags.through)
+@receiver(models.signals.post_save, sender=Tag)
+@receiver(models.signals.post_delete, sender=Tag)
+@receiver(models.signals.post_save, sender=Correspondent)
+@receiver(models.signals.post_delete, sender=Correspondent)
+@receiver(models.signals.post_save, sender=DocumentType)
+@receiver(models.signals.post_delete, sender=DocumentType)
+@receiver(models.signals.post_save, sender=StoragePath)
+@receiver(models.signals.post_delete, sender=StoragePath)
+@receiver(models.signals.post_save, sender=CustomField)
+@receiver(models.signals.post_delete, sender=CustomField)
+@receiver(models.signals.post_save, sender=CustomFieldInstance)
+@receiver(models.signals.post_delete, sender=CustomFieldInstance)
+@receiver(models.signals.post_save, sender=Note)
+@receiver(models.signals.post_delete, sender=Note)
+@receiver(models.signals.post_save, sender=UserObjectPermission)
+@receiver(models.signals.post_delete, sender=UserObjectPermission)
+@receiver(models.signals.post_save, sender=GroupObjectPermission)
+@receiver(models.signals.post_delete, sender=GroupObjectPermission)
+@receiver(models.signals.m2m_changed, sender=User.groups.through)
+def update_search_filter_generation(sender, **kwargs):
+    """
+    Documents, anything they can be filtered by or their permissions changed,
+    so the cached visible documents of the full text search are outdated
+    """
+    bump_search_filter_generation()
+
+
 # see empty_trash in documents/tasks.py for signal handling
 def cleanup_document_deletion(sender, instance, **kwargs):
     with FileLock(settings.MEDIA_LOCK):
@@ -580,7 +670,7 @@ def cleanup_custom_field_deletion(sender, instance: CustomField, **kwargs):
 def add_to_index(sender, document, **kwargs):
     from documents import index
 
-    index.add_or_update_document(document)
+    index.queue_document_update(document)
 
 
 def run_workflows_added(
@@ -1324,6 +1414,22 @@ def task_postrun_handler(
         logger.exception("Updating PaperlessTask failed")
 
 
+@task_postrun.connect
+def flush_index_updates_handler(**kwargs):
+    """
+    Applies the index updates queued by a task before its worker process may
+    exit.
+
+    https://docs.celeryq.dev/en/stable/userguide/signals.html#task-postrun
+    """
+    try:
+        from documents import index
+
+        index.flush_index_updates()
+    except Exception:  # pragma: no cover
+        logger.exception("Applying queued index updates failed")
+
+
 @task_failure.connect
 def task_failure_handler(
     sender=None,
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import logging
+import pickle
+import shutil
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from typing import Final
+from uuid import uuid4
+
+from django.conf import settings
+from django.utils import timezone
+from filelock import FileLock
+
+from documents.models import Document
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from django.db.models import QuerySet
+    from numpy import ndarray
+    from whoosh.idsets import BitSet
+
+logger = logging.getLogger("paperless.similarity")
+
+# Number of hashed term features the content is vectorized with
+SIMILARITY_FEATURES: Final[int] = 2**18
+# Number of dimensions of the document vectors
+SIMILARITY_DIMENSIONS: Final[int] = 128
+# Number of documents loaded from the database at once while building
+SIMILARITY_CHUNK_SIZE: Final[int] = 1000
+# Documents less similar than this are not considered similar at all
+SIMILARITY_MIN_SCORE: Final[float] = 0.1
+
+# The name of the current build, which is a directory of the similarity index
+CURRENT_FILE: Final[str] = "current"
+MODEL_FILE: Final[str] = "model.pickle"
+VECTORS_FILE: Final[str] = "vectors.npy"
+IDS_FILE: Final[str] = "ids.npy"
+# Vectors of documents changed since the build
+UPDATES_FILE: Final[str] = "updates.npz"
+
+
+def _lock() -> FileLock:
+    settings.SIMILARITY_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    return FileLock(settings.SIMILARITY_INDEX_DIR / ".lock")
+
+
+def _hash_contents(contents: Iterable[str]):
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    # Stateless, so documents can be vectorized without a vocabulary
+    return HashingVectorizer(
+        n_features=SIMILARITY_FEATURES,
+        alternate_sign=False,
+        norm=None,
+        dtype="float32",
+    ).transform(contents)
+
+
+class SimilarityModel:
+    """
+    Turns document contents into normalized vectors of SIMILARITY_DIMENSIONS
+    dimensions, using TF-IDF weighted hashed terms reduced with a truncated SVD.
+    The dot product of two vectors is the cosine similarity of the documents.
+    """
+
+    def __init__(self, transformer, svd) -> None:
+        self.transformer = transformer
+        self.svd = svd
+
+    @classmethod
+    def fit(cls, hashed) -> tuple[SimilarityModel, ndarray]:
+        """
+        Fits a model to the given hashed contents and returns it along with
+        the vectors of the contents
+        """
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfTransformer
+
+        transformer = TfidfTransformer(sublinear_tf=True)
+        weighted = transformer.fit_transform(hashed)
+        svd = TruncatedSVD(
+            n_components=min(SIMILARITY_DIMENSIONS, hashed.shape[0] - 1),
+            random_state=0,
+        )
+        model = cls(transformer, svd)
+        return model, model._normalize(svd.fit_transform(weighted))
+
+    def transform(self, contents: Iterable[str]) -> ndarray:
+        return self._normalize(
+            self.svd.transform(self.transformer.transform(_hash_contents(contents))),
+        )
+
+    @staticmethod
+    def _normalize(vectors) -> ndarray:
+        from sklearn.preprocessing import normalize
+
+        return normalize(vectors).astype("float32")
+
+
+def rebuild(documents: QuerySet | None = None) -> int:
+    """
+    Builds the similarity index from the content of the given (by default
+    all) documents and makes it the current one.  Returns the number of
+    documents in the index.
+    """
+    import numpy as np
+    import scipy.sparse
+
+    if documents is None:
+        documents = Document.objects.all()
+    started = timezone.now()
+
+    ids = []
+    chunks = []
+    contents = []
+    for document_id, content in (
+        documents.order_by("pk")
+        .values_list("pk", "content")
+        .iterator(chunk_size=SIMILARITY_CHUNK_SIZE)
+    ):
+        ids.append(document_id)
+        contents.append(content)
+        if len(contents) == SIMILARITY_CHUNK_SIZE:
+            chunks.append(_hash_contents(contents))
+            contents = []
+    if contents:
+        chunks.append(_hash_contents(contents))
+
+    if len(ids) < 2:
+        logger.info("Not enough documents for a similarity index")
+        clear()
+        return 0
+
+    model, vectors = SimilarityModel.fit(scipy.sparse.vstack(chunks).tocsr())
+
+    build = uuid4().hex
+    build_dir = settings.SIMILARITY_INDEX_DIR / build
+    build_dir.mkdir(parents=True)
+    np.save(build_dir / VECTORS_FILE, vectors)
+    np.save(build_dir / IDS_FILE, np.array(ids, dtype="int64"))
+    with (build_dir / MODEL_FILE).open("wb") as f:
+        pickle.dump(model, f, pickle.HIGHEST_PROTOCOL)
+
+    with _lock():
+        current = settings.SIMILARITY_INDEX_DIR / CURRENT_FILE
+        current_tmp = current.with_suffix(".tmp")
+        current_tmp.write_text(build)
+        current_tmp.replace(current)
+        _remove_builds(keep=build)
+
+    logger.info(f"Built the similarity index of {len(ids)} documents")
+
+    # Pick up content changes made while building
+    update_documents(
+        documents.filter(modified__gte=started).values_list("pk", flat=True),
+    )
+    return len(ids)
+
+
+def clear() -> None:
+    """
+    Removes the similarity index
+    """
+    with _lock():
+        (settings.SIMILARITY_INDEX_DIR / CURRENT_FILE).unlink(missing_ok=True)
+        _remove_builds(keep=None)
+
+
+def _remove_builds(keep: str | None) -> None:
+    # Processes which still use a removed build keep their files open
+    for path in settings.SIMILARITY_INDEX_DIR.iterdir():
+        if path.is_dir() and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _current_build_dir() -> Path | None:
+    try:
+        build = (settings.SIMILARITY_INDEX_DIR / CURRENT_FILE).read_text()
+    except FileNotFoundError:
+        return None
+    return settings.SIMILARITY_INDEX_DIR / build
+
+
+def update_documents(document_ids: Iterable[int]) -> None:
+    """
+    Updates the vectors of the given documents from their current content,
+    using the model of the current build.  Documents which no longer exist
+    get an empty vector, which is similar to nothing.  Does nothing if there
+    is no similarity index yet.
+    """
+    document_ids = set(document_ids)
+    if not document_ids:
+        return
+
+    try:
+        _update_documents(document_ids)
+    except Exception:
+        # The similarity index is caught up by its next build
+        logger.exception("Error while updating the similarity index")
+
+
+def _update_documents(document_ids: set[int]) -> None:
+    import numpy as np
+
+    with _lock():
+        index = _get_index()
+        if index is None:
+            return
+        contents = dict(
+            Document.objects.filter(pk__in=document_ids).values_list(
+                "pk",
+                "content",
+            ),
+        )
+        ids = sorted(document_ids)
+        vectors = np.zeros((len(ids), index.vectors.shape[1]), dtype="float32")
+        if contents:
+            rows = [i for i, document_id in enumerate(ids) if document_id in contents]
+            vectors[rows] = index.model.transform([contents[ids[i]] for i in rows])
+
+        index.refresh_updates()
+        updates = index.updates
+        keep = ~np.isin(updates.ids, list(document_ids))
+        updates_file = index.build_dir / UPDATES_FILE
+        updates_tmp = index.build_dir / f"{uuid4().hex}.npz"
+        np.savez(
+            updates_tmp,
+            ids=np.concatenate(
+                [updates.ids[keep], np.array(ids, dtype="int64")],
+            ),
+            vectors=np.concatenate([updates.vectors[keep], vectors]),
+        )
+        updates_tmp.replace(updates_file)
+
+
+@dataclass(frozen=True)
+class SimilarityUpdates:
+    """
+    The vectors of documents changed since a build, which are replaced as a
+    whole whenever they change
+    """
+
+    ids: ndarray
+    vectors: ndarray
+    # Rows of the build which were replaced by updated vectors
+    replaced: ndarray
+    # The inode and modification time of the updates file, if any
+    version: tuple[int, int] | None = None
+
+
+class SimilarityIndex:
+    """
+    The vectors of a build of the similarity index.  The vectors of the build
+    are memory mapped, the vectors of documents changed since the build are
+    loaded whenever they change.
+    """
+
+    def __init__(self, build_dir: Path) -> None:
+        import numpy as np
+
+        self.build_dir = build_dir
+        self.ids = np.load(build_dir / IDS_FILE)
+        self.vectors = np.load(build_dir / VECTORS_FILE, mmap_mode="r")
+        with (build_dir / MODEL_FILE).open("rb") as f:
+            self.model: SimilarityModel = pickle.load(f)
+        # Read once into a local by each reader, as it may be swapped by
+        # another thread
+        self.updates = SimilarityUpdates(
+            ids=np.empty(0, dtype="int64"),
+            vectors=np.empty((0, self.vectors.shape[1]), dtype="float32"),
+            replaced=np.zeros(len(self.ids), dtype=bool),
+        )
+
+    def refresh_updates(self) -> None:
+        import numpy as np
+
+        try:
+            stat = (self.build_dir / UPDATES_FILE).stat()
+        except FileNotFoundError:
+            return
+        # The file is replaced on every change
+        version = (stat.st_ino, stat.st_mtime_ns)
+        if version == self.updates.version:
+            return
+        with np.load(self.build_dir / UPDATES_FILE) as loaded:
+            update_ids = loaded["ids"]
+            updates = SimilarityUpdates(
+                ids=update_ids,
+                vectors=loaded["vectors"],
+                replaced=np.isin(self.ids, update_ids),
+                version=version,
+            )
+        with _index_lock:
+            self.updates = updates
+
+    def vector(self, document_id: int) -> ndarray | None:
+        import numpy as np
+
+        updates = self.updates
+        (updated,) = np.nonzero(updates.ids == document_id)
+        if len(updated):
+            return updates.vectors[updated[-1]]
+        row = np.searchsorted(self.ids, document_id)
+        if row < len(self.ids) and self.ids[row] == document_id:
+            return np.asarray(self.vectors[row])
+        return None
+
+    def similar(
+        self,
+        vector: ndarray,
+        *,
+        limit: int,
+        exclude: int | None = None,
+        visible: BitSet | None = None,
+    ) -> list[tuple[int, float]]:
+        import numpy as np
+
+        updates = self.updates
+        ids = np.concatenate([self.ids, updates.ids])
+        scores = np.concatenate(
+            [self.vectors @ vector, updates.vectors @ vector],
+        )
+        scores[: len(self.ids)][updates.replaced] = -np.inf
+        if exclude is not None:
+            scores[ids == exclude] = -np.inf
+        if visible is not None:
+            visible_ids = np.unpackbits(
+                np.frombuffer(visible.bits, dtype="uint8"),
+                bitorder="little",
+            ).astype(bool)
+            in_range = ids < len(visible_ids)
+            in_range[in_range] = visible_ids[ids[in_range]]
+            scores[~in_range] = -np.inf
+
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (int(ids[i]), float(scores[i]))
+            for i in top
+            if scores[i] >= SIMILARITY_MIN_SCORE
+        ]
+
+
+_index: SimilarityIndex | None = None
+_index_lock = threading.Lock()
+
+
+def _get_index() -> SimilarityIndex | None:
+    """
+    Returns the current build of the similarity index, if there is one
+    """
+    global _index
+    build_dir = _current_build_dir()
+    with _index_lock:
+        if build_dir is None:
+            _index = None
+        elif _index is None or _index.build_dir != build_dir:
+            try:
+                _index = SimilarityIndex(build_dir)
+            except FileNotFoundError:
+                # Replaced by a new build meanwhile
+                return None
+        return _index
+
+
+def get_similar_documents(
+    document_id: int,
+    *,
+    limit: int,
+    visible: BitSet | None = None,
+) -> list[tuple[int, float]] | None:
+    """
+    Returns the IDs of the documents most similar to the given one, with
+    their similarity from 0 to 1, best first.  Only documents in `visible`
+    are considered, if given.  Returns None if there is no similarity index.
+    """
+    index = _get_index()
+    if index is None:
+        return None
+    index.refresh_updates()
+
+    vector = index.vector(document_id)
+    if vector is None:
+        # Not vectorized yet, for example added since the build
+        content = (
+            Document.objects.filter(pk=document_id)
+            .values_list("content", flat=True)
+            .first()
+        )
+        if content is None:
+            return []
+        vector = index.model.transform([content])[0]
+
+    return index.similar(vector, limit=limit, exclude=document_id, visible=visible)
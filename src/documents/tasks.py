@@ -6,7 +6,6 @@ from datetime import timedelta
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
-import tqdm
 from celery import Task
 from celery import shared_task
 from celery import states
@@ -17,12 +16,19 @@ from django.db import transaction
 from django.db.models.signals import post_save
 from django.utils import timezone
 from filelock import FileLock
-from whoosh.writing import AsyncWriter
 
 from documents import index
 from documents import sanity_checker
+from documents import similarity
 from documents.barcodes import BarcodePlugin
+from documents.caching import classifier_cache_info_cached
+from documents.caching import classifier_training_data_unchanged
 from documents.caching import clear_document_caches
+from documents.caching import get_classifier_training_marker
+from documents.caching import get_suggestion_caches
+from documents.caching import set_classifier_cache_info
+from documents.caching import set_classifier_trained_marker
+from documents.caching import set_suggestions_cache
 from documents.classifier import DocumentClassifier
 from documents.classifier import load_classifier
 from documents.consumer import ConsumerPlugin
@@ -32,6 +38,7 @@ from documents.data_models import DocumentMetadataOverrides
 from documents.double_sided import CollatePlugin
 from documents.file_handling import create_source_path_directory
 from documents.file_handling import generate_unique_filename
+from documents.matching import get_suggestions
 from documents.models import Correspondent
 from documents.models import CustomFieldInstance
 from documents.models import Document
@@ -57,22 +64,57 @@ if settings.AUDIT_LOG_ENABLED:
     from auditlog.models import LogEntry
 logger = logging.getLogger("paperless.tasks")
 
+# Number of inbox documents suggestions are precomputed for at once
+SUGGESTIONS_BATCH_SIZE = 100
+
 
 @shared_task
 def index_optimize():
-    ix = index.open_index()
-    writer = AsyncWriter(ix)
-    writer.commit(optimize=True)
+    index.get_search_backend().optimize()
+
+
+@shared_task
+def index_merge():
+    merges, merged_bytes = index.get_search_backend().merge()
+    return f"Index segments merged: {merges} merges of {merged_bytes} bytes"
 
 
-def index_reindex(*, progress_bar_disable=False):
-    documents = Document.objects.all()
+@shared_task
+def index_reconcile(*, progress_bar_disable=True):
+    added, updated, removed = index.get_search_backend().reconcile(
+        Document.objects.all(),
+        progress_bar_disable=progress_bar_disable,
+    )
+    return f"Index reconciled: {added} added, {updated} updated, {removed} removed"
 
-    ix = index.open_index(recreate=True)
 
-    with AsyncWriter(ix) as writer:
-        for document in tqdm.tqdm(documents, disable=progress_bar_disable):
-            index.update_document(writer, document)
+def index_reindex(*, processes=1, progress_bar_disable=False):
+    index.get_search_backend().reindex(
+        Document.objects.all(),
+        processes=processes,
+        progress_bar_disable=progress_bar_disable,
+    )
+    similarity.rebuild(Document.objects.all())
+
+
+def index_migrate(backend_name: str, *, progress_bar_disable=False) -> int:
+    """
+    Builds the index of the given search backend from all documents, so the
+    deployment can switch to it.  The index of the other backend is kept.
+    Returns the number of indexed documents.
+    """
+    backend = index.get_search_backend(backend_name)
+    backend.reindex(
+        Document.objects.all(),
+        progress_bar_disable=progress_bar_disable,
+    )
+    return backend.count()
+
+
+@shared_task
+def build_similarity_index():
+    count = similarity.rebuild(Document.objects.all())
+    return f"Similarity index built with {count} documents"
 
 
 @shared_task
@@ -87,6 +129,28 @@ def train_classifier(*, scheduled=True):
         date_created=timezone.now(),
         date_started=timezone.now(),
     )
+    # Determined before the training, so changes during the training are
+    # picked up by the next run
+    marker = get_classifier_training_marker()
+    if settings.MODEL_FILE.exists() and classifier_training_data_unchanged(marker):
+        # Train anyway if the model cannot be loaded
+        classifier = load_classifier()
+        if classifier is not None:
+            result = "Training data unchanged"
+            logger.debug(result)
+            # Suggestions are checked against the information of the
+            # classifier, which is only cached for a while.  Once it was
+            # evicted, the cached suggestions are no longer used
+            suggestions_evicted = not classifier_cache_info_cached()
+            set_classifier_cache_info(classifier)
+            task.status = states.SUCCESS
+            task.result = result
+            task.date_done = timezone.now()
+            task.save()
+            if suggestions_evicted:
+                precompute_inbox_suggestions.delay()
+            return
+
     if (
         not Tag.objects.filter(matching_algorithm=Tag.MATCH_AUTO).exists()
         and not DocumentType.objects.filter(matching_algorithm=Tag.MATCH_AUTO).exists()
@@ -106,13 +170,15 @@ def train_classifier(*, scheduled=True):
         task.save()
         return
 
-    classifier = load_classifier()
+    # Training modifies the classifier, so don't use the shared, cached instance
+    classifier = load_classifier(use_cache=False)
 
     if not classifier:
         classifier = DocumentClassifier()
 
     try:
-        if classifier.train():
+        trained = classifier.train()
+        if trained:
             logger.info(
                 f"Saving updated classifier model to {settings.MODEL_FILE}...",
             )
@@ -122,9 +188,12 @@ def train_classifier(*, scheduled=True):
             logger.debug("Training data unchanged.")
             task.result = "Training data unchanged"
 
+        set_classifier_trained_marker(marker)
         task.status = states.SUCCESS
         task.date_done = timezone.now()
         task.save(update_fields=["status", "result", "date_done"])
+        if trained or not classifier_cache_info_cached():
+            precompute_inbox_suggestions.delay()
 
     except Exception as e:
         logger.warning("Classifier error: " + str(e))
@@ -132,6 +201,40 @@ def train_classifier(*, scheduled=True):
         task.result = str(e)
 
 
+@shared_task
+def precompute_inbox_suggestions():
+    """
+    Caches the suggestions of all inbox documents which have no suggestions
+    from the current classifier cached yet, so they are immediately available
+    """
+    classifier = load_classifier()
+    if classifier is None:
+        return
+    set_classifier_cache_info(classifier)
+
+    documents = (
+        Document.objects.filter(tags__is_inbox_tag=True)
+        .distinct()
+        .select_related("owner")
+        .order_by("pk")
+    )
+    document_ids = list(documents.values_list("pk", flat=True))
+    computed = 0
+    for i in range(0, len(document_ids), SUGGESTIONS_BATCH_SIZE):
+        batch_ids = document_ids[i : i + SUGGESTIONS_BATCH_SIZE]
+        cached = get_suggestion_caches(batch_ids)
+        batch = [
+            document
+            for document in documents.filter(pk__in=batch_ids)
+            if document.pk not in cached
+        ]
+        for doc_id, suggestions in get_suggestions(batch, classifier).items():
+            set_suggestions_cache(doc_id, suggestions, classifier)
+        computed += len(batch)
+
+    logger.info(f"Precomputed suggestions for {computed} inbox documents")
+
+
 @shared_task(bind=True)
 def consume_file(
     self: Task,
@@ -223,8 +326,6 @@ def sanity_check(*, scheduled=True, raise_on_error=True):
 def bulk_update_documents(document_ids):
     documents = Document.objects.filter(id__in=document_ids)
 
-    ix = index.open_index()
-
     for doc in documents:
         clear_document_caches(doc.pk)
         document_updated.send(
@@ -234,9 +335,7 @@ def bulk_update_documents(document_ids):
         )
         post_save.send(Document, instance=doc, created=False)
 
-    with AsyncWriter(ix) as writer:
-        for doc in documents:
-            index.update_document(writer, doc)
+    index.get_search_backend().update_documents(document_ids)
 
 
 @shared_task
@@ -334,8 +433,8 @@ def update_document_content_maybe_archive_file(document_id):
         logger.info(
             f"Updating index for document {document_id} ({document.archive_checksum})",
         )
-        with index.open_index_writer() as writer:
-            index.update_document(writer, document)
+        index.get_search_backend().update_documents([document.pk])
+        similarity.update_documents([document.pk])
 
         clear_document_caches(document.pk)
 
@@ -3,6 +3,7 @@ import types
 from django.contrib.admin.sites import AdminSite
 from django.contrib.auth.models import User
 from django.test import TestCase
+from django.test import override_settings
 from django.utils import timezone
 
 from documents import index
@@ -12,6 +13,7 @@ from documents.tests.utils import DirectoriesMixin
 from paperless.admin import PaperlessUserAdmin
 
 
+@override_settings(INDEX_UPDATE_INTERVAL=0)
 class TestDocumentAdmin(DirectoriesMixin, TestCase):
     def get_document_from_index(self, doc):
         ix = index.open_index()
@@ -26,7 +28,8 @@ class TestDocumentAdmin(DirectoriesMixin, TestCase):
         doc = Document.objects.create(title="test")
 
         doc.title = "new title"
-        self.doc_admin.save_model(None, doc, None, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doc_admin.save_model(None, doc, None, None)
         self.assertEqual(Document.objects.get(id=doc.id).title, "new title")
         self.assertEqual(self.get_document_from_index(doc)["id"], doc.id)
 
@@ -35,7 +38,8 @@ class TestDocumentAdmin(DirectoriesMixin, TestCase):
         index.add_or_update_document(doc)
         self.assertIsNotNone(self.get_document_from_index(doc))
 
-        self.doc_admin.delete_model(None, doc)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doc_admin.delete_model(None, doc)
 
         self.assertRaises(Document.DoesNotExist, Document.objects.get, id=doc.id)
         self.assertIsNone(self.get_document_from_index(doc))
@@ -1510,10 +1510,10 @@ class TestDocumentApi(DirectoriesMixin, DocumentConsumeDelayMixin, APITestCase):
         response = self.client.get("/api/documents/34676/suggestions/")
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
-    @mock.patch("documents.views.match_storage_paths")
-    @mock.patch("documents.views.match_document_types")
-    @mock.patch("documents.views.match_tags")
-    @mock.patch("documents.views.match_correspondents")
+    @mock.patch("documents.matching.match_storage_paths")
+    @mock.patch("documents.matching.match_document_types")
+    @mock.patch("documents.matching.match_tags")
+    @mock.patch("documents.matching.match_correspondents")
     @override_settings(NUMBER_OF_SUGGESTED_DATES=10)
     def test_get_suggestions(
         self,
@@ -1546,10 +1546,10 @@ class TestDocumentApi(DirectoriesMixin, DocumentConsumeDelayMixin, APITestCase):
         )
 
     @mock.patch("documents.views.load_classifier")
-    @mock.patch("documents.views.match_storage_paths")
-    @mock.patch("documents.views.match_document_types")
-    @mock.patch("documents.views.match_tags")
-    @mock.patch("documents.views.match_correspondents")
+    @mock.patch("documents.matching.match_storage_paths")
+    @mock.patch("documents.matching.match_document_types")
+    @mock.patch("documents.matching.match_tags")
+    @mock.patch("documents.matching.match_correspondents")
     @override_settings(NUMBER_OF_SUGGESTED_DATES=10)
     def test_get_suggestions_cached(
         self,
@@ -1570,6 +1570,7 @@ class TestDocumentApi(DirectoriesMixin, DocumentConsumeDelayMixin, APITestCase):
         """
 
         # setup the cache how the classifier does it
+        from documents.classifier import ClassifierPredictions
         from documents.classifier import DocumentClassifier
 
         settings.MODEL_FILE.touch()
@@ -1582,10 +1583,12 @@ class TestDocumentApi(DirectoriesMixin, DocumentConsumeDelayMixin, APITestCase):
             mock.Mock(
                 last_auto_type_hash=classifier_checksum_bytes,
                 FORMAT_VERSION=DocumentClassifier.FORMAT_VERSION,
+                **{"predict_all.return_value": [ClassifierPredictions()]},
             ),
             mock.Mock(
                 last_auto_type_hash=classifier_checksum_bytes,
                 FORMAT_VERSION=DocumentClassifier.FORMAT_VERSION,
+                **{"predict_all.return_value": [ClassifierPredictions()]},
             ),
         ]
 
@@ -1659,6 +1662,137 @@ class TestDocumentApi(DirectoriesMixin, DocumentConsumeDelayMixin, APITestCase):
         self.client.get(f"/api/documents/{doc.pk}/suggestions/")
         self.assertFalse(parse_date_generator.called)
 
+    @override_settings(NUMBER_OF_SUGGESTED_DATES=10)
+    def test_get_bulk_suggestions(self):
+        """
+        GIVEN:
+            - Documents matching different objects
+            - Suggestions of one document are cached
+        WHEN:
+            - API request for the suggestions of all documents
+        THEN:
+            - The cached suggestions are returned for the cached document
+            - The suggestions of the other documents are computed and cached
+        """
+        from documents.caching import SuggestionCacheData
+        from documents.caching import get_suggestion_cache
+        from documents.caching import get_suggestion_cache_key
+        from documents.classifier import DocumentClassifier
+
+        invoice = Tag.objects.create(
+            name="invoice",
+            match="invoice",
+            matching_algorithm=MatchingModel.MATCH_ANY,
+        )
+        bank = Correspondent.objects.create(
+            name="bank",
+            match="bank",
+            matching_algorithm=MatchingModel.MATCH_ANY,
+        )
+        doc1 = Document.objects.create(
+            title="doc1",
+            checksum="1",
+            mime_type="application/pdf",
+            content="this is an invoice from 12.04.2022!",
+        )
+        doc2 = Document.objects.create(
+            title="doc2",
+            checksum="2",
+            mime_type="application/pdf",
+            content="a letter from the bank",
+        )
+        doc3 = Document.objects.create(
+            title="doc3",
+            checksum="3",
+            mime_type="application/pdf",
+            content="cached",
+        )
+
+        classifier = mock.Mock(
+            last_auto_type_hash=b"thisisachecksum",
+            FORMAT_VERSION=DocumentClassifier.FORMAT_VERSION,
+        )
+        classifier.predict_all.side_effect = lambda contents: [None] * len(contents)
+        cache.set(CLASSIFIER_HASH_KEY, hexlify(b"thisisachecksum").decode())
+        cache.set(CLASSIFIER_VERSION_KEY, DocumentClassifier.FORMAT_VERSION)
+        cached_suggestions = {
+            "correspondents": [bank.pk],
+            "tags": [],
+            "document_types": [],
+            "storage_paths": [],
+            "dates": [],
+        }
+        cache.set(
+            get_suggestion_cache_key(doc3.pk),
+            SuggestionCacheData(
+                DocumentClassifier.FORMAT_VERSION,
+                hexlify(b"thisisachecksum").decode(),
+                cached_suggestions,
+            ),
+        )
+
+        with mock.patch("documents.views.load_classifier", return_value=classifier):
+            response = self.client.post(
+                "/api/documents/bulk_suggestions/",
+                {"documents": [doc1.pk, doc2.pk, doc3.pk]},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                doc1.pk: {
+                    "correspondents": [],
+                    "tags": [invoice.pk],
+                    "document_types": [],
+                    "storage_paths": [],
+                    "dates": ["2022-04-12"],
+                },
+                doc2.pk: {
+                    "correspondents": [bank.pk],
+                    "tags": [],
+                    "document_types": [],
+                    "storage_paths": [],
+                    "dates": [],
+                },
+                doc3.pk: cached_suggestions,
+            },
+        )
+        # Both uncached documents are predicted at once
+        classifier.predict_all.assert_called_once()
+        self.assertEqual(
+            get_suggestion_cache(doc1.pk).suggestions,
+            response.data[doc1.pk],
+        )
+
+    def test_get_bulk_suggestions_insufficient_permissions(self):
+        """
+        GIVEN:
+            - Document owned by another user
+        WHEN:
+            - API request for bulk suggestions by a user without permissions
+        THEN:
+            - The request is refused
+        """
+        owner = User.objects.create_user(username="owner")
+        user = User.objects.create_user(username="test")
+        user.user_permissions.add(*Permission.objects.filter(codename="view_document"))
+        self.client.force_authenticate(user=user)
+        doc = Document.objects.create(
+            title="test",
+            mime_type="application/pdf",
+            content="content",
+            owner=owner,
+        )
+
+        response = self.client.post(
+            "/api/documents/bulk_suggestions/",
+            {"documents": [doc.pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_saved_views(self):
         u1 = User.objects.create_superuser("user1")
         u2 = User.objects.create_superuser("user2")
@@ -7,6 +7,7 @@ from dateutil.relativedelta import relativedelta
 from django.contrib.auth.models import Group
 from django.contrib.auth.models import Permission
 from django.contrib.auth.models import User
+from django.db.models.functions import Substr
 from django.test import override_settings
 from django.utils import timezone
 from guardian.shortcuts import assign_perm
@@ -15,6 +16,7 @@ from rest_framework.test import APITestCase
 from whoosh.writing import AsyncWriter
 
 from documents import index
+from documents import similarity
 from documents.bulk_edit import set_permissions
 from documents.models import Correspondent
 from documents.models import CustomField
@@ -90,6 +92,71 @@ class TestDocumentSearchApi(DirectoriesMixin, APITestCase):
         self.assertEqual(len(results), 0)
         self.assertCountEqual(response.data["all"], [])
 
+    @override_settings(SEARCH_HIGHLIGHT_MAX_CHARS=100)
+    def test_search_highlights_limited(self):
+        """
+        GIVEN:
+            - Document with a long content
+        WHEN:
+            - Search for terms at the start and at the end of the content
+            - With and without the content in the requested fields
+        THEN:
+            - Only terms within the highlight limit are highlighted
+        """
+        doc = Document.objects.create(
+            title="long",
+            content="bank " + "filler " * 50 + "shop",
+            checksum="A",
+        )
+        index.add_or_update_document(doc)
+
+        for fields in ("", "&fields=id"):
+            response = self.client.get(f"/api/documents/?query=bank{fields}")
+            results = response.data["results"]
+            self.assertEqual(len(results), 1)
+            self.assertIn("bank", results[0]["__search_hit__"]["highlights"])
+            self.assertEqual("content" in results[0], not fields)
+
+            response = self.client.get(f"/api/documents/?query=shop{fields}")
+            results = response.data["results"]
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results[0]["__search_hit__"]["highlights"], "")
+
+    @override_settings(SEARCH_HIGHLIGHT_MAX_CHARS=100)
+    def test_search_truncated_content(self):
+        """
+        GIVEN:
+            - Document with a long content
+        WHEN:
+            - Search with the truncated content requested
+        THEN:
+            - Only the truncated content is loaded
+            - The truncated content and the highlights are returned
+        """
+        doc = Document.objects.create(
+            title="long",
+            content="bank " + "filler " * 200 + "shop",
+            checksum="A",
+        )
+        index.add_or_update_document(doc)
+
+        with mock.patch(
+            "documents.serialisers.Substr",
+            wraps=Substr,
+        ) as substr:
+            response = self.client.get(
+                "/api/documents/?query=bank&truncate_content=true",
+            )
+            substr.assert_called_once_with("content", 1, 550)
+        results = response.data["results"]
+        self.assertEqual(results[0]["content"], doc.content[:550])
+        self.assertIn("bank", results[0]["__search_hit__"]["highlights"])
+
+        with mock.patch("documents.serialisers.Substr") as substr:
+            response = self.client.get("/api/documents/?query=bank")
+            substr.assert_not_called()
+        self.assertEqual(response.data["results"][0]["content"], doc.content)
+
     def test_search_multi_page(self):
         with AsyncWriter(index.open_index()) as writer:
             for i in range(55):
@@ -558,16 +625,17 @@ class TestDocumentSearchApi(DirectoriesMixin, APITestCase):
 
         response = self.client.get("/api/search/autocomplete/?term=app")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, [b"apples", b"applebaum", b"appletini"])
+        self.assertEqual(response.data, [b"applebaum", b"apples", b"appletini"])
 
         d3.owner = u2
+        d3.save()
 
         with AsyncWriter(index.open_index()) as writer:
             index.update_document(writer, d3)
 
         response = self.client.get("/api/search/autocomplete/?term=app")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, [b"apples", b"applebaum"])
+        self.assertEqual(response.data, [b"applebaum", b"apples"])
 
         assign_perm("view_document", u1, d3)
 
@@ -576,7 +644,7 @@ class TestDocumentSearchApi(DirectoriesMixin, APITestCase):
 
         response = self.client.get("/api/search/autocomplete/?term=app")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, [b"apples", b"applebaum", b"appletini"])
+        self.assertEqual(response.data, [b"applebaum", b"apples", b"appletini"])
 
     def test_search_autocomplete_field_name_match(self):
         """
@@ -695,6 +763,175 @@ class TestDocumentSearchApi(DirectoriesMixin, APITestCase):
         self.assertEqual(results[0]["id"], d3.id)
         self.assertEqual(results[1]["id"], d1.id)
 
+    def test_search_more_like_similarity_index(self):
+        """
+        GIVEN:
+            - Documents exist which have similar content
+            - A similarity index of the documents
+        WHEN:
+            - API request for more like a given document
+            - By a user who can not see all documents
+        THEN:
+            - The similar documents are returned, most similar first
+            - Only documents visible to the user are returned
+        """
+        user = User.objects.create_user("user")
+        user.user_permissions.add(
+            *Permission.objects.filter(codename="view_document"),
+        )
+        d1 = Document.objects.create(
+            title="invoice 1",
+            content="invoice for the repair of the car engine and brakes",
+            checksum="A",
+        )
+        d2 = Document.objects.create(
+            title="invoice 2",
+            content="invoice for the repair of the car brakes",
+            checksum="B",
+        )
+        d3 = Document.objects.create(
+            title="invoice 3",
+            content="invoice for the repair of the car engine",
+            checksum="C",
+            owner=self.user,
+        )
+        d4 = Document.objects.create(
+            title="letter",
+            content="dear tenant the rent of the flat increases next year",
+            checksum="D",
+        )
+        for doc in (d1, d2, d3, d4):
+            index.add_or_update_document(doc)
+        similarity.rebuild()
+
+        response = self.client.get(f"/api/documents/?more_like_id={d1.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [result["id"] for result in response.data["results"]]
+        self.assertCountEqual(ids[:2], [d2.id, d3.id])
+        self.assertNotIn(d1.id, ids)
+
+        self.client.force_authenticate(user=user)
+        response = self.client.get(f"/api/documents/?more_like_id={d1.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [result["id"] for result in response.data["results"]]
+        self.assertEqual(ids[0], d2.id)
+        self.assertNotIn(d3.id, ids)
+
+    def test_search_selection_data(self):
+        """
+        GIVEN:
+            - Documents with tags, correspondents, types, storage paths and
+              custom fields
+        WHEN:
+            - API request for a search including the selection data
+            - By a user who can not see all documents
+        THEN:
+            - The objects are counted over all visible results, not only the
+              current page
+            - The counts are the same as the selection data endpoint returns
+        """
+        user = User.objects.create_user("user")
+        user.user_permissions.add(
+            *Permission.objects.filter(codename="view_document"),
+        )
+        t1 = Tag.objects.create(name="tag1")
+        t2 = Tag.objects.create(name="tag2")
+        c1 = Correspondent.objects.create(name="correspondent1")
+        c2 = Correspondent.objects.create(name="correspondent2")
+        dt = DocumentType.objects.create(name="type")
+        sp = StoragePath.objects.create(name="path", path="path")
+        cf = CustomField.objects.create(
+            name="field",
+            data_type=CustomField.FieldDataType.STRING,
+        )
+        d1 = Document.objects.create(
+            title="invoice 1",
+            content="invoice",
+            checksum="A",
+            correspondent=c1,
+            document_type=dt,
+        )
+        d1.tags.add(t1, t2)
+        d2 = Document.objects.create(
+            title="invoice 2",
+            content="invoice",
+            checksum="B",
+            correspondent=c1,
+            storage_path=sp,
+        )
+        d2.tags.add(t1)
+        CustomFieldInstance.objects.create(document=d2, field=cf)
+        d3 = Document.objects.create(
+            title="invoice 3",
+            content="invoice",
+            checksum="C",
+            correspondent=c2,
+            owner=self.user,
+        )
+        d3.tags.add(t2)
+        d4 = Document.objects.create(
+            title="letter",
+            content="letter",
+            checksum="D",
+            correspondent=c2,
+        )
+        d4.tags.add(t1)
+        for doc in (d1, d2, d3, d4):
+            index.add_or_update_document(doc)
+
+        def counts(selection_data, key):
+            return {item["id"]: item["document_count"] for item in selection_data[key]}
+
+        response = self.client.get(
+            "/api/documents/?query=invoice&page_size=1&include_selection_data=true",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        selection_data = response.data["selection_data"]
+        self.assertDictEqual(
+            counts(selection_data, "selected_tags"),
+            {t1.id: 2, t2.id: 2},
+        )
+        self.assertDictEqual(
+            counts(selection_data, "selected_correspondents"),
+            {c1.id: 2, c2.id: 1},
+        )
+        self.assertDictEqual(
+            counts(selection_data, "selected_document_types"),
+            {dt.id: 1},
+        )
+        self.assertDictEqual(
+            counts(selection_data, "selected_storage_paths"),
+            {sp.id: 1},
+        )
+        self.assertDictEqual(
+            counts(selection_data, "selected_custom_fields"),
+            {cf.id: 1},
+        )
+
+        self.client.force_authenticate(user=user)
+        response = self.client.get(
+            "/api/documents/?query=invoice&include_selection_data=true",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selection_data = response.data["selection_data"]
+        self.assertDictEqual(
+            counts(selection_data, "selected_tags"),
+            {t1.id: 2, t2.id: 1},
+        )
+        self.assertDictEqual(
+            counts(selection_data, "selected_correspondents"),
+            {c1.id: 2, c2.id: 0},
+        )
+
+        response = self.client.post(
+            "/api/documents/selection_data/",
+            {"documents": [d1.id, d2.id]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(selection_data, response.data)
+
     def test_search_filtering(self):
         t = Tag.objects.create(name="tag")
         t2 = Tag.objects.create(name="tag2")
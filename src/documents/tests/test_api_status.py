@@ -168,6 +168,8 @@ class TestSystemStatus(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["tasks"]["index_status"], "OK")
         self.assertIsNotNone(response.data["tasks"]["index_last_modified"])
+        self.assertIsNotNone(response.data["tasks"]["index_segments"])
+        self.assertIsNotNone(response.data["tasks"]["index_size"])
 
     @override_settings(INDEX_DIR=Path("/tmp/index/"))
     @mock.patch("documents.index.open_index", autospec=True)
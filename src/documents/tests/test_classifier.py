@@ -1,17 +1,24 @@
 import os
 import re
 import shutil
+from datetime import timedelta
 from pathlib import Path
 from unittest import mock
 
-import pytest
 from django.conf import settings
+from django.db import connection
 from django.test import TestCase
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
+from documents import bulk_edit
+from documents.classifier import ChunkedHashingVectorizer
 from documents.classifier import ClassifierModelCorruptError
+from documents.classifier import ClassifierPredictions
 from documents.classifier import DocumentClassifier
 from documents.classifier import IncompatibleClassifierVersionError
+from documents.classifier import MappedVocabulary
+from documents.classifier import PreprocessedContentCache
 from documents.classifier import load_classifier
 from documents.models import Correspondent
 from documents.models import Document
@@ -20,6 +27,7 @@ from documents.models import MatchingModel
 from documents.models import StoragePath
 from documents.models import Tag
 from documents.tests.utils import DirectoriesMixin
+from documents.tests.utils import FileSystemAssertsMixin
 
 
 def dummy_preprocess(content: str):
@@ -31,7 +39,7 @@ def dummy_preprocess(content: str):
     return content
 
 
-class TestClassifier(DirectoriesMixin, TestCase):
+class TestClassifier(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
     def setUp(self):
         super().setUp()
         self.classifier = DocumentClassifier()
@@ -243,6 +251,98 @@ class TestClassifier(DirectoriesMixin, TestCase):
         )
         self.assertEqual(self.classifier.predict_document_type(self.doc2.content), None)
 
+    def test_predict_all(self):
+        """
+        GIVEN:
+            - Classifier trained against test data
+        WHEN:
+            - Prediction requested for multiple documents at once
+        THEN:
+            - Each content is preprocessed only once
+            - Predictions match the single predictions
+        """
+        self.generate_test_data()
+        self.classifier.train()
+        self.classifier.preprocess_content.reset_mock()
+
+        predictions = self.classifier.predict_all(
+            [self.doc1.content, self.doc2.content],
+        )
+
+        self.assertEqual(self.classifier.preprocess_content.call_count, 2)
+        self.assertListEqual(
+            predictions,
+            [
+                ClassifierPredictions(
+                    correspondent=self.c1.pk,
+                    document_type=self.dt.pk,
+                    tags=[self.t1.pk],
+                    storage_path=self.sp1.pk,
+                ),
+                ClassifierPredictions(
+                    correspondent=None,
+                    document_type=None,
+                    tags=[self.t1.pk, self.t3.pk],
+                    storage_path=None,
+                ),
+            ],
+        )
+        self.assertEqual(
+            self.classifier.predict(self.doc2.content),
+            predictions[1],
+        )
+
+    def test_predict_all_no_classifiers(self):
+        """
+        GIVEN:
+            - Classifier trained without any AUTO matching data
+        WHEN:
+            - Prediction requested for multiple documents at once
+        THEN:
+            - Nothing is predicted
+            - The content is not processed
+        """
+        Document.objects.create(title="WOW", checksum="3457", content="ASD")
+        self.classifier.train()
+        self.classifier.preprocess_content.reset_mock()
+
+        self.assertListEqual(
+            self.classifier.predict_all(["ASD", "other"]),
+            [ClassifierPredictions(), ClassifierPredictions()],
+        )
+        self.assertListEqual(self.classifier.predict_all([]), [])
+        self.classifier.preprocess_content.assert_not_called()
+
+    def test_predict_all_one_tag(self):
+        """
+        GIVEN:
+            - Classifier trained with a single AUTO tag
+        WHEN:
+            - Prediction requested for multiple documents at once
+        THEN:
+            - The tag is predicted for the tagged document only
+        """
+        t1 = Tag.objects.create(name="t1", matching_algorithm=Tag.MATCH_AUTO, pk=12)
+
+        doc1 = Document.objects.create(
+            title="doc1",
+            content="this is a document from c1",
+            checksum="A",
+        )
+        doc2 = Document.objects.create(
+            title="doc2",
+            content="this is a document from c2",
+            checksum="B",
+        )
+
+        doc1.tags.add(t1)
+        self.classifier.train()
+
+        self.assertListEqual(
+            [p.tags for p in self.classifier.predict_all([doc1.content, doc2.content])],
+            [[t1.pk], []],
+        )
+
     def test_no_retrain_if_no_change(self):
         """
         GIVEN:
@@ -300,6 +400,454 @@ class TestClassifier(DirectoriesMixin, TestCase):
 
         self.assertTrue(self.classifier.train())
 
+    @override_settings(CLASSIFIER_FEATURES="hashing", CLASSIFIER_CHUNK_SIZE=1)
+    def test_train_hashing_features(self):
+        """
+        GIVEN:
+            - Test data
+            - Hashing features are configured
+        WHEN:
+            - Classifier is trained, saved and loaded
+        THEN:
+            - Hashing vectorizer is used
+            - Expected predictions based on training set
+        """
+        self.generate_train_and_save()
+
+        classifier = DocumentClassifier()
+        classifier.load()
+        classifier.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+
+        self.assertIsInstance(classifier.data_vectorizer, ChunkedHashingVectorizer)
+        self.assertFalse(classifier.data_vectorizer.columns_.flags.writeable)
+        self.assertEqual(
+            classifier.predict_correspondent(self.doc1.content),
+            self.c1.pk,
+        )
+        self.assertListEqual(
+            classifier.predict_tags(self.doc2.content),
+            [self.t1.pk, self.t3.pk],
+        )
+        self.assertEqual(
+            classifier.predict_document_type(self.doc1.content),
+            self.dt.pk,
+        )
+
+    def test_hashing_vectorizer(self):
+        """
+        GIVEN:
+            - Hashing vectorizer limited to 2 features
+        WHEN:
+            - Vectorizer is fitted and used on documents
+        THEN:
+            - The 2 features used by the most documents are kept
+            - Rare features are not kept
+        """
+        documents = ["common words", "common and rare", "common words again"]
+
+        vectorizer = ChunkedHashingVectorizer(
+            min_df=0.5,
+            max_features=2,
+            chunk_size=2,
+        ).fit(documents)
+        X = vectorizer.transform(documents)
+
+        self.assertEqual(X.shape, (3, 2))
+        # "common" is in every document, "words" in 2 of them
+        self.assertCountEqual(X.toarray().sum(axis=0).tolist(), [3.0, 2.0])
+        self.assertEqual(vectorizer.transform(["rare"]).nnz, 0)
+        self.assertEqual(vectorizer.transform([]).shape, (0, 2))
+
+        with self.assertRaisesMessage(ValueError, "no features remain"):
+            ChunkedHashingVectorizer().fit([])
+
+    @override_settings(CLASSIFIER_TRAINING_WORKERS=4)
+    def test_train_parallel(self):
+        """
+        GIVEN:
+            - Test data
+            - Multiple training workers are configured
+        WHEN:
+            - Classifier is trained
+        THEN:
+            - All classifiers are trained, in forked processes
+            - Fit time of each classifier is recorded
+        """
+        self.generate_test_data()
+
+        with mock.patch(
+            "documents.classifier.ThreadPoolExecutor",
+        ) as thread_pool:
+            self.classifier.train()
+            thread_pool.assert_not_called()
+
+        self.assertCountEqual(
+            self.classifier.fit_times.keys(),
+            [
+                "tags_classifier",
+                "correspondent_classifier",
+                "document_type_classifier",
+                "storage_path_classifier",
+            ],
+        )
+        self.assertEqual(
+            self.classifier.predict_correspondent(self.doc1.content),
+            self.c1.pk,
+        )
+        self.assertListEqual(
+            self.classifier.predict_tags(self.doc2.content),
+            [self.t1.pk, self.t3.pk],
+        )
+
+    @override_settings(CLASSIFIER_TRAINING_WORKERS=4)
+    def test_train_parallel_daemon(self):
+        """
+        GIVEN:
+            - Test data
+            - Multiple training workers are configured
+            - Training runs in a daemonic process
+        WHEN:
+            - Classifier is trained
+        THEN:
+            - Classifiers are trained in threads
+        """
+        self.generate_test_data()
+
+        with (
+            mock.patch("documents.classifier.multiprocessing.current_process") as p,
+            mock.patch("documents.classifier.ProcessPoolExecutor") as process_pool,
+        ):
+            p.return_value.daemon = True
+            self.classifier.train()
+            process_pool.assert_not_called()
+
+        self.assertEqual(len(self.classifier.fit_times), 4)
+        self.assertEqual(
+            self.classifier.predict_correspondent(self.doc1.content),
+            self.c1.pk,
+        )
+
+    def test_train_query_count(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - More documents with tags are added
+            - A new classifier is trained
+        THEN:
+            - The number of queries does not depend on the number of documents
+        """
+        self.generate_test_data()
+
+        with CaptureQueriesContext(connection) as first_training:
+            self.assertTrue(self.classifier.train())
+
+        for i in range(10):
+            doc = Document.objects.create(
+                title=f"doc{i}",
+                content=f"another document number {i}",
+                correspondent=self.c1,
+                checksum=f"D{i}",
+            )
+            doc.tags.add(self.t1, self.t3, self.t4)
+
+        classifier = DocumentClassifier()
+        classifier.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        with CaptureQueriesContext(connection) as second_training:
+            self.assertTrue(classifier.train())
+
+        self.assertEqual(len(second_training), len(first_training))
+        self.assertListEqual(
+            list(classifier.tags_binarizer.classes_),
+            [self.t1.pk, self.t3.pk],
+        )
+
+    @override_settings(CLASSIFIER_INCREMENTAL_UPDATES=True)
+    def test_incremental_update(self):
+        """
+        GIVEN:
+            - Incremental updates are enabled
+            - Classifier trained and saved with current data
+        WHEN:
+            - Content of one document changes
+            - Loaded classifier is trained again
+        THEN:
+            - Classifiers are updated with the changed document only
+            - Vocabulary of the full training is kept
+        """
+        self.generate_train_and_save()
+        last_full_train_time = self.classifier.last_full_train_time
+        self.assertIsNotNone(last_full_train_time)
+
+        classifier = DocumentClassifier()
+        classifier.load()
+        classifier.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        vocabulary = dict(classifier.data_vectorizer.vocabulary_)
+        coefs = [coef.copy() for coef in classifier.correspondent_classifier.coefs_]
+
+        self.doc1.content = "this is a document from c1 with new words"
+        self.doc1.save()
+
+        self.assertTrue(classifier.train())
+
+        classifier.preprocess_content.assert_called_once_with(self.doc1.content)
+        self.assertEqual(classifier.last_full_train_time, last_full_train_time)
+        self.assertDictEqual(dict(classifier.data_vectorizer.vocabulary_), vocabulary)
+        self.assertFalse(
+            all(
+                (coef == old_coef).all()
+                for coef, old_coef in zip(
+                    classifier.correspondent_classifier.coefs_,
+                    coefs,
+                )
+            ),
+        )
+        self.assertEqual(
+            classifier.predict_correspondent(self.doc1.content),
+            self.c1.pk,
+        )
+
+        # The updated classifier can be saved and loaded again
+        classifier.save()
+        DocumentClassifier().load()
+
+    @override_settings(CLASSIFIER_INCREMENTAL_UPDATES=True)
+    def test_incremental_update_bulk_edit(self):
+        """
+        GIVEN:
+            - Incremental updates are enabled
+            - Classifier trained and saved with current data
+        WHEN:
+            - A tag is added to one document by a bulk edit, which does not
+              change its modification time
+            - Loaded classifier is trained again
+        THEN:
+            - Classifiers are updated with the changed document only
+            - Tag is predicted more likely for the document
+        """
+        self.generate_train_and_save()
+
+        classifier = DocumentClassifier()
+        classifier.load()
+        classifier.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        modified = self.doc1.modified
+        t3_index = list(classifier.tags_binarizer.classes_).index(self.t3.pk)
+
+        def t3_probability():
+            return classifier.tags_classifier.predict_proba(
+                classifier._vectorize([self.doc1.content]),
+            )[0][t3_index]
+
+        old_probability = t3_probability()
+        classifier.preprocess_content.reset_mock()
+
+        with mock.patch("documents.bulk_edit.bulk_update_documents.delay"):
+            bulk_edit.add_tag([self.doc1.pk], self.t3.pk)
+        self.doc1.refresh_from_db()
+        self.assertEqual(self.doc1.modified, modified)
+
+        self.assertTrue(classifier.train())
+
+        classifier.preprocess_content.assert_called_once_with(self.doc1.content)
+        self.assertGreater(t3_probability(), old_probability)
+
+    @override_settings(CLASSIFIER_INCREMENTAL_UPDATES=True)
+    def test_incremental_update_labels_changed(self):
+        """
+        GIVEN:
+            - Incremental updates are enabled
+            - Classifier trained with current data
+        WHEN:
+            - A document gets a new AUTO correspondent
+            - Classifier is trained again
+        THEN:
+            - Classifier is fully trained again
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        last_full_train_time = self.classifier.last_full_train_time
+
+        self.doc2.correspondent = self.c3
+        self.doc2.save()
+
+        self.assertTrue(self.classifier.train())
+        self.assertGreater(self.classifier.last_full_train_time, last_full_train_time)
+        self.assertListEqual(
+            list(self.classifier.correspondent_classifier.classes_),
+            [self.c1.pk, self.c3.pk],
+        )
+
+    @override_settings(
+        CLASSIFIER_INCREMENTAL_UPDATES=True,
+        CLASSIFIER_FULL_RETRAIN_DAYS=7,
+    )
+    def test_incremental_update_full_training_due(self):
+        """
+        GIVEN:
+            - Incremental updates are enabled
+            - Classifier was fully trained 8 days ago
+        WHEN:
+            - A document changes
+            - Classifier is trained again
+        THEN:
+            - Classifier is fully trained again
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        self.classifier.last_full_train_time -= timedelta(days=8)
+        last_full_train_time = self.classifier.last_full_train_time
+
+        self.doc1.save()
+
+        self.assertTrue(self.classifier.train())
+        self.assertGreater(self.classifier.last_full_train_time, last_full_train_time)
+
+    @override_settings(CLASSIFIER_INCREMENTAL_UPDATES=True)
+    def test_incremental_update_max_features_changed(self):
+        """
+        GIVEN:
+            - Incremental updates are enabled
+            - Classifier trained and saved with current data
+        WHEN:
+            - The maximum number of features changes
+            - A document changes
+            - Loaded classifier is trained again
+        THEN:
+            - Classifier is fully trained again, with the new maximum
+        """
+        self.generate_train_and_save()
+        last_full_train_time = self.classifier.last_full_train_time
+
+        classifier = DocumentClassifier()
+        classifier.load()
+        classifier.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+        self.doc1.save()
+
+        with override_settings(CLASSIFIER_MAX_FEATURES=5):
+            self.assertTrue(classifier.train())
+
+        self.assertGreater(classifier.last_full_train_time, last_full_train_time)
+        self.assertEqual(classifier.data_vectorizer.max_features, 5)
+        self.assertLessEqual(len(classifier.data_vectorizer.vocabulary_), 5)
+
+    def test_incremental_update_disabled(self):
+        """
+        GIVEN:
+            - Incremental updates are disabled
+            - Classifier trained with current data
+        WHEN:
+            - A document changes
+            - Classifier is trained again
+        THEN:
+            - Classifier is fully trained again
+        """
+        self.generate_test_data()
+        self.assertTrue(self.classifier.train())
+        last_full_train_time = self.classifier.last_full_train_time
+
+        self.doc1.save()
+
+        self.assertTrue(self.classifier.train())
+        self.assertGreater(self.classifier.last_full_train_time, last_full_train_time)
+
+    def test_preprocessed_content_cached(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - Content of one document changes
+            - Classifier is trained again
+        THEN:
+            - Only the changed document is preprocessed again
+            - The inbox document is never preprocessed
+        """
+        self.generate_test_data()
+
+        self.assertTrue(self.classifier.train())
+        self.assertEqual(self.classifier.preprocess_content.call_count, 2)
+        self.assertIsFile(settings.CLASSIFIER_CONTENT_CACHE)
+
+        self.doc1.content = "this is a changed document from c1"
+        self.doc1.save()
+        self.classifier.preprocess_content.reset_mock()
+
+        self.assertTrue(self.classifier.train())
+        self.classifier.preprocess_content.assert_called_once_with(
+            "this is a changed document from c1",
+        )
+
+    def test_preprocessed_content_cache_pruned(self):
+        """
+        GIVEN:
+            - Preprocessed content cached for two documents
+        WHEN:
+            - Only one of the documents is preprocessed, without pruning
+            - Only one of the documents is preprocessed, with pruning
+        THEN:
+            - The cached content of the other document is kept without pruning
+            - The cached content of the other document is removed with pruning
+        """
+        cache = PreprocessedContentCache(
+            Path(settings.CLASSIFIER_CONTENT_CACHE),
+            str.upper,
+        )
+        documents = [(1, "first"), (2, "second")]
+        self.assertEqual(
+            list(cache.preprocess_all(documents, prune=True)),
+            ["FIRST", "SECOND"],
+        )
+
+        self.assertEqual(list(cache.preprocess_all(documents[:1])), ["FIRST"])
+        self.assertEqual(list(cache.preprocess_all(documents)), ["FIRST", "SECOND"])
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+
+        list(cache.preprocess_all(documents[:1], prune=True))
+        self.assertEqual(list(cache.preprocess_all(documents)), ["FIRST", "SECOND"])
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_preprocessed_content_cache_language_changed(self):
+        """
+        GIVEN:
+            - Classifier trained with current data
+        WHEN:
+            - NLTK language changes
+            - Classifier is trained again
+        THEN:
+            - All documents are preprocessed again
+        """
+        self.generate_test_data()
+
+        self.assertTrue(self.classifier.train())
+        self.classifier.preprocess_content.reset_mock()
+
+        # Force a retrain
+        self.doc1.save()
+
+        with override_settings(NLTK_LANGUAGE="german"):
+            self.assertTrue(self.classifier.train())
+        self.assertEqual(self.classifier.preprocess_content.call_count, 2)
+
+    def test_preprocessed_content_cache_corrupt(self):
+        """
+        GIVEN:
+            - Preprocessed content cache file is corrupt
+        WHEN:
+            - Classifier is trained
+        THEN:
+            - Cache file is recreated
+            - Training succeeds
+        """
+        self.generate_test_data()
+        Path(settings.CLASSIFIER_CONTENT_CACHE).write_bytes(b"not a database" * 100)
+
+        self.assertTrue(self.classifier.train())
+
+        self.doc1.save()
+        self.classifier.preprocess_content.reset_mock()
+
+        self.assertTrue(self.classifier.train())
+        self.classifier.preprocess_content.assert_not_called()
+
     def testVersionIncreased(self):
         """
         GIVEN:
@@ -344,6 +892,69 @@ class TestClassifier(DirectoriesMixin, TestCase):
 
         self.assertCountEqual(new_classifier.predict_tags(self.doc2.content), [45, 12])
 
+    def test_load_memory_mapped(self):
+        """
+        GIVEN:
+            - Classifier trained and saved
+        WHEN:
+            - The classifier is loaded
+        THEN:
+            - The vocabulary and weights are memory mapped from the model file
+            - The loaded classifier predicts the same as the trained one
+        """
+        self.generate_train_and_save()
+
+        new_classifier = DocumentClassifier()
+        new_classifier.load()
+        new_classifier.preprocess_content = mock.MagicMock(side_effect=dummy_preprocess)
+
+        self.assertIsInstance(
+            new_classifier.data_vectorizer.vocabulary_,
+            MappedVocabulary,
+        )
+        for coefs in new_classifier.tags_classifier.coefs_:
+            self.assertFalse(coefs.flags.owndata)
+            self.assertFalse(coefs.flags.writeable)
+
+        for content in [self.doc1.content, self.doc2.content]:
+            self.assertEqual(
+                new_classifier.predict_correspondent(content),
+                self.classifier.predict_correspondent(content),
+            )
+            self.assertEqual(
+                new_classifier.predict_document_type(content),
+                self.classifier.predict_document_type(content),
+            )
+            self.assertListEqual(
+                new_classifier.predict_tags(content),
+                self.classifier.predict_tags(content),
+            )
+
+    def test_mapped_vocabulary(self):
+        """
+        GIVEN:
+            - A vocabulary dictionary
+        WHEN:
+            - The vocabulary is converted to a mapped vocabulary
+        THEN:
+            - The mapped vocabulary contains the same terms and indices
+        """
+        vocabulary = {"from": 2, "zebra": 0, "ärger": 3, "doc": 1, "from c1": 4}
+
+        mapped = MappedVocabulary.from_dict(vocabulary)
+
+        self.assertEqual(len(mapped), len(vocabulary))
+        self.assertDictEqual(dict(mapped), vocabulary)
+        self.assertEqual(mapped["ärger"], 3)
+        self.assertNotIn("missing", mapped)
+        with self.assertRaises(KeyError):
+            mapped["a"]
+
+        # Further lookups use the dictionary built by the first one
+        with mock.patch.object(mapped, "_term", side_effect=AssertionError):
+            self.assertEqual(mapped["from c1"], 4)
+            self.assertEqual(mapped["zebra"], 0)
+
     @mock.patch("documents.classifier.pickle.load")
     def test_load_corrupt_file(self, patched_pickle_load: mock.MagicMock):
         """
@@ -371,6 +982,8 @@ class TestClassifier(DirectoriesMixin, TestCase):
 
         self.assertIsNone(load_classifier())
         patched_pickle_load.assert_called()
+        # The corrupt model file is removed, so it is trained again
+        self.assertIsNotFile(settings.MODEL_FILE)
 
     def test_load_new_scikit_learn_version(self):
         """
@@ -626,25 +1239,68 @@ class TestClassifier(DirectoriesMixin, TestCase):
         self.assertIsNotNone(load_classifier())
         load.assert_called_once()
 
-    @override_settings(
-        CACHES={
-            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
-        },
-    )
-    @override_settings(
-        MODEL_FILE=os.path.join(os.path.dirname(__file__), "data", "model.pickle"),
-    )
-    @pytest.mark.skip(
-        reason="Disabled caching due to high memory usage - need to investigate.",
-    )
     def test_load_classifier_cached(self):
+        """
+        GIVEN:
+            - A saved classifier model file
+        WHEN:
+            - The classifier is loaded multiple times
+        THEN:
+            - The model file is only loaded once
+            - The same classifier instance is returned
+        """
+        self.generate_train_and_save()
+
         classifier = load_classifier()
         self.assertIsNotNone(classifier)
 
         with mock.patch("documents.classifier.DocumentClassifier.load") as load:
-            load_classifier()
+            self.assertIs(load_classifier(), classifier)
             load.assert_not_called()
 
+    def test_load_classifier_cache_model_changed(self):
+        """
+        GIVEN:
+            - A cached classifier
+        WHEN:
+            - The model file is replaced by a newer one
+        THEN:
+            - The new model file is loaded and replaces the cached classifier
+        """
+        self.generate_train_and_save()
+
+        classifier = load_classifier()
+        self.assertIsNotNone(classifier)
+
+        self.classifier.save()
+        # Make sure the modification time changes, no matter the filesystem
+        stat = settings.MODEL_FILE.stat()
+        os.utime(
+            settings.MODEL_FILE,
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000),
+        )
+
+        new_classifier = load_classifier()
+        self.assertIsNotNone(new_classifier)
+        self.assertIsNot(new_classifier, classifier)
+        self.assertIs(load_classifier(), new_classifier)
+
+    def test_load_classifier_no_cache(self):
+        """
+        GIVEN:
+            - A cached classifier
+        WHEN:
+            - The classifier is loaded without using the cache
+        THEN:
+            - A new classifier instance is loaded
+        """
+        self.generate_train_and_save()
+
+        classifier = load_classifier()
+
+        self.assertIsNot(load_classifier(use_cache=False), classifier)
+        self.assertIs(load_classifier(), classifier)
+
     @mock.patch("documents.classifier.DocumentClassifier.load")
     def test_load_classifier_incompatible_version(self, load):
         Path(settings.MODEL_FILE).touch()
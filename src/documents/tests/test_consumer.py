@@ -19,6 +19,7 @@ from django.test import override_settings
 from django.utils import timezone
 from guardian.core import ObjectPermissionChecker
 
+from documents.classifier import ClassifierPredictions
 from documents.consumer import ConsumerError
 from documents.data_models import DocumentMetadataOverrides
 from documents.data_models import DocumentSource
@@ -838,9 +839,11 @@ class TestConsumer(
         t2 = Tag.objects.create(name="t2", matching_algorithm=Tag.MATCH_AUTO)
 
         m.return_value = MagicMock()
-        m.return_value.predict_correspondent.return_value = correspondent.pk
-        m.return_value.predict_document_type.return_value = dtype.pk
-        m.return_value.predict_tags.return_value = [t1.pk]
+        m.return_value.predict.return_value = ClassifierPredictions(
+            correspondent=correspondent.pk,
+            document_type=dtype.pk,
+            tags=[t1.pk],
+        )
 
         with self.get_consumer(self.get_test_file()) as consumer:
             consumer.run()
@@ -1,9 +1,26 @@
+from collections import OrderedDict
+from datetime import timedelta
 from unittest import mock
 
+from django.contrib.auth.models import Group
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from guardian.models import UserObjectPermission
+from guardian.shortcuts import assign_perm
+from whoosh.qparser import QueryParser
+from whoosh.writing import AsyncWriter
 
 from documents import index
+from documents.models import Correspondent
+from documents.models import CustomField
+from documents.models import CustomFieldInstance
 from documents.models import Document
+from documents.models import Note
+from documents.models import Tag
 from documents.tests.utils import DirectoriesMixin
 
 
@@ -34,6 +51,119 @@ class TestAutoComplete(DirectoriesMixin, TestCase):
         self.assertListEqual(index.autocomplete(ix, "tes", limit=1), [b"test2"])
         self.assertListEqual(index.autocomplete(ix, "tes", limit=0), [])
 
+    def test_auto_complete_visible_frequency(self):
+        """
+        GIVEN:
+            - Terms which occur more often in documents the user cannot see
+        WHEN:
+            - Autocomplete is requested by the user
+        THEN:
+            - Terms are ordered by the number of visible documents
+            - Deleted documents are not counted, also for superusers
+        """
+        user = User.objects.create_user("user")
+        other = User.objects.create_user("other")
+        superuser = User.objects.create_superuser("superuser")
+        docs = [
+            Document.objects.create(
+                title="a",
+                checksum="A",
+                content="apple",
+                owner=user,
+            ),
+            Document.objects.create(
+                title="b",
+                checksum="B",
+                content="apple",
+                owner=user,
+            ),
+            Document.objects.create(title="c", checksum="C", content="applet"),
+            Document.objects.create(title="d", checksum="D", content="applet"),
+            Document.objects.create(title="e", checksum="E", content="applet"),
+            Document.objects.create(
+                title="f",
+                checksum="F",
+                content="application application",
+                owner=other,
+            ),
+            Document.objects.create(
+                title="g",
+                checksum="G",
+                content="application",
+                owner=other,
+            ),
+        ]
+        for doc in docs:
+            index.add_or_update_document(doc)
+
+        ix = index.open_index()
+
+        self.assertListEqual(
+            index.autocomplete(ix, "app", user=user),
+            [b"applet", b"apple"],
+        )
+        self.assertListEqual(
+            index.autocomplete(ix, "app", limit=1, user=user),
+            [b"applet"],
+        )
+        self.assertListEqual(
+            index.autocomplete(ix, "app", user=other),
+            [b"applet", b"application"],
+        )
+
+        index.remove_document_from_index(docs[2])
+        index.remove_document_from_index(docs[3])
+
+        self.assertListEqual(
+            index.autocomplete(ix, "app", user=user),
+            [b"apple", b"applet"],
+        )
+        self.assertListEqual(
+            index.autocomplete(ix, "app", user=superuser),
+            [b"apple", b"application", b"applet"],
+        )
+
+    @mock.patch("documents.index._segment_prefix_terms", {})
+    def test_prefix_term_frequencies(self):
+        """
+        GIVEN:
+            - Index with several segments
+        WHEN:
+            - The frequencies of terms with a prefix are requested repeatedly
+        THEN:
+            - The document frequencies are summed over the segments
+            - The terms of each segment are only read once
+        """
+        doc1 = Document.objects.create(title="a", checksum="A", content="test tester")
+        doc2 = Document.objects.create(title="b", checksum="B", content="test other")
+        index.add_or_update_document(doc1)
+        index.add_or_update_document(doc2)
+
+        with index.open_index_searcher() as searcher:
+            reader = searcher.reader()
+            self.assertEqual(len(reader.leaf_readers()), 2)
+            self.assertDictEqual(
+                dict(index.get_prefix_term_frequencies(reader, b"tes")),
+                {b"test": 2, b"tester": 1},
+            )
+            self.assertDictEqual(
+                dict(index.get_prefix_term_frequencies(reader, b"")),
+                {b"test": 2, b"tester": 1, b"other": 1},
+            )
+            with mock.patch.object(
+                reader.leaf_readers()[0][0],
+                "iter_field",
+            ) as iter_field:
+                self.assertDictEqual(
+                    dict(index.get_prefix_term_frequencies(reader, b"test")),
+                    {b"test": 2, b"tester": 1},
+                )
+                iter_field.assert_not_called()
+            self.assertDictEqual(
+                dict(index.get_prefix_term_frequencies(reader, b"testers")),
+                {},
+            )
+
     def test_archive_serial_number_ranging(self):
         """
         GIVEN:
@@ -90,3 +220,909 @@ class TestAutoComplete(DirectoriesMixin, TestCase):
             _, kwargs = mocked_update_doc.call_args
 
             self.assertIsNone(kwargs["asn"])
+
+
+class TestReindex(DirectoriesMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        owner = User.objects.create_user("owner")
+        self.viewer = User.objects.create_user("viewer")
+        self.group_member = User.objects.create_user("group_member")
+        group = Group.objects.create(name="group")
+        self.group_member.groups.add(group)
+        tag1 = Tag.objects.create(name="tag1")
+        tag2 = Tag.objects.create(name="tag2")
+        field = CustomField.objects.create(
+            name="field",
+            data_type=CustomField.FieldDataType.STRING,
+        )
+
+        self.doc1 = Document.objects.create(
+            title="doc1",
+            checksum="A",
+            content="first document",
+            owner=owner,
+            correspondent=Correspondent.objects.create(name="correspondent"),
+        )
+        self.doc1.tags.add(tag1, tag2)
+        Note.objects.create(document=self.doc1, note="a note", user=owner)
+        CustomFieldInstance.objects.create(
+            document=self.doc1,
+            field=field,
+            value_text="value",
+        )
+        assign_perm("view_document", self.viewer, self.doc1)
+        assign_perm("view_document", group, self.doc1)
+
+        self.doc2 = Document.objects.create(
+            title="doc2",
+            checksum="B",
+            content="second document",
+        )
+        self.doc2.tags.add(tag2)
+        assign_perm("change_document", self.viewer, self.doc2)
+
+    def test_document_fields_prefetched(self):
+        """
+        GIVEN:
+            - Documents with tags, notes, custom fields and permissions
+        WHEN:
+            - The index fields of all documents are loaded in chunks
+        THEN:
+            - The fields are the same as when indexing each document on its own
+            - The number of queries does not depend on the number of documents
+        """
+        expected = []
+        for doc in Document.objects.order_by("pk"):
+            with mock.patch(
+                "documents.index.AsyncWriter.update_document",
+            ) as mocked_update_doc:
+                index.add_or_update_document(doc)
+            expected.append(mocked_update_doc.call_args.kwargs)
+
+        with CaptureQueriesContext(connection) as context:
+            fields = list(index.iter_document_fields(Document.objects.all()))
+
+        # The order of the viewers does not matter
+        for doc_fields in fields + expected:
+            if doc_fields["viewer_id"] is not None:
+                doc_fields["viewer_id"] = set(doc_fields["viewer_id"].split(","))
+        self.assertEqual(fields, expected)
+        self.assertEqual(
+            fields[0]["viewer_id"],
+            {str(self.viewer.pk), str(self.group_member.pk)},
+        )
+        self.assertIsNone(fields[1]["viewer_id"])
+        self.assertLessEqual(len(context.captured_queries), 10)
+
+    def test_reindex_processes(self):
+        """
+        GIVEN:
+            - Documents
+        WHEN:
+            - The index is recreated with multiple processes
+        THEN:
+            - All documents are searchable
+        """
+        index.reindex(
+            Document.objects.all(),
+            processes=2,
+            progress_bar_disable=True,
+        )
+
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(searcher.doc_count(), 2)
+            results = searcher.search(
+                QueryParser("content", index.get_schema()).parse("document"),
+            )
+            self.assertCountEqual(
+                [hit["id"] for hit in results],
+                [self.doc1.pk, self.doc2.pk],
+            )
+
+
+class TestIndexUpdateQueue(DirectoriesMixin, TestCase):
+    def get_document_from_index(self, doc):
+        with index.open_index_searcher() as searcher:
+            return searcher.document(id=doc.id)
+
+    def test_queue_coalesces_updates(self):
+        """
+        GIVEN:
+            - Indexed document
+        WHEN:
+            - Several changes of documents are queued, including repeated
+              changes of one document and the removal of the indexed one
+            - The queue is flushed
+        THEN:
+            - All changes are applied with a single writer
+            - The repeated changes are coalesced
+        """
+        doc1 = Document.objects.create(title="doc1", checksum="A", content="first")
+        doc2 = Document.objects.create(title="doc2", checksum="B", content="second")
+        doc3 = Document.objects.create(title="doc3", checksum="C", content="third")
+        index.add_or_update_document(doc3)
+
+        queue = index.IndexUpdateQueue(interval=3600, batch_size=100)
+        queue.enqueue(doc1.pk)
+        queue.enqueue(doc2.pk)
+        queue.enqueue(doc1.pk)
+        queue.enqueue(doc3.pk, remove=True)
+        self.assertEqual(queue.metrics()["pending"], 3)
+        self.assertIsNone(self.get_document_from_index(doc1))
+
+        with mock.patch(
+            "documents.index.open_index_writer",
+            wraps=index.open_index_writer,
+        ) as open_index_writer:
+            queue.flush()
+        open_index_writer.assert_called_once()
+
+        self.assertIsNotNone(self.get_document_from_index(doc1))
+        self.assertIsNotNone(self.get_document_from_index(doc2))
+        self.assertIsNone(self.get_document_from_index(doc3))
+        metrics = queue.metrics()
+        self.assertEqual(metrics["pending"], 0)
+        self.assertEqual(metrics["lag"], 0)
+        self.assertEqual(metrics["enqueued"], 4)
+        self.assertEqual(metrics["coalesced"], 1)
+        self.assertEqual(metrics["batches"], 1)
+        self.assertEqual(metrics["applied"], 3)
+        self.assertGreater(metrics["last_batch_lag"], 0)
+
+    def test_queue_batch_size(self):
+        """
+        GIVEN:
+            - Queue with a batch size of 2
+        WHEN:
+            - 3 document updates are queued, one of a deleted document
+            - The queue is flushed
+        THEN:
+            - The updates are applied in 2 batches
+            - The deleted document is removed from the index
+        """
+        docs = [
+            Document.objects.create(title=f"doc{i}", checksum=str(i), content="text")
+            for i in range(3)
+        ]
+        for doc in docs:
+            index.add_or_update_document(doc)
+        docs[2].delete()
+
+        queue = index.IndexUpdateQueue(interval=3600, batch_size=2)
+        for doc in docs:
+            queue.enqueue(doc.pk)
+        queue.flush()
+
+        self.assertEqual(queue.metrics()["batches"], 2)
+        self.assertIsNotNone(self.get_document_from_index(docs[0]))
+        self.assertIsNone(self.get_document_from_index(docs[2]))
+
+    def test_queue_failed_batch_requeued(self):
+        """
+        GIVEN:
+            - Queued updates of two documents
+        WHEN:
+            - Applying the batch fails
+            - One of the documents is removed before the next flush
+            - The queue is flushed again
+        THEN:
+            - The failed changes are queued again, the removal replaces the
+              failed update
+            - All changes are applied by the next flush
+        """
+        doc1 = Document.objects.create(title="doc1", checksum="A", content="first")
+        doc2 = Document.objects.create(title="doc2", checksum="B", content="second")
+        index.add_or_update_document(doc2)
+
+        queue = index.IndexUpdateQueue(interval=3600, batch_size=100)
+        self.assertFalse(queue.flush())
+        queue.enqueue(doc1.pk)
+        queue.enqueue(doc2.pk)
+
+        with (
+            mock.patch.object(
+                index.WhooshSearchBackend,
+                "update_documents",
+                side_effect=OSError("locked"),
+            ),
+            self.assertRaises(OSError),
+        ):
+            queue.flush()
+        self.assertEqual(queue.metrics()["pending"], 2)
+        self.assertGreater(queue.metrics()["lag"], 0)
+
+        queue.enqueue(doc2.pk, remove=True)
+        self.assertTrue(queue.flush())
+
+        self.assertIsNotNone(self.get_document_from_index(doc1))
+        self.assertIsNone(self.get_document_from_index(doc2))
+        self.assertEqual(queue.metrics()["pending"], 0)
+        self.assertEqual(queue.metrics()["applied"], 2)
+
+    @override_settings(INDEX_UPDATE_INTERVAL=3600)
+    @mock.patch("documents.index._update_queue", None)
+    def test_queue_document_update(self):
+        """
+        GIVEN:
+            - Document
+        WHEN:
+            - An update of the document is queued within a transaction
+        THEN:
+            - The update is queued once the transaction is committed
+            - The document is in the index once the updates are flushed
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="text")
+
+        self.assertIsNone(index.get_index_update_metrics())
+        with self.captureOnCommitCallbacks(execute=True):
+            index.queue_document_update(doc)
+            self.assertIsNone(index.get_index_update_metrics())
+        self.assertEqual(index.get_index_update_metrics()["pending"], 1)
+        self.assertIsNone(self.get_document_from_index(doc))
+
+        index.flush_index_updates()
+
+        self.assertEqual(index.get_index_update_metrics()["pending"], 0)
+        self.assertIsNotNone(self.get_document_from_index(doc))
+
+    @override_settings(INDEX_UPDATE_INTERVAL=0)
+    def test_queue_disabled(self):
+        """
+        GIVEN:
+            - Index update interval of 0
+        WHEN:
+            - An update and a removal of a document are queued
+        THEN:
+            - The index is changed immediately
+        """
+        doc = Document.objects.create(title="doc", checksum="A", content="text")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            index.queue_document_update(doc)
+        self.assertIsNotNone(self.get_document_from_index(doc))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            index.queue_document_removal(doc)
+        self.assertIsNone(self.get_document_from_index(doc))
+
+
+class TestReconcile(DirectoriesMixin, TestCase):
+    def get_document_from_index(self, doc):
+        with index.open_index_searcher() as searcher:
+            return searcher.document(id=doc.id)
+
+    def test_reconcile(self):
+        """
+        GIVEN:
+            - Indexed document which was not changed since
+            - Indexed document which was changed since
+            - Indexed document which was deleted since
+            - Document which is not indexed
+        WHEN:
+            - The index is reconciled
+        THEN:
+            - Only the missing, changed and deleted documents are written
+        """
+        unchanged = Document.objects.create(title="unchanged", checksum="A")
+        changed = Document.objects.create(title="changed", checksum="B")
+        deleted = Document.objects.create(title="deleted", checksum="C")
+        for doc in (unchanged, changed, deleted):
+            index.add_or_update_document(doc)
+        missing = Document.objects.create(title="missing", checksum="D")
+        Document.objects.filter(pk=changed.pk).update(
+            title="new title",
+            modified=timezone.now() + timedelta(minutes=1),
+        )
+        deleted.delete()
+
+        with mock.patch(
+            "documents.index.AsyncWriter.update_document",
+            autospec=True,
+            side_effect=AsyncWriter.update_document,
+        ) as update_document:
+            self.assertEqual(
+                index.reconcile(Document.objects.all(), progress_bar_disable=True),
+                (1, 1, 1),
+            )
+        self.assertCountEqual(
+            [call.kwargs["id"] for call in update_document.call_args_list],
+            [changed.pk, missing.pk],
+        )
+
+        self.assertIsNotNone(self.get_document_from_index(unchanged))
+        self.assertIsNotNone(self.get_document_from_index(missing))
+        self.assertIsNone(self.get_document_from_index(deleted))
+        with index.open_index_searcher() as searcher:
+            results = searcher.search(
+                QueryParser("title", index.get_schema()).parse("new"),
+            )
+            self.assertEqual([hit["id"] for hit in results], [changed.pk])
+
+        # Nothing diverges anymore
+        self.assertEqual(
+            index.reconcile(Document.objects.all(), progress_bar_disable=True),
+            (0, 0, 0),
+        )
+
+    def test_reconcile_empty_index(self):
+        """
+        GIVEN:
+            - Documents and no index
+        WHEN:
+            - The index is reconciled
+        THEN:
+            - All documents are added
+        """
+        Document.objects.create(title="doc1", checksum="A")
+        Document.objects.create(title="doc2", checksum="B")
+
+        self.assertEqual(
+            index.reconcile(Document.objects.all(), progress_bar_disable=True),
+            (2, 0, 0),
+        )
+
+
+class TestDocnumDocumentIds(DirectoriesMixin, TestCase):
+    @mock.patch("documents.index._reader_document_ids", OrderedDict())
+    @mock.patch("documents.index._segment_document_ids", {})
+    def test_docnum_document_ids(self):
+        """
+        GIVEN:
+            - Index with several segments
+        WHEN:
+            - The document IDs of the docnums are requested repeatedly
+            - Another segment is added
+        THEN:
+            - Each docnum is mapped to its document ID
+            - The stored fields of each segment are only read once
+        """
+        docs = [
+            Document.objects.create(title=f"doc{i}", checksum=str(i)) for i in range(3)
+        ]
+        for doc in docs[:2]:
+            index.add_or_update_document(doc)
+
+        with index.open_index_searcher() as searcher:
+            reader = searcher.reader()
+            document_ids = index.get_docnum_document_ids(reader)
+            self.assertEqual(
+                list(document_ids),
+                [reader.stored_fields(docnum)["id"] for docnum in range(2)],
+            )
+
+        index.add_or_update_document(docs[2])
+
+        with index.open_index_searcher() as searcher:
+            reader = searcher.reader()
+            with mock.patch.object(
+                reader.leaf_readers()[0][0],
+                "stored_fields",
+            ) as stored_fields:
+                document_ids = index.get_docnum_document_ids(reader)
+                stored_fields.assert_not_called()
+            self.assertCountEqual(list(document_ids), [doc.pk for doc in docs])
+
+    @mock.patch("documents.index._reader_document_ids", OrderedDict())
+    @mock.patch("documents.index._segment_document_ids", {})
+    def test_docnum_document_ids_older_reader(self):
+        """
+        GIVEN:
+            - A searcher opened before another segment was added
+        WHEN:
+            - The document IDs of the older and a newer reader are requested
+              alternately
+        THEN:
+            - The IDs of both readers are reused
+        """
+        docs = [
+            Document.objects.create(title=f"doc{i}", checksum=str(i)) for i in range(2)
+        ]
+        index.add_or_update_document(docs[0])
+
+        with index.open_index_searcher() as old_searcher:
+            old_reader = old_searcher.reader()
+            old_document_ids = index.get_docnum_document_ids(old_reader)
+
+            index.add_or_update_document(docs[1])
+
+            with index.open_index_searcher() as searcher:
+                document_ids = index.get_docnum_document_ids(searcher.reader())
+
+                self.assertIs(
+                    index.get_docnum_document_ids(old_reader),
+                    old_document_ids,
+                )
+                self.assertIs(
+                    index.get_docnum_document_ids(searcher.reader()),
+                    document_ids,
+                )
+        self.assertEqual(list(old_document_ids), [docs[0].pk])
+        self.assertCountEqual(list(document_ids), [doc.pk for doc in docs])
+
+    def test_mapped_doc_id_set(self):
+        """
+        GIVEN:
+            - Indexed documents
+        WHEN:
+            - A search is filtered to some of the documents
+        THEN:
+            - Only these documents are found
+        """
+        docs = [
+            Document.objects.create(title=f"doc{i}", checksum=str(i), content="text")
+            for i in range(3)
+        ]
+        for doc in docs:
+            index.add_or_update_document(doc)
+
+        with index.open_index_searcher() as searcher:
+            results = searcher.search(
+                QueryParser("content", index.get_schema()).parse("text"),
+                filter=index.MappedDocIdSet(
+                    Document.objects.filter(pk__in=[docs[0].pk, docs[2].pk]),
+                    searcher.reader(),
+                ),
+            )
+            self.assertCountEqual(
+                [hit["id"] for hit in results],
+                [docs[0].pk, docs[2].pk],
+            )
+
+
+class TestFilterDocumentIds(DirectoriesMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create_user("user")
+        self.other = User.objects.create_user("other")
+        self.docs = [
+            Document.objects.create(
+                title=f"doc{i}",
+                checksum=str(i),
+                content="text",
+                owner=self.other,
+            )
+            for i in range(3)
+        ]
+
+    def visible(self, user: User):
+        return Document.objects.filter(owner=user) | Document.objects.filter(
+            pk__in=UserObjectPermission.objects.filter(user=user).values(
+                "object_pk",
+            ),
+        )
+
+    def test_filter_document_ids_cached(self):
+        """
+        GIVEN:
+            - Documents visible to a user
+        WHEN:
+            - The visible documents are requested repeatedly
+        THEN:
+            - The documents are only queried once
+            - Other filters and users are cached separately
+        """
+        ids = index.get_filter_document_ids(self.visible(self.other), self.other)
+        self.assertCountEqual(
+            [doc.pk for doc in self.docs if doc.pk in ids],
+            [doc.pk for doc in self.docs],
+        )
+
+        with self.assertNumQueries(0):
+            ids = index.get_filter_document_ids(self.visible(self.other), self.other)
+        self.assertTrue(all(doc.pk in ids for doc in self.docs))
+
+        ids = index.get_filter_document_ids(self.visible(self.user), self.user)
+        self.assertFalse(any(doc.pk in ids for doc in self.docs))
+
+        ids = index.get_filter_document_ids(
+            self.visible(self.other).filter(title="doc1"),
+            self.other,
+        )
+        self.assertEqual([doc.pk in ids for doc in self.docs], [False, True, False])
+
+    def test_filter_document_ids_invalidated(self):
+        """
+        GIVEN:
+            - Cached visible documents of a user
+        WHEN:
+            - A document is shared with the user
+            - A document is deleted
+        THEN:
+            - The visible documents are queried again
+        """
+        ids = index.get_filter_document_ids(self.visible(self.user), self.user)
+        self.assertNotIn(self.docs[0].pk, ids)
+
+        assign_perm("view_document", self.user, self.docs[0])
+        ids = index.get_filter_document_ids(self.visible(self.user), self.user)
+        self.assertIn(self.docs[0].pk, ids)
+
+        self.docs[0].delete()
+        ids = index.get_filter_document_ids(
+            Document.objects.filter(pk=self.docs[0].pk),
+            self.user,
+        )
+        self.assertNotIn(self.docs[0].pk, ids)
+
+    def test_filter_document_ids_empty(self):
+        """
+        GIVEN:
+            - A filter which can never match
+        WHEN:
+            - The visible documents are requested
+        THEN:
+            - No documents are visible, without a query
+        """
+        with self.assertNumQueries(0):
+            ids = index.get_filter_document_ids(Document.objects.none(), self.user)
+        self.assertFalse(any(doc.pk in ids for doc in self.docs))
+
+    def test_delayed_query_filter_reused(self):
+        """
+        GIVEN:
+            - A full text query
+        WHEN:
+            - Several pages and the count are requested
+        THEN:
+            - The visible documents are only determined once
+        """
+        for doc in self.docs:
+            index.add_or_update_document(doc)
+
+        with index.open_index_searcher() as searcher:
+            query = index.DelayedFullTextQuery(
+                searcher,
+                {"query": "text"},
+                1,
+                filter_queryset=self.visible(self.other),
+                user=self.other,
+            )
+            with mock.patch(
+                "documents.index.get_filter_document_ids",
+                wraps=index.get_filter_document_ids,
+            ) as get_filter_document_ids:
+                self.assertEqual(len(query), 3)
+                self.assertEqual(query[1:2].pagenum, 2)
+                self.assertEqual(query[2:3].pagenum, 3)
+                get_filter_document_ids.assert_called_once()
+
+
+class TestSearcherPool(DirectoriesMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        index.clear_index_searchers()
+
+    def test_searcher_reused(self):
+        """
+        GIVEN:
+            - An index
+        WHEN:
+            - Searchers are requested repeatedly without index changes
+        THEN:
+            - The same reader is reused
+        """
+        index.add_or_update_document(
+            Document.objects.create(title="doc", checksum="A", content="text"),
+        )
+
+        with index.open_index_searcher() as searcher:
+            reader = searcher.ixreader
+        with index.open_index_searcher() as searcher:
+            self.assertIs(searcher.ixreader, reader)
+            self.assertFalse(searcher.is_closed)
+
+    def test_searcher_refreshed(self):
+        """
+        GIVEN:
+            - A searcher kept open in the pool
+        WHEN:
+            - A document is added to the index
+            - A searcher is requested
+        THEN:
+            - The searcher is refreshed and finds the document
+        """
+        doc1 = Document.objects.create(title="doc1", checksum="A", content="text")
+        index.add_or_update_document(doc1)
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(searcher.doc_count(), 1)
+
+        doc2 = Document.objects.create(title="doc2", checksum="B", content="text")
+        index.add_or_update_document(doc2)
+        with index.open_index_searcher() as searcher:
+            self.assertTrue(searcher.up_to_date())
+            results = searcher.search(
+                QueryParser("content", index.get_schema()).parse("text"),
+            )
+            self.assertCountEqual([hit["id"] for hit in results], [doc1.pk, doc2.pk])
+
+    def test_searcher_closed_on_error(self):
+        """
+        GIVEN:
+            - A searcher
+        WHEN:
+            - The search fails
+        THEN:
+            - The searcher is closed and not reused
+        """
+        with self.assertRaises(ValueError):
+            with index.open_index_searcher() as searcher:
+                raise ValueError
+
+        self.assertTrue(searcher.is_closed)
+        with index.open_index_searcher() as other:
+            self.assertIsNot(other, searcher)
+
+    def test_searchers_cleared_on_recreate(self):
+        """
+        GIVEN:
+            - A searcher kept open in the pool
+        WHEN:
+            - The index is recreated
+        THEN:
+            - The searcher is closed
+        """
+        with index.open_index_searcher() as searcher:
+            pass
+
+        index.open_index(recreate=True)
+
+        self.assertTrue(searcher.is_closed)
+
+
+class TestSearchResultsCache(DirectoriesMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.user = User.objects.create_superuser("user")
+        self.docs = [
+            Document.objects.create(
+                title=f"doc{i}",
+                checksum=str(i),
+                content=f"text {'word ' * i}",
+            )
+            for i in range(5)
+        ]
+        for doc in self.docs:
+            index.add_or_update_document(doc)
+
+    def query(self, searcher, query_params=None, page_size=2):
+        return index.DelayedFullTextQuery(
+            searcher,
+            query_params or {"query": "text"},
+            page_size,
+            filter_queryset=Document.objects.all(),
+            user=self.user,
+        )
+
+    def highlights(self, hit):
+        return hit.highlights(
+            "content",
+            text=Document.objects.get(pk=hit["id"]).content,
+        )
+
+    def test_results_cached(self):
+        """
+        GIVEN:
+            - A full text search
+        WHEN:
+            - The same search is run again, for the count and other pages
+        THEN:
+            - The index is only searched once
+            - The cached results have the same hits and highlights
+        """
+        with index.open_index_searcher() as searcher:
+            first = self.query(searcher)[0:2]
+            ids = [hit["id"] for hit in first]
+            highlights = [self.highlights(hit) for hit in first]
+            self.assertTrue(all(highlights))
+
+        with index.open_index_searcher() as searcher:
+            with mock.patch.object(searcher, "search") as search:
+                query = self.query(searcher)
+                self.assertEqual(len(query), 5)
+                page = query[0:2]
+                self.assertEqual([hit["id"] for hit in page], ids)
+                self.assertEqual(
+                    [self.highlights(hit) for hit in page],
+                    highlights,
+                )
+                self.assertEqual(len(list(query[4:6])), 1)
+                search.assert_not_called()
+
+            with mock.patch.object(searcher, "search") as search:
+                self.query(searcher, {"query": "text", "ordering": "title"})[0:2]
+                search.assert_called_once()
+
+    def test_all_result_ids_first_page(self):
+        """
+        GIVEN:
+            - A full text search with more hits than the page size
+        WHEN:
+            - The IDs of all results are requested, with and without cached
+              results
+        THEN:
+            - Only the IDs of the hits of the first page are returned
+            - The cached results report the number of all matches
+        """
+        with index.open_index_searcher() as searcher:
+            query = self.query(searcher)
+            ids = [hit["id"] for hit in query[0:2]]
+            self.assertEqual(query.get_all_result_ids(), ids)
+
+        with index.open_index_searcher() as searcher:
+            query = self.query(searcher)
+            page = query[0:2]
+            self.assertIsInstance(page.results, index.CachedResults)
+            self.assertEqual(page.total, 5)
+            self.assertEqual(query.get_all_result_ids(), ids)
+
+    @mock.patch("documents.index.SEARCH_RESULTS_CACHE_HITS", 2)
+    def test_results_cache_extended(self):
+        """
+        GIVEN:
+            - Cached results with fewer hits than matching documents
+        WHEN:
+            - A page beyond the cached hits is requested
+        THEN:
+            - The index is searched again
+        """
+        with index.open_index_searcher() as searcher:
+            self.query(searcher)[0:2]
+            with mock.patch.object(
+                searcher,
+                "search",
+                wraps=searcher.search,
+            ) as search:
+                page = self.query(searcher)[2:4]
+                search.assert_called_once()
+            self.assertEqual(len(list(page)), 2)
+
+    def test_results_cache_index_changed(self):
+        """
+        GIVEN:
+            - Cached results
+        WHEN:
+            - A document is added to the index
+        THEN:
+            - The search finds the new document
+        """
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(len(self.query(searcher)), 5)
+
+        doc = Document.objects.create(title="new", checksum="new", content="text")
+        index.add_or_update_document(doc)
+
+        with index.open_index_searcher() as searcher:
+            self.assertEqual(len(self.query(searcher)), 6)
+
+
+class TestMergeSegments(DirectoriesMixin, TestCase):
+    def add_documents(self, count: int) -> list[Document]:
+        documents = []
+        for i in range(count):
+            document = Document.objects.create(
+                title=f"document {i}",
+                content=f"content {i}",
+                checksum=f"{len(Document.objects.all())}",
+            )
+            # Every update is committed as a segment of its own
+            index.add_or_update_document(document)
+            documents.append(document)
+        return documents
+
+    def get_segments(self):
+        return index.get_index_segments(index.open_index())
+
+    def test_commits_do_not_merge(self):
+        """
+        GIVEN:
+            - An empty index
+        WHEN:
+            - Documents are added to the index one by one
+        THEN:
+            - Every commit adds a segment, none are merged
+        """
+        self.assertEqual(index.WhooshSearchBackend().segment_sizes(), [])
+
+        self.add_documents(12)
+
+        self.assertEqual(len(self.get_segments()), 12)
+        self.assertEqual(len(index.WhooshSearchBackend().segment_sizes()), 12)
+
+    @mock.patch("documents.index.MAX_UNMERGED_SEGMENTS", 5)
+    def test_commits_merge_when_behind(self):
+        """
+        GIVEN:
+            - An index with as many segments as are left unmerged at most
+        WHEN:
+            - Another document is added to the index
+        THEN:
+            - A tier of segments is merged into the segment of the commit
+        """
+        self.add_documents(5)
+        self.assertEqual(len(self.get_segments()), 5)
+
+        with mock.patch("documents.index.MERGE_FACTOR", 5):
+            self.add_documents(1)
+
+        self.assertEqual(
+            [segment.doc_count_all() for segment in self.get_segments()],
+            [6],
+        )
+
+    def test_merge_segments(self):
+        """
+        GIVEN:
+            - An index with twelve small segments
+        WHEN:
+            - The segments are merged without and with enough budget
+        THEN:
+            - Nothing is merged without budget
+            - Ten segments of the lowest tier are merged into one
+            - All documents are still indexed
+        """
+        self.add_documents(12)
+
+        self.assertEqual(index.merge_segments(max_bytes=1, max_seconds=60), (0, 0))
+        self.assertEqual(len(self.get_segments()), 12)
+
+        merges, merged_bytes = index.merge_segments(
+            max_bytes=1024 * 1024,
+            max_seconds=60,
+        )
+
+        self.assertEqual(merges, 1)
+        self.assertGreater(merged_bytes, 0)
+        self.assertCountEqual(
+            [segment.doc_count_all() for segment in self.get_segments()],
+            [10, 1, 1],
+        )
+        self.assertEqual(index.WhooshSearchBackend().count(), 12)
+        self.assertEqual(index.merge_segments(max_bytes=1, max_seconds=60), (0, 0))
+
+    def test_merge_segments_deleted_documents(self):
+        """
+        GIVEN:
+            - An index with a merged segment
+        WHEN:
+            - Some of the documents of the segment are removed from the index
+            - The segments are merged
+        THEN:
+            - The segment is rewritten without the removed documents
+        """
+        documents = self.add_documents(10)
+        index.merge_segments(max_bytes=1024 * 1024, max_seconds=60)
+        self.assertEqual(len(self.get_segments()), 1)
+
+        index.WhooshSearchBackend().remove_documents(
+            [document.pk for document in documents[:3]],
+        )
+        self.assertEqual(
+            index.merge_segments(max_bytes=1024 * 1024, max_seconds=60)[0],
+            1,
+        )
+
+        self.assertEqual(
+            [segment.doc_count_all() for segment in self.get_segments()],
+            [7],
+        )
+        self.assertEqual(
+            index.merge_segments(max_bytes=1024 * 1024, max_seconds=60)[0],
+            0,
+        )
+
+    @override_settings(INDEX_MERGE_MAX_MB=1, INDEX_MERGE_MAX_SECONDS=0)
+    def test_merge_time_budget(self):
+        """
+        GIVEN:
+            - An index with ten small segments
+            - No time for scheduled merges
+        WHEN:
+            - The scheduled merge runs
+        THEN:
+            - Nothing is merged
+        """
+        self.add_documents(10)
+
+        self.assertEqual(index.WhooshSearchBackend().merge(), (0, 0))
+        self.assertEqual(len(self.get_segments()), 10)
@@ -10,6 +10,7 @@ from unittest import mock
 from auditlog.models import LogEntry
 from django.contrib.contenttypes.models import ContentType
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 from django.test import override_settings
 
@@ -178,11 +179,31 @@ class TestMakeIndex(TestCase):
         call_command("document_index", "reindex")
         m.assert_called_once()
 
+    @mock.patch("documents.management.commands.document_index.index_reconcile")
+    def test_reconcile(self, m):
+        call_command("document_index", "reconcile")
+        m.assert_called_once()
+
     @mock.patch("documents.management.commands.document_index.index_optimize")
     def test_optimize(self, m):
         call_command("document_index", "optimize")
         m.assert_called_once()
 
+    @mock.patch("documents.management.commands.document_index.index_merge")
+    def test_merge(self, m):
+        m.return_value = "Index segments merged: 0 merges of 0 bytes"
+        call_command("document_index", "merge")
+        m.assert_called_once()
+
+    @mock.patch("documents.management.commands.document_index.index_migrate")
+    def test_migrate(self, m):
+        m.return_value = 0
+        call_command("document_index", "migrate", "--to", "database")
+        m.assert_called_once_with("database", progress_bar_disable=False)
+
+        with self.assertRaises(CommandError):
+            call_command("document_index", "migrate")
+
 
 class TestRenamer(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
     @override_settings(FILENAME_FORMAT="")
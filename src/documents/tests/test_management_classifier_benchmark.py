@@ -0,0 +1,114 @@
+import json
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError
+from django.core.management import call_command
+from django.test import TestCase
+
+from documents.models import Correspondent
+from documents.models import Document
+from documents.models import Tag
+from documents.tests.test_classifier import dummy_preprocess
+from documents.tests.utils import DirectoriesMixin
+from documents.tests.utils import FileSystemAssertsMixin
+
+
+@mock.patch(
+    "documents.classifier.DocumentClassifier.preprocess_content",
+    side_effect=dummy_preprocess,
+)
+class TestClassifierBenchmark(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
+    def test_benchmark_generated(self, _):
+        """
+        GIVEN:
+            - No documents
+        WHEN:
+            - The classifier benchmark is run with a generated corpus
+        THEN:
+            - The timings of all phases are reported as JSON
+            - The generated documents and labels are removed again
+            - No classifier model is created
+        """
+        out = StringIO()
+        call_command(
+            "document_classifier_benchmark",
+            "--generate",
+            "--documents",
+            "30",
+            "--predictions",
+            "5",
+            "--seed",
+            "1",
+            stdout=out,
+        )
+        results = json.loads(out.getvalue())
+
+        self.assertEqual(results["corpus"], "generated")
+        self.assertEqual(results["documents"], 30)
+        for phase in ("gather_data", "preprocess", "vectorize", "fit", "total"):
+            self.assertIn(phase, results["train_seconds"])
+        self.assertCountEqual(
+            results["fit_seconds"].keys(),
+            [
+                "tags_classifier",
+                "correspondent_classifier",
+                "document_type_classifier",
+                "storage_path_classifier",
+            ],
+        )
+        self.assertGreater(results["model_size_bytes"], 0)
+        self.assertEqual(results["prediction_seconds"]["documents"], 5)
+        self.assertIsNotNone(results["prediction_seconds"]["p95"])
+        self.assertGreater(results["peak_rss"]["self"], 0)
+
+        self.assertEqual(Document.objects.count(), 0)
+        self.assertEqual(Tag.objects.count(), 0)
+        self.assertIsNotFile(settings.MODEL_FILE)
+
+    def test_benchmark_recent(self, _):
+        """
+        GIVEN:
+            - Existing documents
+        WHEN:
+            - The classifier benchmark is run with fewer documents than exist
+        THEN:
+            - Only the most recent documents are used
+            - The results are written to the output file
+        """
+        c1 = Correspondent.objects.create(name="c1", matching_algorithm=Tag.MATCH_AUTO)
+        c2 = Correspondent.objects.create(name="c2", matching_algorithm=Tag.MATCH_AUTO)
+        for i in range(6):
+            Document.objects.create(
+                title=f"doc {i}",
+                content=f"some content {'alpha' if i % 2 else 'beta'} {i}",
+                checksum=f"checksum {i}",
+                correspondent=c1 if i % 2 else c2,
+            )
+        output = self.dirs.scratch_dir / "benchmark.json"
+
+        call_command(
+            "document_classifier_benchmark",
+            "--documents",
+            "4",
+            "--output",
+            str(output),
+        )
+        results = json.loads(output.read_text())
+
+        self.assertEqual(results["corpus"], "recent")
+        self.assertEqual(results["documents"], 4)
+        self.assertEqual(Document.objects.count(), 6)
+
+    def test_benchmark_no_documents(self, _):
+        """
+        GIVEN:
+            - No documents
+        WHEN:
+            - The classifier benchmark is run without generating documents
+        THEN:
+            - An error is raised
+        """
+        with self.assertRaises(CommandError):
+            call_command("document_classifier_benchmark")
@@ -1,7 +1,10 @@
+from unittest import mock
+
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import TestCase
 
+from documents.classifier import ClassifierPredictions
 from documents.models import Correspondent
 from documents.models import Document
 from documents.models import DocumentType
@@ -294,3 +297,33 @@ class TestRetagger(DirectoriesMixin, TestCase):
         call_command("document_retagger", "--tags", "--id-range", "1", "9999")
         # Now we should have 2 documents
         self.assertEqual(Document.objects.filter(tags__id=self.tag_first.id).count(), 2)
+
+    @mock.patch("documents.management.commands.document_retagger.load_classifier")
+    def test_classifier_predicts_batch(self, mock_load_classifier):
+        """
+        GIVEN:
+            - A classifier predicting an AUTO tag
+        WHEN:
+            - The retagger is run for tags
+        THEN:
+            - The classifier predicts all documents in a single batch
+            - The predicted AUTO tag is assigned
+        """
+        classifier = mock.MagicMock()
+        classifier.predict_all.side_effect = lambda contents: [
+            ClassifierPredictions(tags=[self.tag_auto.pk]) for _ in contents
+        ]
+        mock_load_classifier.return_value = classifier
+
+        call_command("document_retagger", "--tags")
+        d_first, d_second, d_unrelated, d_auto = self.get_updated_docs()
+
+        classifier.predict_all.assert_called_once()
+        self.assertCountEqual(
+            classifier.predict_all.call_args.args[0],
+            [doc.content for doc in (d_first, d_second, d_unrelated, d_auto)],
+        )
+        classifier.predict_tags.assert_not_called()
+
+        self.assertIn(self.tag_auto, d_first.tags.all())
+        self.assertIn(self.tag_auto, d_second.tags.all())
@@ -3,6 +3,7 @@ import tempfile
 from collections.abc import Iterable
 from pathlib import Path
 from random import randint
+from unittest import mock
 
 from django.contrib.auth.models import User
 from django.test import TestCase
@@ -12,6 +13,7 @@ from documents import matching
 from documents.models import Correspondent
 from documents.models import Document
 from documents.models import DocumentType
+from documents.models import StoragePath
 from documents.models import Tag
 from documents.signals import document_consumption_finished
 
@@ -451,3 +453,120 @@ class TestDocumentConsumptionFinishedSignal(TestCase):
             document=self.doc_contains,
         )
         self.assertEqual(self.doc_contains.correspondent, None)
+
+
+class TestMatcherCache(TestCase):
+    def test_matchers_compiled_once(self):
+        """
+        GIVEN:
+            - Tags, correspondents, document types and storage paths, some
+              with the same match
+        WHEN:
+            - Documents are matched repeatedly
+        THEN:
+            - The matchers are compiled once, for every distinct match
+            - Matching compiles no regular expressions
+        """
+        Tag.objects.create(name="t1", match="alpha", matching_algorithm=Tag.MATCH_ANY)
+        Tag.objects.create(name="t2", match="alpha", matching_algorithm=Tag.MATCH_ANY)
+        Correspondent.objects.create(
+            name="c1",
+            match="beta gamma",
+            matching_algorithm=Correspondent.MATCH_ALL,
+        )
+        DocumentType.objects.create(
+            name="dt1",
+            match=r"delta\d+",
+            matching_algorithm=DocumentType.MATCH_REGEX,
+        )
+        StoragePath.objects.create(
+            name="sp1",
+            path="path",
+            match="epsilon",
+            matching_algorithm=StoragePath.MATCH_LITERAL,
+        )
+
+        matchers = matching.get_matchers()
+        self.assertEqual(len(matchers), 4)
+        self.assertIs(matching.get_matchers(), matchers)
+
+        doc = Document(content="alpha beta gamma delta42 epsilon")
+        with mock.patch("documents.matching.re.compile") as compile:
+            self.assertEqual(len(matching.match_tags(doc, None)), 2)
+            self.assertEqual(len(matching.match_correspondents(doc, None)), 1)
+            self.assertEqual(len(matching.match_document_types(doc, None)), 1)
+            self.assertEqual(len(matching.match_storage_paths(doc, None)), 1)
+            compile.assert_not_called()
+        self.assertIs(matching.get_matchers(), matchers)
+
+    def test_matchers_invalidated(self):
+        """
+        GIVEN:
+            - A tag matching a word
+        WHEN:
+            - The match of the tag is changed
+            - The tag is deleted
+        THEN:
+            - The matchers are compiled again, with the changed match
+        """
+        tag = Tag.objects.create(
+            name="tag",
+            match="alpha",
+            matching_algorithm=Tag.MATCH_ANY,
+        )
+        matchers = matching.get_matchers()
+        doc = Document(content="I have beta in me")
+        self.assertEqual(matching.match_tags(doc, None), [])
+
+        tag.match = "beta"
+        tag.save()
+
+        self.assertIsNot(matching.get_matchers(), matchers)
+        self.assertEqual(matching.match_tags(doc, None), [tag])
+
+        matchers = matching.get_matchers()
+        tag.delete()
+        self.assertIsNot(matching.get_matchers(), matchers)
+        self.assertEqual(len(matching.get_matchers()), 0)
+
+    def test_other_matchers_bounded(self):
+        """
+        GIVEN:
+            - Compiled matchers of the matching objects
+        WHEN:
+            - Documents are matched by many different unsaved matches
+        THEN:
+            - The matchers of the matching objects are unchanged
+            - Only the most recently used other matchers are kept
+        """
+        matchers = matching.get_matchers()
+        doc = Document(content="I have alpha in me")
+        matching._get_other_matcher.cache_clear()
+
+        for i in range(200):
+            tag = Tag(name="tag", match=f"alpha{i}", matching_algorithm=Tag.MATCH_ANY)
+            self.assertFalse(matching.matches(tag, doc, matchers=matchers))
+        tag = Tag(name="tag", match="alpha", matching_algorithm=Tag.MATCH_ANY)
+        self.assertTrue(matching.matches(tag, doc, matchers=matchers))
+
+        self.assertEqual(len(matchers), 0)
+        self.assertLessEqual(matching._get_other_matcher.cache_info().currsize, 128)
+
+    def test_unsupported_algorithm(self):
+        """
+        GIVEN:
+            - A tag with an unsupported matching algorithm
+        WHEN:
+            - The matchers are compiled and a document is matched
+        THEN:
+            - The error is logged
+            - The tag does not match, other tags still do
+        """
+        Tag.objects.create(name="t1", match="alpha", matching_algorithm=Tag.MATCH_ANY)
+        Tag.objects.create(name="t2", match="alpha", matching_algorithm=99)
+
+        with self.assertLogs("paperless.matching", level="ERROR") as logs:
+            tags = matching.match_tags(Document(content="I have alpha in me"), None)
+
+        self.assertEqual([tag.name for tag in tags], ["t1"])
+        self.assertIn("Unsupported matching algorithm 99", logs.output[0])
@@ -0,0 +1,421 @@
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError
+from django.db import connection
+from django.test import TestCase
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from documents import index
+from documents import similarity
+from documents.models import Correspondent
+from documents.models import Document
+from documents.models import Note
+from documents.models import Tag
+from documents.search_database import PostgresqlSearchDialect
+from documents.search_database import SearchClause
+from documents.search_database import SqliteSearchDialect
+from documents.search_database import parse_query
+from documents.tests.utils import DirectoriesMixin
+
+
+class TestParseQuery(TestCase):
+    def test_parse_query(self):
+        """
+        GIVEN:
+            - Queries of words, phrases, prefixes, fields and negations
+        WHEN:
+            - The queries are parsed
+        THEN:
+            - The clauses are parsed into lowercase words
+            - Unknown fields are searched as words
+        """
+        self.assertEqual(
+            parse_query('Bank "paid for" stat* title:invoice -august NOT shop'),
+            [
+                SearchClause(words=("bank",)),
+                SearchClause(words=("paid", "for")),
+                SearchClause(words=("stat",), prefix=True),
+                SearchClause(words=("invoice",), field="title"),
+                SearchClause(words=("august",), negated=True),
+                SearchClause(words=("shop",), negated=True),
+            ],
+        )
+        self.assertEqual(
+            parse_query("created:2024-01-05 AND foo_bar"),
+            [
+                SearchClause(words=("created", "2024", "01", "05")),
+                SearchClause(words=("foo", "bar")),
+            ],
+        )
+        self.assertEqual(parse_query("-- * AND"), [])
+
+
+class TestPostgresqlSearchDialect(TestCase):
+    @mock.patch("documents.search_database.connection")
+    def test_autocomplete_parameters(self, connection):
+        """
+        GIVEN:
+            - The PostgreSQL search dialect
+        WHEN:
+            - Words of visible documents starting with a prefix are requested
+        THEN:
+            - The prefix and the visible documents are bound as parameters of
+              the statistics query
+        """
+        connection.ops.compose_sql.return_value = "composed"
+        cursor = mock.Mock()
+        cursor.fetchall.return_value = [("bank",)]
+
+        words = PostgresqlSearchDialect().autocomplete(
+            cursor,
+            "ban",
+            10,
+            Document.objects.filter(owner__isnull=True),
+        )
+
+        self.assertEqual(words, ["bank"])
+        (statistics_sql, statistics_params), _ = connection.ops.compose_sql.call_args
+        self.assertNotIn("ban", statistics_sql)
+        self.assertIn("to_tsquery('simple', %s)", statistics_sql)
+        self.assertEqual(statistics_params, ["('ban':*D)"])
+        cursor.execute.assert_called_once_with(mock.ANY, ["composed", "ban", 10])
+
+        cursor.reset_mock()
+        self.assertEqual(
+            PostgresqlSearchDialect().autocomplete(cursor, "ban'", 10, None),
+            [],
+        )
+        cursor.execute.assert_not_called()
+
+
+class TestDatabaseSearchTables(TestCase):
+    @mock.patch("documents.search_database._search_tables_created", set())
+    def test_tables_created_on_first_use(self):
+        """
+        GIVEN:
+            - A migrated database
+        WHEN:
+            - The database search backend is used for the first time
+        THEN:
+            - The search tables are created only then
+        """
+        self.assertNotIn("documents_search", connection.introspection.table_names())
+
+        backend = index.get_search_backend("database")
+
+        self.assertIn("documents_search", connection.introspection.table_names())
+        self.assertEqual(backend.count(), 0)
+
+    @mock.patch("documents.search_database._search_tables_created", set())
+    @mock.patch.object(SqliteSearchDialect, "create_tables")
+    def test_tables_not_created(self, create_tables):
+        """
+        GIVEN:
+            - A database which cannot create the search tables
+        WHEN:
+            - The database search backend is used
+        THEN:
+            - The backend is reported as improperly configured
+        """
+        create_tables.side_effect = OperationalError("no such module: fts5")
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "fts5"):
+            index.get_search_backend("database")
+
+
+@override_settings(SEARCH_BACKEND="database")
+class TestDatabaseSearchApi(DirectoriesMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user = User.objects.create_superuser(username="temp_admin")
+        self.client.force_authenticate(user=self.user)
+
+        self.invoice = Document.objects.create(
+            title="invoice",
+            content="the thing i bought at a shop and paid with bank account",
+            checksum="A",
+        )
+        self.statement1 = Document.objects.create(
+            title="bank statement 1",
+            content="things i paid for in august",
+            checksum="B",
+        )
+        self.statement2 = Document.objects.create(
+            title="bank statement 3",
+            content="things i paid for in september",
+            checksum="C",
+        )
+        # The search tables are created within the transaction of each test
+        patcher = mock.patch("documents.search_database._search_tables_created", set())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.backend = index.get_search_backend()
+        self.backend.update_documents(
+            [self.invoice.pk, self.statement1.pk, self.statement2.pk],
+        )
+
+    def search(self, query: str) -> list[int]:
+        response = self.client.get(f"/api/documents/?{query}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["count"],
+            len(response.data["results"]),
+        )
+        return [result["id"] for result in response.data["results"]]
+
+    def test_search(self):
+        """
+        GIVEN:
+            - Documents indexed in the database
+        WHEN:
+            - API requests for full text searches
+        THEN:
+            - The matching documents are returned, best match first
+            - The search terms are highlighted
+        """
+        self.assertEqual(self.search("query=bank")[0], self.statement1.pk)
+        self.assertCountEqual(
+            self.search("query=bank"),
+            [self.invoice.pk, self.statement1.pk, self.statement2.pk],
+        )
+        self.assertEqual(self.search("query=september"), [self.statement2.pk])
+        self.assertCountEqual(
+            self.search("query=statement"),
+            [self.statement1.pk, self.statement2.pk],
+        )
+        self.assertEqual(self.search("query=sfegdfg"), [])
+        self.assertEqual(self.search("query=sept*"), [self.statement2.pk])
+        self.assertEqual(self.search("query=title:bank -august"), [self.statement2.pk])
+        self.assertEqual(self.search('query="in september"'), [self.statement2.pk])
+        self.assertEqual(self.search('query="september in"'), [])
+
+        response = self.client.get("/api/documents/?query=septem*")
+        hit = response.data["results"][0]["__search_hit__"]
+        self.assertEqual(hit["rank"], 0)
+        self.assertEqual(hit["score"], 1.0)
+        self.assertIn('<span class="match term0">september</span>', hit["highlights"])
+
+    def test_search_ordering_and_pages(self):
+        """
+        GIVEN:
+            - Documents indexed in the database
+        WHEN:
+            - API requests for a full text search ordered by title
+            - API requests for pages of a full text search
+        THEN:
+            - The results are ordered by title
+            - Each page contains the next results, and all results are listed
+        """
+        self.assertEqual(
+            self.search("query=bank&ordering=-title"),
+            [self.invoice.pk, self.statement2.pk, self.statement1.pk],
+        )
+
+        seen = []
+        for page in (1, 2, 3):
+            response = self.client.get(
+                f"/api/documents/?query=bank&page={page}&page_size=1",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["count"], 3)
+            self.assertEqual(len(response.data["results"]), 1)
+            seen.append(response.data["results"][0]["id"])
+        self.assertEqual(response.data["all"], seen)
+
+        response = self.client.get("/api/documents/?query=bank&page=4&page_size=1")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_permissions(self):
+        """
+        GIVEN:
+            - Documents indexed in the database, one owned by another user
+        WHEN:
+            - API requests for a full text search and autocomplete by a user
+              who can not see all documents
+        THEN:
+            - Only visible documents are returned and counted
+        """
+        user = User.objects.create_user("user")
+        user.user_permissions.add(
+            *Permission.objects.filter(codename="view_document"),
+        )
+        self.statement1.owner = self.user
+        self.statement1.content = "things i paid for in august and autumn"
+        self.statement1.save()
+        self.backend.update_documents([self.statement1.pk])
+
+        self.client.force_authenticate(user=user)
+        self.assertCountEqual(
+            self.search("query=bank"),
+            [self.invoice.pk, self.statement2.pk],
+        )
+        response = self.client.get("/api/search/autocomplete/?term=a")
+        self.assertEqual(response.data, [b"a", b"account", b"and", b"at"])
+        response = self.client.get("/api/search/autocomplete/?term=au")
+        self.assertEqual(response.data, [])
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get("/api/search/autocomplete/?term=au")
+        self.assertEqual(response.data, [b"august", b"autumn"])
+        # The exact match first, then the words in most documents
+        response = self.client.get("/api/search/autocomplete/?term=a&limit=2")
+        self.assertEqual(response.data, [b"a", b"and"])
+
+    def test_search_nothing_visible(self):
+        """
+        GIVEN:
+            - Documents indexed in the database
+        WHEN:
+            - A full text search is filtered by a filter which can never match
+            - Autocomplete is requested by a user who can see no documents
+        THEN:
+            - No results are returned
+        """
+        query = self.backend.get_query(
+            None,
+            {"query": "bank"},
+            25,
+            filter_queryset=Document.objects.filter(id__in=[]),
+        )
+        self.assertEqual(query.get_all_result_ids(), [])
+        self.assertEqual(len(query), 0)
+
+        user = User.objects.create_user("user")
+        with mock.patch(
+            "documents.index.get_objects_for_user_owner_aware",
+            return_value=Document.objects.none(),
+        ):
+            self.assertEqual(self.backend.autocomplete("a", 10, user), [])
+
+    def test_search_selection_data(self):
+        """
+        GIVEN:
+            - Documents with tags and correspondents indexed in the database
+        WHEN:
+            - API request for a search including the selection data
+        THEN:
+            - The objects are counted over all results
+        """
+        tag = Tag.objects.create(name="tag")
+        correspondent = Correspondent.objects.create(name="correspondent")
+        self.statement1.tags.add(tag)
+        self.statement2.tags.add(tag)
+        self.statement2.correspondent = correspondent
+        self.statement2.save()
+
+        response = self.client.get(
+            "/api/documents/?query=statement&include_selection_data=true",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selection_data = response.data["selection_data"]
+        self.assertEqual(
+            selection_data["selected_tags"],
+            [{"id": tag.id, "document_count": 2}],
+        )
+        self.assertEqual(
+            selection_data["selected_correspondents"],
+            [{"id": correspondent.id, "document_count": 1}],
+        )
+
+    def test_search_more_like(self):
+        """
+        GIVEN:
+            - Documents indexed in the database
+        WHEN:
+            - API request for more like a given document, without and with a
+              similarity index
+        THEN:
+            - Documents sharing the frequent words of the document are
+              returned, except the document itself
+        """
+        self.assertCountEqual(
+            self.search(f"more_like_id={self.statement1.pk}"),
+            [self.statement2.pk, self.invoice.pk],
+        )
+
+        similarity.rebuild()
+        ids = self.search(f"more_like_id={self.statement1.pk}")
+        self.assertEqual(ids[0], self.statement2.pk)
+        self.assertNotIn(self.statement1.pk, ids)
+
+    def test_update_documents(self):
+        """
+        GIVEN:
+            - Documents indexed in the database
+        WHEN:
+            - A document and its notes are changed
+            - A document is deleted
+            - A document is removed from the index
+        THEN:
+            - Searches find the changed content only
+        """
+        self.invoice.content = "a receipt"
+        self.invoice.save()
+        Note.objects.create(document=self.invoice, note="returned", user=self.user)
+        self.statement1.delete()
+        self.backend.update_documents([self.invoice.pk, self.statement1.pk])
+
+        self.assertEqual(self.search("query=shop"), [])
+        self.assertEqual(self.search("query=receipt"), [self.invoice.pk])
+        self.assertEqual(self.search("query=notes:returned"), [self.invoice.pk])
+        self.assertEqual(self.search("query=august"), [])
+
+        self.backend.remove_documents([self.invoice.pk])
+        self.assertEqual(self.search("query=receipt"), [])
+        self.assertEqual(self.backend.count(), 1)
+
+    def test_reconcile(self):
+        """
+        GIVEN:
+            - Documents indexed in the database
+        WHEN:
+            - Documents are added, changed and deleted without indexing them
+            - The index is reconciled
+        THEN:
+            - The index matches the documents
+        """
+        Document.objects.filter(pk=self.invoice.pk).update(content="a receipt")
+        self.invoice.refresh_from_db()
+        self.invoice.save()
+        Document.objects.filter(pk=self.statement1.pk).delete()
+        added = Document.objects.create(title="letter", checksum="D")
+
+        self.assertEqual(
+            self.backend.reconcile(Document.objects.all()),
+            (1, 1, 1),
+        )
+        self.assertEqual(self.backend.reconcile(Document.objects.all()), (0, 0, 0))
+        self.assertEqual(self.search("query=receipt"), [self.invoice.pk])
+        self.assertEqual(self.search("query=letter"), [added.pk])
+        self.assertEqual(self.search("query=august"), [])
+
+    def test_migrate(self):
+        """
+        GIVEN:
+            - Documents which are not indexed in the database
+        WHEN:
+            - The index is migrated to the database backend
+        THEN:
+            - All documents are indexed in the database
+        """
+        self.backend.clear()
+        self.assertEqual(self.search("query=bank"), [])
+
+        call_command(
+            "document_index",
+            "migrate",
+            "--to",
+            "database",
+            "--no-progress-bar",
+        )
+
+        self.assertEqual(self.backend.count(), 3)
+        self.assertEqual(len(self.search("query=bank")), 3)
+        self.assertIsNotNone(self.backend.last_modified())
@@ -0,0 +1,157 @@
+from django.test import TestCase
+from whoosh.idsets import BitSet
+
+from documents import similarity
+from documents.models import Document
+from documents.tests.utils import DirectoriesMixin
+
+
+class TestSimilarity(DirectoriesMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.invoice1 = Document.objects.create(
+            title="invoice 1",
+            content="invoice for the repair of the car engine and brakes",
+            checksum="A",
+        )
+        self.invoice2 = Document.objects.create(
+            title="invoice 2",
+            content="invoice for the repair of the car brakes",
+            checksum="B",
+        )
+        self.statement = Document.objects.create(
+            title="statement",
+            content="bank account statement with interest and fees",
+            checksum="C",
+        )
+        self.letter = Document.objects.create(
+            title="letter",
+            content="dear tenant the rent of the flat increases next year",
+            checksum="D",
+        )
+
+    def similar_ids(self, document: Document, **kwargs) -> list[int]:
+        return [
+            doc_id
+            for doc_id, _ in similarity.get_similar_documents(
+                document.pk,
+                limit=10,
+                **kwargs,
+            )
+        ]
+
+    def test_no_index(self):
+        """
+        GIVEN:
+            - No similarity index
+        WHEN:
+            - Similar documents are requested
+        THEN:
+            - None is returned
+        """
+        self.assertIsNone(
+            similarity.get_similar_documents(self.invoice1.pk, limit=10),
+        )
+
+    def test_similar_documents(self):
+        """
+        GIVEN:
+            - A similarity index of documents
+        WHEN:
+            - Similar documents of a document are requested
+        THEN:
+            - The most similar document comes first
+            - The document itself is not included
+            - Only visible documents are included, if given
+        """
+        self.assertEqual(similarity.rebuild(), 4)
+
+        similar = similarity.get_similar_documents(self.invoice1.pk, limit=10)
+        self.assertEqual(similar[0][0], self.invoice2.pk)
+        self.assertGreater(similar[0][1], 0.5)
+        self.assertNotIn(self.invoice1.pk, [doc_id for doc_id, _ in similar])
+
+        self.assertLessEqual(
+            set(
+                self.similar_ids(
+                    self.invoice1,
+                    visible=BitSet([self.statement.pk, self.letter.pk]),
+                ),
+            ),
+            {self.statement.pk, self.letter.pk},
+        )
+
+    def test_update_documents(self):
+        """
+        GIVEN:
+            - A similarity index of documents
+        WHEN:
+            - The content of a document changes
+            - A document is added
+            - A document is deleted
+        THEN:
+            - Similar documents reflect the changes
+        """
+        similarity.rebuild()
+
+        self.letter.content = "invoice for the repair of the car engine"
+        self.letter.save()
+        similarity.update_documents([self.letter.pk])
+        self.assertIn(self.letter.pk, self.similar_ids(self.invoice1)[:2])
+
+        added = Document.objects.create(
+            title="invoice 3",
+            content="invoice for the repair of the car engine and brakes",
+            checksum="E",
+        )
+        # Not part of the index yet, but its content is vectorized
+        self.assertEqual(self.similar_ids(added)[0], self.invoice1.pk)
+        similarity.update_documents([added.pk])
+        self.assertEqual(self.similar_ids(self.invoice1)[0], added.pk)
+
+        added.hard_delete()
+        similarity.update_documents([added.pk])
+        self.assertNotIn(added.pk, self.similar_ids(self.invoice1))
+
+    def test_refresh_updates_swapped(self):
+        """
+        GIVEN:
+            - A similarity index of documents
+        WHEN:
+            - The updates are refreshed after a document changed
+        THEN:
+            - The updates are replaced as a whole
+            - Updates read before are left unchanged
+        """
+        similarity.rebuild()
+        index = similarity._get_index()
+        before = index.updates
+
+        similarity.update_documents([self.letter.pk])
+        index.refresh_updates()
+
+        self.assertIsNot(index.updates, before)
+        self.assertEqual(list(index.updates.ids), [self.letter.pk])
+        self.assertEqual(index.updates.replaced.sum(), 1)
+        self.assertEqual(len(before.ids), 0)
+        self.assertFalse(before.replaced.any())
+
+    def test_rebuild_too_few_documents(self):
+        """
+        GIVEN:
+            - A similarity index
+        WHEN:
+            - The index is rebuilt with less than 2 documents
+        THEN:
+            - The similarity index is removed
+        """
+        similarity.rebuild()
+
+        self.assertEqual(
+            similarity.rebuild(Document.objects.filter(pk=self.invoice1.pk)),
+            0,
+        )
+
+        self.assertIsNone(
+            similarity.get_similar_documents(self.invoice1.pk, limit=10),
+        )
@@ -5,10 +5,18 @@ from pathlib import Path
 from unittest import mock
 
 from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 
 from documents import tasks
+from documents.caching import CLASSIFIER_HASH_KEY
+from documents.caching import CLASSIFIER_MODIFIED_KEY
+from documents.caching import CLASSIFIER_VERSION_KEY
+from documents.caching import get_suggestion_cache
+from documents.caching import set_suggestions_cache
+from documents.classifier import DocumentClassifier
+from documents.classifier import load_classifier
 from documents.models import Correspondent
 from documents.models import Document
 from documents.models import DocumentType
@@ -33,6 +41,21 @@ class TestIndexReindex(DirectoriesMixin, TestCase):
 
         tasks.index_reindex()
 
+    def test_index_reconcile(self):
+        Document.objects.create(
+            title="test",
+            content="my document",
+            checksum="wow",
+            added=timezone.now(),
+            created=timezone.now(),
+            modified=timezone.now(),
+        )
+
+        self.assertEqual(
+            tasks.index_reconcile(),
+            "Index reconciled: 1 added, 0 updated, 0 removed",
+        )
+
     def test_index_optimize(self):
         Document.objects.create(
             title="test",
@@ -45,8 +68,20 @@ class TestIndexReindex(DirectoriesMixin, TestCase):
 
         tasks.index_optimize()
 
+    def test_index_merge(self):
+        self.assertEqual(
+            tasks.index_merge(),
+            "Index segments merged: 0 merges of 0 bytes",
+        )
+
 
 class TestClassifier(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = mock.patch("documents.tasks.precompute_inbox_suggestions.delay")
+        self.precompute_suggestions = patcher.start()
+        self.addCleanup(patcher.stop)
+
     @mock.patch("documents.tasks.load_classifier")
     def test_train_classifier_no_auto_matching(self, load_classifier):
         tasks.train_classifier()
@@ -88,6 +123,7 @@ class TestClassifier(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
 
             tasks.train_classifier()
             self.assertIsFile(settings.MODEL_FILE)
+            self.precompute_suggestions.assert_called_once()
             mtime = os.stat(settings.MODEL_FILE).st_mtime
 
             tasks.train_classifier()
@@ -102,6 +138,199 @@ class TestClassifier(DirectoriesMixin, FileSystemAssertsMixin, TestCase):
             mtime3 = os.stat(settings.MODEL_FILE).st_mtime
             self.assertNotEqual(mtime2, mtime3)
 
+    def test_train_classifier_skip_unchanged(self):
+        """
+        GIVEN:
+            - Classifier trained with the current training data
+        WHEN:
+            - Classifier training is requested again
+            - Then a matching object is changed
+            - Classifier training is requested again
+        THEN:
+            - The classifier is not trained while nothing changed, but the
+              cached classifier information is refreshed
+            - Inbox suggestions are only precomputed again once the cached
+              classifier information was evicted
+            - The classifier is loaded and checked after the change
+        """
+        c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
+        Document.objects.create(correspondent=c, content="test", title="test")
+
+        with mock.patch(
+            "documents.classifier.DocumentClassifier.preprocess_content",
+        ) as pre_proc_mock:
+            pre_proc_mock.side_effect = dummy_preprocess
+
+            tasks.train_classifier()
+            self.assertIsFile(settings.MODEL_FILE)
+            self.precompute_suggestions.assert_called_once()
+            self.precompute_suggestions.reset_mock()
+
+            with mock.patch(
+                "documents.classifier.DocumentClassifier.train",
+            ) as train:
+                tasks.train_classifier()
+                train.assert_not_called()
+            self.precompute_suggestions.assert_not_called()
+
+            cache.delete_many(
+                [CLASSIFIER_MODIFIED_KEY, CLASSIFIER_HASH_KEY, CLASSIFIER_VERSION_KEY],
+            )
+            with mock.patch(
+                "documents.classifier.DocumentClassifier.train",
+            ) as train:
+                with self.assertNumQueries(3):
+                    # Task creation, the marker query and the task update
+                    tasks.train_classifier()
+                train.assert_not_called()
+            self.assertIsNotNone(cache.get(CLASSIFIER_MODIFIED_KEY))
+            self.precompute_suggestions.assert_called_once()
+
+            c.name = "changed"
+            c.save()
+
+            with mock.patch("documents.tasks.load_classifier") as load_classifier:
+                load_classifier.return_value = None
+                tasks.train_classifier()
+                load_classifier.assert_called_once()
+
+    def test_train_classifier_skip_model_missing(self):
+        """
+        GIVEN:
+            - Classifier trained with the current training data
+        WHEN:
+            - The model file is removed
+            - Classifier training is requested again
+        THEN:
+            - The classifier is trained again
+        """
+        c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
+        Document.objects.create(correspondent=c, content="test", title="test")
+
+        with mock.patch(
+            "documents.classifier.DocumentClassifier.preprocess_content",
+        ) as pre_proc_mock:
+            pre_proc_mock.side_effect = dummy_preprocess
+
+            tasks.train_classifier()
+            settings.MODEL_FILE.unlink()
+
+            tasks.train_classifier()
+            self.assertIsFile(settings.MODEL_FILE)
+
+    def test_train_classifier_skip_model_unloadable(self):
+        """
+        GIVEN:
+            - Classifier trained with the current training data
+        WHEN:
+            - The model file cannot be loaded
+            - Classifier training is requested again
+        THEN:
+            - The classifier is trained again
+        """
+        c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
+        Document.objects.create(correspondent=c, content="test", title="test")
+
+        with mock.patch(
+            "documents.classifier.DocumentClassifier.preprocess_content",
+        ) as pre_proc_mock:
+            pre_proc_mock.side_effect = dummy_preprocess
+
+            tasks.train_classifier()
+            self.precompute_suggestions.reset_mock()
+
+            with mock.patch("documents.tasks.load_classifier") as load_classifier:
+                load_classifier.return_value = None
+                tasks.train_classifier()
+                self.assertEqual(load_classifier.call_count, 2)
+            self.assertIsFile(settings.MODEL_FILE)
+            self.precompute_suggestions.assert_called_once()
+
+    def test_train_classifier_format_version_changed(self):
+        """
+        GIVEN:
+            - Classifier trained with the current training data
+        WHEN:
+            - The model format version changes
+            - Classifier training is requested again
+        THEN:
+            - The classifier is checked again
+        """
+        c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
+        Document.objects.create(correspondent=c, content="test", title="test")
+
+        with mock.patch(
+            "documents.classifier.DocumentClassifier.preprocess_content",
+        ) as pre_proc_mock:
+            pre_proc_mock.side_effect = dummy_preprocess
+
+            tasks.train_classifier()
+
+            with (
+                mock.patch(
+                    "documents.classifier.DocumentClassifier.FORMAT_VERSION",
+                    DocumentClassifier.FORMAT_VERSION + 1,
+                ),
+                mock.patch("documents.tasks.load_classifier") as load_classifier,
+            ):
+                load_classifier.return_value = None
+                tasks.train_classifier()
+                load_classifier.assert_called_once_with(use_cache=False)
+
+    def test_precompute_inbox_suggestions(self):
+        """
+        GIVEN:
+            - Trained classifier, whose information expired from the cache
+            - Inbox documents, one of them with cached suggestions
+            - A document not in the inbox
+        WHEN:
+            - Inbox suggestions are precomputed
+        THEN:
+            - The suggestions of all inbox documents are cached
+            - Cached suggestions are not computed again
+            - No suggestions are cached for other documents
+        """
+        inbox = Tag.objects.create(name="inbox", is_inbox_tag=True)
+        c = Correspondent.objects.create(matching_algorithm=Tag.MATCH_AUTO, name="test")
+        doc1 = Document.objects.create(
+            correspondent=c,
+            content="test",
+            title="test",
+            checksum="1",
+        )
+        doc2 = Document.objects.create(content="another", title="test2", checksum="2")
+        doc3 = Document.objects.create(content="cached", title="test3", checksum="3")
+        doc2.tags.add(inbox)
+        doc3.tags.add(inbox)
+
+        with mock.patch(
+            "documents.classifier.DocumentClassifier.preprocess_content",
+        ) as pre_proc_mock:
+            pre_proc_mock.side_effect = dummy_preprocess
+            tasks.train_classifier()
+
+            # The classifier information in the cache expired in the meantime
+            cache.clear()
+            set_suggestions_cache(doc3.pk, {"tags": [inbox.pk]}, load_classifier())
+
+            with mock.patch(
+                "documents.tasks.get_suggestions",
+                wraps=tasks.get_suggestions,
+            ) as get_suggestions:
+                tasks.precompute_inbox_suggestions()
+                get_suggestions.assert_called_once()
+                self.assertEqual(
+                    [document.pk for document in get_suggestions.call_args.args[0]],
+                    [doc2.pk],
+                )
+
+        self.assertIsNotNone(get_suggestion_cache(doc2.pk))
+        self.assertEqual(
+            get_suggestion_cache(doc3.pk).suggestions,
+            {"tags": [inbox.pk]},
+        )
+        self.assertIsNone(get_suggestion_cache(doc1.pk))
+
 
 class TestSanityCheck(DirectoriesMixin, TestCase):
     @mock.patch("documents.tasks.sanity_checker.check_sanity")
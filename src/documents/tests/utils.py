@@ -58,8 +58,10 @@ def setup_directories():
         CONSUMPTION_DIR=dirs.consumption_dir,
         LOGGING_DIR=dirs.logging_dir,
         INDEX_DIR=dirs.index_dir,
+        SIMILARITY_INDEX_DIR=dirs.data_dir / "similarity",
         STATIC_ROOT=dirs.static_dir,
         MODEL_FILE=dirs.data_dir / "classification_model.pickle",
+        CLASSIFIER_CONTENT_CACHE=dirs.data_dir / "classification_content_cache.sqlite3",
         MEDIA_LOCK=dirs.media_dir / "media.lock",
     )
     dirs.settings_override.enable()
@@ -1,4 +1,3 @@
-import itertools
 import logging
 import os
 import platform
@@ -41,7 +40,6 @@ from django.http import HttpResponseServerError
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.decorators import method_decorator
-from django.utils.timezone import make_aware
 from django.utils.translation import get_language
 from django.views import View
 from django.views.decorators.cache import cache_control
@@ -82,6 +80,7 @@ from documents.bulk_download import OriginalAndArchiveStrategy
 from documents.bulk_download import OriginalsOnlyStrategy
 from documents.caching import get_metadata_cache
 from documents.caching import get_suggestion_cache
+from documents.caching import get_suggestion_caches
 from documents.caching import refresh_metadata_cache
 from documents.caching import refresh_suggestions_cache
 from documents.caching import set_metadata_cache
@@ -109,10 +108,7 @@ from documents.filters import ShareLinkFilterSet
 from documents.filters import StoragePathFilterSet
 from documents.filters import TagFilterSet
 from documents.mail import send_email
-from documents.matching import match_correspondents
-from documents.matching import match_document_types
-from documents.matching import match_storage_paths
-from documents.matching import match_tags
+from documents.matching import get_suggestions
 from documents.models import Correspondent
 from documents.models import CustomField
 from documents.models import Document
@@ -128,7 +124,6 @@ from documents.models import Workflow
 from documents.models import WorkflowAction
 from documents.models import WorkflowTrigger
 from documents.parsers import get_parser_class_for_mime_type
-from documents.parsers import parse_date_generator
 from documents.permissions import PaperlessAdminPermissions
 from documents.permissions import PaperlessNotePermissions
 from documents.permissions import PaperlessObjectPermissions
@@ -582,7 +577,7 @@ class DocumentViewSet(
         response = super().update(request, *args, **kwargs)
         from documents import index
 
-        index.add_or_update_document(self.get_object())
+        index.queue_document_update(self.get_object())
 
         document_updated.send(
             sender=self.__class__,
@@ -594,7 +589,7 @@ class DocumentViewSet(
     def destroy(self, request, *args, **kwargs):
         from documents import index
 
-        index.remove_document_from_index(self.get_object())
+        index.queue_document_removal(self.get_object())
         try:
             return super().destroy(request, *args, **kwargs)
         except Exception as e:
@@ -737,26 +732,7 @@ class DocumentViewSet(
 
         classifier = load_classifier()
 
-        dates = []
-        if settings.NUMBER_OF_SUGGESTED_DATES > 0:
-            gen = parse_date_generator(doc.filename, doc.content)
-            dates = sorted(
-                {i for i in itertools.islice(gen, settings.NUMBER_OF_SUGGESTED_DATES)},
-            )
-
-        resp_data = {
-            "correspondents": [
-                c.id for c in match_correspondents(doc, classifier, request.user)
-            ],
-            "tags": [t.id for t in match_tags(doc, classifier, request.user)],
-            "document_types": [
-                dt.id for dt in match_document_types(doc, classifier, request.user)
-            ],
-            "storage_paths": [
-                dt.id for dt in match_storage_paths(doc, classifier, request.user)
-            ],
-            "dates": [date.strftime("%Y-%m-%d") for date in dates if date is not None],
-        }
+        resp_data = get_suggestions([doc], classifier, request.user)[doc.pk]
 
         # Cache the suggestions and the classifier hash for later
         set_suggestions_cache(doc.pk, resp_data, classifier)
@@ -895,7 +871,7 @@ class DocumentViewSet(
 
                 from documents import index
 
-                index.add_or_update_document(doc)
+                index.queue_document_update(doc)
 
                 notes = self.getNotes(doc)
 
@@ -932,7 +908,7 @@ class DocumentViewSet(
 
             from documents import index
 
-            index.add_or_update_document(doc)
+            index.queue_document_update(doc)
 
             return Response(self.getNotes(doc))
 
@@ -1096,6 +1072,15 @@ class DocumentViewSet(
                 many=True,
                 location=OpenApiParameter.QUERY,
             ),
+            OpenApiParameter(
+                name="include_selection_data",
+                type=OpenApiTypes.BOOL,
+                location=OpenApiParameter.QUERY,
+                description=(
+                    "Include the selection data of all results of a full text "
+                    "search, like the selection data endpoint returns"
+                ),
+            ),
         ],
         responses={
             200: DocumentSerializer(many=True, all_fields=True),
@@ -1125,18 +1110,12 @@ class UnifiedSearchViewSet(DocumentViewSet):
         if self._is_search_request():
             from documents import index
 
-            if "query" in self.request.query_params:
-                query_class = index.DelayedFullTextQuery
-            elif "more_like_id" in self.request.query_params:
-                query_class = index.DelayedMoreLikeThisQuery
-            else:
-                raise ValueError
-
-            return query_class(
+            return index.get_search_backend().get_query(
                 self.searcher,
                 self.request.query_params,
                 self.paginator.get_page_size(self.request),
                 filter_queryset=filtered_queryset,
+                user=self.request.user,
             )
         else:
             return filtered_queryset
@@ -1146,9 +1125,20 @@ class UnifiedSearchViewSet(DocumentViewSet):
             from documents import index
 
             try:
-                with index.open_index_searcher() as s:
+                with index.get_search_backend().open_searcher() as s:
                     self.searcher = s
-                    return super().list(request)
+                    response = super().list(request)
+                    include_selection_data = self.request.query_params.get(
+                        "include_selection_data",
+                        "False",
+                    )
+                    if include_selection_data.lower() in ["true", "1"]:
+                        response.data["selection_data"] = (
+                            self._get_search_selection_data(
+                                self.paginator.page.paginator.object_list,
+                            )
+                        )
+                    return response
             except NotFound:
                 raise
             except Exception as e:
@@ -1159,6 +1149,26 @@ class UnifiedSearchViewSet(DocumentViewSet):
         else:
             return super().list(request)
 
+    def _get_search_selection_data(self, delayed_query) -> dict:
+        """
+        Returns the selection data of all results of a search, like
+        SelectionDataView, counted from the index instead of the database
+        """
+        facet_counts = delayed_query.get_facet_counts()
+        return {
+            key: [
+                {"id": pk, "document_count": facet_counts[fieldname].get(pk, 0)}
+                for pk in model.objects.values_list("pk", flat=True)
+            ]
+            for key, model, fieldname in (
+                ("selected_correspondents", Correspondent, "correspondent_id"),
+                ("selected_tags", Tag, "tag_id"),
+                ("selected_document_types", DocumentType, "type_id"),
+                ("selected_storage_paths", StoragePath, "path_id"),
+                ("selected_custom_fields", CustomField, "custom_fields_id"),
+            )
+        }
+
     @action(detail=False, methods=["GET"], name="Get Next ASN")
     def next_asn(self, request, *args, **kwargs):
         max_asn = Document.objects.aggregate(
@@ -1656,11 +1666,8 @@ class SearchAutoCompleteView(GenericAPIView):
 
         from documents import index
 
-        ix = index.open_index()
-
         return Response(
-            index.autocomplete(
-                ix,
+            index.get_search_backend().autocomplete(
                 term,
                 limit,
                 user,
@@ -1734,12 +1741,14 @@ class GlobalSearchView(PassUserMixin):
                 # If we don't have enough results, search by content
                 from documents import index
 
-                with index.open_index_searcher() as s:
-                    fts_query = index.DelayedFullTextQuery(
+                search_backend = index.get_search_backend()
+                with search_backend.open_searcher() as s:
+                    fts_query = search_backend.get_query(
                         s,
                         request.query_params,
                         OBJECT_LIMIT,
                         filter_queryset=all_docs,
+                        user=request.user,
                     )
                     results = fts_query[0:1]
                     docs = docs | Document.objects.filter(
@@ -2015,6 +2024,42 @@ class StatisticsView(GenericAPIView):
         )
 
 
+class BulkSuggestionsView(GenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = DocumentListSerializer
+    parser_classes = (parsers.JSONParser,)
+
+    def post(self, request, format=None):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        ids = serializer.validated_data.get("documents")
+        documents = Document.objects.filter(pk__in=ids).select_related("owner")
+
+        for document in documents:
+            if not has_perms_owner_aware(request.user, "view_document", document):
+                return HttpResponseForbidden("Insufficient permissions")
+
+        cached = get_suggestion_caches(ids)
+        for doc_id in cached:
+            refresh_suggestions_cache(doc_id)
+        resp_data = {
+            doc_id: document_suggestions.suggestions
+            for doc_id, document_suggestions in cached.items()
+        }
+
+        uncached = [document for document in documents if document.pk not in cached]
+        if uncached:
+            classifier = load_classifier()
+            suggestions = get_suggestions(uncached, classifier, request.user)
+            for doc_id, document_suggestions in suggestions.items():
+                # Cache the suggestions and the classifier hash for later
+                set_suggestions_cache(doc_id, document_suggestions, classifier)
+            resp_data.update(suggestions)
+
+        return Response(resp_data)
+
+
 class BulkDownloadView(GenericAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = BulkDownloadSerializer
@@ -2730,12 +2775,16 @@ class SystemStatusView(PassUserMixin):
             celery_error = "Error connecting to celery, check logs for more detail."
 
         index_error = None
+        index_segments = None
+        index_size = None
         try:
-            ix = index.open_index()
+            search_backend = index.get_search_backend()
+            index_last_modified = search_backend.last_modified()
+            segment_sizes = search_backend.segment_sizes()
+            if segment_sizes is not None:
+                index_segments = len(segment_sizes)
+                index_size = sum(segment_sizes)
             index_status = "OK"
-            index_last_modified = make_aware(
-                datetime.fromtimestamp(ix.last_modified()),
-            )
         except Exception as e:
             index_status = "ERROR"
             index_error = "Error opening index, check logs for more detail."
@@ -2813,6 +2862,8 @@ class SystemStatusView(PassUserMixin):
                     "index_status": index_status,
                     "index_last_modified": index_last_modified,
                     "index_error": index_error,
+                    "index_segments": index_segments,
+                    "index_size": index_size,
                     "classifier_status": classifier_status,
                     "classifier_last_trained": classifier_last_trained,
                     "classifier_error": classifier_error,
@@ -190,11 +190,48 @@ def settings_values_check(app_configs, **kwargs):
             )
         return msgs
 
+    def _classifier_features_validate():
+        """
+        Validates how document contents are turned into classifier features
+        """
+        msgs = []
+        if settings.CLASSIFIER_FEATURES not in {"count", "hashing"}:
+            msgs.append(
+                Error(
+                    f'Classifier features "{settings.CLASSIFIER_FEATURES}" '
+                    f"is not valid",
+                ),
+            )
+        return msgs
+
+    def _search_backend_validate():
+        """
+        Validates the search backend and that the database supports it
+        """
+        msgs = []
+        engine = settings.DATABASES["default"]["ENGINE"]
+        if settings.SEARCH_BACKEND not in {"whoosh", "database"}:
+            msgs.append(
+                Error(f'Search backend "{settings.SEARCH_BACKEND}" is not valid'),
+            )
+        elif settings.SEARCH_BACKEND == "database" and engine not in {
+            "django.db.backends.sqlite3",
+            "django.db.backends.postgresql",
+        }:
+            msgs.append(
+                Error(
+                    "The database search backend requires SQLite or PostgreSQL",
+                ),
+            )
+        return msgs
+
     return (
         _ocrmypdf_settings_check()
         + _timezone_validate()
         + _barcode_scanner_validate()
         + _email_certificate_validate()
+        + _classifier_features_validate()
+        + _search_backend_validate()
     )
 
 
@@ -186,9 +186,43 @@ def _parse_beat_schedule() -> dict:
         {
             "name": "Optimize the index",
             "env_key": "PAPERLESS_INDEX_TASK_CRON",
-            # Default daily at midnight
-            "env_default": "0 0 * * *",
+            # Default disabled, merging the segments keeps the index fast
+            # without blocking writers while the whole index is rewritten
+            "env_default": "disable",
             "task": "documents.tasks.index_optimize",
+            "options": {
+                # 1 hour before a daily schedule sends again
+                "expires": 23.0 * 60.0 * 60.0,
+            },
+        },
+        {
+            "name": "Merge the index segments",
+            "env_key": "PAPERLESS_INDEX_MERGE_TASK_CRON",
+            # Default every ten minutes
+            "env_default": "*/10 * * * *",
+            "task": "documents.tasks.index_merge",
+            "options": {
+                # 1 minute before default schedule sends again
+                "expires": 9.0 * 60.0,
+            },
+        },
+        {
+            "name": "Reconcile the index",
+            "env_key": "PAPERLESS_INDEX_RECONCILE_TASK_CRON",
+            # Default daily at 00:15
+            "env_default": "15 0 * * *",
+            "task": "documents.tasks.index_reconcile",
+            "options": {
+                # 1 hour before default schedule sends again
+                "expires": 23.0 * 60.0 * 60.0,
+            },
+        },
+        {
+            "name": "Build the similarity index",
+            "env_key": "PAPERLESS_SIMILARITY_INDEX_TASK_CRON",
+            # Default daily at 00:45
+            "env_default": "45 0 * * *",
+            "task": "documents.tasks.build_similarity_index",
             "options": {
                 # 1 hour before default schedule sends again
                 "expires": 23.0 * 60.0 * 60.0,
@@ -280,10 +314,15 @@ EMPTY_TRASH_DIR = os.getenv(
 # threads.
 MEDIA_LOCK = MEDIA_ROOT / "media.lock"
 INDEX_DIR = DATA_DIR / "index"
+SIMILARITY_INDEX_DIR = DATA_DIR / "similarity"
 MODEL_FILE = __get_path(
     "PAPERLESS_MODEL_FILE",
     DATA_DIR / "classification_model.pickle",
 )
+CLASSIFIER_CONTENT_CACHE = __get_path(
+    "PAPERLESS_CLASSIFIER_CONTENT_CACHE",
+    DATA_DIR / "classification_content_cache.sqlite3",
+)
 
 LOGGING_DIR = __get_path("PAPERLESS_LOGGING_DIR", DATA_DIR / "log")
 
@@ -1215,6 +1254,72 @@ NLTK_ENABLED: Final[bool] = __get_boolean("PAPERLESS_ENABLE_NLTK", "yes")
 
 NLTK_LANGUAGE: str | None = _get_nltk_language_setting(OCR_LANGUAGE)
 
+# Update the existing classifier with only the changed documents, instead of
+# training it from scratch every time
+CLASSIFIER_INCREMENTAL_UPDATES: Final[bool] = __get_boolean(
+    "PAPERLESS_CLASSIFIER_INCREMENTAL_UPDATES",
+)
+# Days after which the classifier is fully retrained, even if incremental
+# updates are possible
+CLASSIFIER_FULL_RETRAIN_DAYS: Final[int] = max(
+    __get_int("PAPERLESS_CLASSIFIER_FULL_RETRAIN_DAYS", 7),
+    1,
+)
+# How document contents are turned into classifier features, either "count"
+# (a vocabulary of all words and word pairs) or "hashing" (bounded memory)
+CLASSIFIER_FEATURES: Final[str] = os.getenv(
+    "PAPERLESS_CLASSIFIER_FEATURES",
+    "count",
+).lower()
+# Maximum number of features, the most used ones are kept
+CLASSIFIER_MAX_FEATURES: Final[int | None] = __get_optional_int(
+    "PAPERLESS_CLASSIFIER_MAX_FEATURES",
+)
+# Number of documents hashed into features at once
+CLASSIFIER_CHUNK_SIZE: Final[int] = max(
+    __get_int("PAPERLESS_CLASSIFIER_CHUNK_SIZE", 1000),
+    1,
+)
+# Number of classifiers (tags, correspondents, ...) trained at the same time
+CLASSIFIER_TRAINING_WORKERS: Final[int] = max(
+    __get_int("PAPERLESS_CLASSIFIER_TRAINING_WORKERS", 1),
+    1,
+)
+
+###############################################################################
+# Search index                                                                #
+###############################################################################
+# Seconds document changes are collected for, before they are written to the
+# index at once.  0 writes every change immediately.
+INDEX_UPDATE_INTERVAL: Final[float] = max(
+    __get_float("PAPERLESS_INDEX_UPDATE_INTERVAL", 1.0),
+    0.0,
+)
+# Number of document changes after which they are written without waiting
+INDEX_UPDATE_BATCH_SIZE: Final[int] = max(
+    __get_int("PAPERLESS_INDEX_UPDATE_BATCH_SIZE", 500),
+    1,
+)
+# Number of characters of the content and notes of a search hit which are
+# searched for highlights
+SEARCH_HIGHLIGHT_MAX_CHARS: Final[int] = max(
+    __get_int("PAPERLESS_SEARCH_HIGHLIGHT_MAX_CHARS", 32768),
+    1,
+)
+# Megabytes of index segments a scheduled merge merges at most
+INDEX_MERGE_MAX_MB: Final[int] = max(
+    __get_int("PAPERLESS_INDEX_MERGE_MAX_MB", 256),
+    1,
+)
+# Seconds after which a scheduled merge starts no further merges
+INDEX_MERGE_MAX_SECONDS: Final[float] = max(
+    __get_float("PAPERLESS_INDEX_MERGE_MAX_SECONDS", 60.0),
+    0.0,
+)
+# The engine documents are indexed in and searched with, "whoosh" for the
+# index in INDEX_DIR or "database" for the full text search of the database
+SEARCH_BACKEND: Final[str] = os.getenv("PAPERLESS_SEARCH_BACKEND", "whoosh").lower()
+
 ###############################################################################
 # Email (SMTP) Backend                                                        #
 ###############################################################################
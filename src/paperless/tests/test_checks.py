@@ -235,6 +235,61 @@ class TestEmailCertSettingsChecks(DirectoriesMixin, FileSystemAssertsMixin, Test
         self.assertIn("Email cert /tmp/not_actually_here.pem is not a file", msg.msg)
 
 
+class TestClassifierFeaturesSettingsChecks(DirectoriesMixin, TestCase):
+    @override_settings(CLASSIFIER_FEATURES="hashed")
+    def test_invalid_features(self):
+        """
+        GIVEN:
+            - Default settings
+            - Classifier features are set to an unknown value
+        WHEN:
+            - Settings are validated
+        THEN:
+            - system check error reported for the classifier features
+        """
+        msgs = settings_values_check(None)
+
+        self.assertEqual(len(msgs), 1)
+        self.assertIn('Classifier features "hashed" is not valid', msgs[0].msg)
+
+
+class TestSearchBackendSettingsChecks(DirectoriesMixin, TestCase):
+    @override_settings(SEARCH_BACKEND="elastic")
+    def test_invalid_backend(self):
+        """
+        GIVEN:
+            - Default settings
+            - Search backend is set to an unknown backend
+        WHEN:
+            - Settings are validated
+        THEN:
+            - system check error reported for the search backend
+        """
+        msgs = settings_values_check(None)
+
+        self.assertEqual(len(msgs), 1)
+        self.assertIn('Search backend "elastic" is not valid', msgs[0].msg)
+
+    @override_settings(
+        SEARCH_BACKEND="database",
+        DATABASES={"default": {"ENGINE": "django.db.backends.mysql"}},
+    )
+    def test_database_backend_unsupported(self):
+        """
+        GIVEN:
+            - Default settings
+            - Search backend is set to the database with MariaDB
+        WHEN:
+            - Settings are validated
+        THEN:
+            - system check error reported for the search backend
+        """
+        msgs = settings_values_check(None)
+
+        self.assertEqual(len(msgs), 1)
+        self.assertIn("requires SQLite or PostgreSQL", msgs[0].msg)
+
+
 class TestAuditLogChecks(TestCase):
     def test_was_enabled_once(self):
         """
@@ -155,6 +155,7 @@ class TestCeleryScheduleParsing(TestCase):
     MAIL_EXPIRE_TIME = 9.0 * 60.0
     CLASSIFIER_EXPIRE_TIME = 59.0 * 60.0
     INDEX_EXPIRE_TIME = 23.0 * 60.0 * 60.0
+    INDEX_MERGE_EXPIRE_TIME = 9.0 * 60.0
     SANITY_EXPIRE_TIME = ((7.0 * 24.0) - 1.0) * 60.0 * 60.0
     EMPTY_TRASH_EXPIRE_TIME = 23.0 * 60.0 * 60.0
     RUN_SCHEDULED_WORKFLOWS_EXPIRE_TIME = 59.0 * 60.0
@@ -182,9 +183,19 @@ class TestCeleryScheduleParsing(TestCase):
                     "schedule": crontab(minute="5", hour="*/1"),
                     "options": {"expires": self.CLASSIFIER_EXPIRE_TIME},
                 },
-                "Optimize the index": {
-                    "task": "documents.tasks.index_optimize",
-                    "schedule": crontab(minute=0, hour=0),
+                "Merge the index segments": {
+                    "task": "documents.tasks.index_merge",
+                    "schedule": crontab(minute="*/10"),
+                    "options": {"expires": self.INDEX_MERGE_EXPIRE_TIME},
+                },
+                "Reconcile the index": {
+                    "task": "documents.tasks.index_reconcile",
+                    "schedule": crontab(minute=15, hour=0),
+                    "options": {"expires": self.INDEX_EXPIRE_TIME},
+                },
+                "Build the similarity index": {
+                    "task": "documents.tasks.build_similarity_index",
+                    "schedule": crontab(minute=45, hour=0),
                     "options": {"expires": self.INDEX_EXPIRE_TIME},
                 },
                 "Perform sanity check": {
@@ -210,15 +221,20 @@ class TestCeleryScheduleParsing(TestCase):
         """
         GIVEN:
             - Email task is configured non-default
+            - Search index optimize task is enabled
         WHEN:
             - The celery beat schedule is built
         THEN:
-            - The email task is configured per environment
+            - The email and search index optimize tasks are configured per
+              environment
             - The default schedule is returned for other tasks
         """
         with mock.patch.dict(
             os.environ,
-            {"PAPERLESS_EMAIL_TASK_CRON": "*/50 * * * mon"},
+            {
+                "PAPERLESS_EMAIL_TASK_CRON": "*/50 * * * mon",
+                "PAPERLESS_INDEX_TASK_CRON": "0 0 * * *",
+            },
         ):
             schedule = _parse_beat_schedule()
 
@@ -239,6 +255,21 @@ class TestCeleryScheduleParsing(TestCase):
                     "schedule": crontab(minute=0, hour=0),
                     "options": {"expires": self.INDEX_EXPIRE_TIME},
                 },
+                "Merge the index segments": {
+                    "task": "documents.tasks.index_merge",
+                    "schedule": crontab(minute="*/10"),
+                    "options": {"expires": self.INDEX_MERGE_EXPIRE_TIME},
+                },
+                "Reconcile the index": {
+                    "task": "documents.tasks.index_reconcile",
+                    "schedule": crontab(minute=15, hour=0),
+                    "options": {"expires": self.INDEX_EXPIRE_TIME},
+                },
+                "Build the similarity index": {
+                    "task": "documents.tasks.build_similarity_index",
+                    "schedule": crontab(minute=45, hour=0),
+                    "options": {"expires": self.INDEX_EXPIRE_TIME},
+                },
                 "Perform sanity check": {
                     "task": "documents.tasks.sanity_check",
                     "schedule": crontab(minute=30, hour=0, day_of_week="sun"),
@@ -261,14 +292,17 @@ class TestCeleryScheduleParsing(TestCase):
     def test_schedule_configuration_disabled(self):
         """
         GIVEN:
-            - Search index task is disabled
+            - Search index merge task is disabled
         WHEN:
             - The celery beat schedule is built
         THEN:
-            - The search index task is not present
+            - The search index merge task is not present
             - The default schedule is returned for other tasks
         """
-        with mock.patch.dict(os.environ, {"PAPERLESS_INDEX_TASK_CRON": "disable"}):
+        with mock.patch.dict(
+            os.environ,
+            {"PAPERLESS_INDEX_MERGE_TASK_CRON": "disable"},
+        ):
             schedule = _parse_beat_schedule()
 
         self.assertDictEqual(
@@ -283,6 +317,16 @@ class TestCeleryScheduleParsing(TestCase):
                     "schedule": crontab(minute="5", hour="*/1"),
                     "options": {"expires": self.CLASSIFIER_EXPIRE_TIME},
                 },
+                "Reconcile the index": {
+                    "task": "documents.tasks.index_reconcile",
+                    "schedule": crontab(minute=15, hour=0),
+                    "options": {"expires": self.INDEX_EXPIRE_TIME},
+                },
+                "Build the similarity index": {
+                    "task": "documents.tasks.build_similarity_index",
+                    "schedule": crontab(minute=45, hour=0),
+                    "options": {"expires": self.INDEX_EXPIRE_TIME},
+                },
                 "Perform sanity check": {
                     "task": "documents.tasks.sanity_check",
                     "schedule": crontab(minute=30, hour=0, day_of_week="sun"),
@@ -318,6 +362,9 @@ class TestCeleryScheduleParsing(TestCase):
                 "PAPERLESS_TRAIN_TASK_CRON": "disable",
                 "PAPERLESS_SANITY_TASK_CRON": "disable",
                 "PAPERLESS_INDEX_TASK_CRON": "disable",
+                "PAPERLESS_INDEX_MERGE_TASK_CRON": "disable",
+                "PAPERLESS_INDEX_RECONCILE_TASK_CRON": "disable",
+                "PAPERLESS_SIMILARITY_INDEX_TASK_CRON": "disable",
                 "PAPERLESS_EMPTY_TRASH_TASK_CRON": "disable",
                 "PAPERLESS_WORKFLOW_SCHEDULED_TASK_CRON": "disable",
             },
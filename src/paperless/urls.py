@@ -21,6 +21,7 @@ from rest_framework.routers import DefaultRouter
 from documents.views import BulkDownloadView
 from documents.views import BulkEditObjectsView
 from documents.views import BulkEditView
+from documents.views import BulkSuggestionsView
 from documents.views import CorrespondentViewSet
 from documents.views import CustomFieldViewSet
 from documents.views import DocumentTypeViewSet
@@ -134,6 +135,11 @@ urlpatterns = [
                                 BulkDownloadView.as_view(),
                                 name="bulk_download",
                             ),
+                            re_path(
+                                "^bulk_suggestions/",
+                                BulkSuggestionsView.as_view(),
+                                name="bulk_suggestions",
+                            ),
                             re_path(
                                 "^selection_data/",
                                 SelectionDataView.as_view(),